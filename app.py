@@ -44,6 +44,33 @@ app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 # Global progress tracking
 progress_data = {}
 
+# One-time startup work: the download janitor and the database setup (indexes,
+# legacy migrations). gunicorn imports app without running main.main(), so it
+# runs on the first request of each worker; a failed database setup is retried
+# after STARTUP_RETRY seconds. Only one janitor runs across workers (see start_janitor).
+STARTUP_RETRY = 60
+_startup = {'janitor': False, 'done': False, 'retry_at': 0.0, 'lock': threading.Lock()}
+
+@app.before_request
+def run_startup_once():
+    if _startup['janitor'] and (_startup['done'] or time.time() < _startup['retry_at']):
+        return
+    with _startup['lock']:
+        if not _startup['janitor']:
+            _startup['janitor'] = True
+            from disk_budget import start_janitor
+            start_janitor()
+        if _startup['done'] or time.time() < _startup['retry_at']:
+            return
+        try:
+            import asyncio
+            from mongo import database_init
+            asyncio.run(database_init())
+            _startup['done'] = True
+        except Exception as e:
+            _startup['retry_at'] = time.time() + STARTUP_RETRY
+            logging.error(f"❌ Startup database initialization failed: {e}")
+
 @app.context_processor
 def inject_user_context():
     """Inject user and YouTube channel info into all templates"""
@@ -122,6 +149,31 @@ def extract_metadata_route():
         logging.error(f"Error extracting metadata: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/extract_metadata/batch', methods=['POST'])
+def extract_metadata_batch_route():
+    """Start a batch metadata extraction; results are polled via /download_progress/<batch_id>
+
+    Takes JSON {"urls": [...]} or a form field 'urls' with one URL per line.
+    The job's 'results' list grows as each URL completes.
+    """
+    from metadata_batch import run_metadata_batch, MAX_BATCH_URLS
+    data = request.get_json(silent=True) or {}
+    urls = data.get('urls') if isinstance(data, dict) and data.get('urls') else request.form.get('urls', '').split()
+    urls = [url.strip() for url in urls if isinstance(url, str) and url.strip()]
+    if not urls:
+        return jsonify({'error': 'No URLs provided'}), 400
+    if len(urls) > MAX_BATCH_URLS:
+        return jsonify({'error': f'Too many URLs: {len(urls)} (maximum {MAX_BATCH_URLS})'}), 400
+
+    batch_id = f"batch_{int(time.time())}_{hash(tuple(urls)) % 10000}"
+    progress_data[batch_id] = {'status': 'starting', 'type': 'metadata_batch', 'total': len(urls), 'results': []}
+
+    thread = threading.Thread(target=run_metadata_batch, args=(urls, batch_id, progress_data))
+    thread.daemon = True
+    thread.start()
+
+    return jsonify({'batch_id': batch_id, 'total': len(urls)})
+
 @app.route('/get_video_qualities', methods=['POST'])
 def get_video_qualities():
     """Get available video qualities and file sizes"""
@@ -131,9 +183,13 @@ def get_video_qualities():
             return jsonify({'error': 'No URL provided'}), 400
 
         from multi_platform_downloader import get_video_qualities_info
-        qualities = get_video_qualities_info(url)
+        from format_selection import create_selection
+        qualities, info = get_video_qualities_info(url, return_info=True)
+        
+        # Short-lived token so the download can start from this extraction
+        selection_token = create_selection(url, info) if info else None
         
-        return jsonify({'qualities': qualities, 'success': True})
+        return jsonify({'qualities': qualities, 'selection_token': selection_token, 'success': True})
 
     except Exception as e:
         logging.error(f"Error getting video qualities: {e}")
@@ -145,6 +201,7 @@ def download_video():
     """Start video download with selected quality"""
     url = request.form.get('url')
     quality = request.form.get('quality')
+    selection_token = request.form.get('selection_token')
     
     if not url:
         return jsonify({'error': 'No URL provided'}), 400
@@ -152,6 +209,16 @@ def download_video():
     if not quality:
         return jsonify({'error': 'No quality selected'}), 400
 
+    # Per-user size/duration limits (platform defaults apply when not logged in)
+    user_settings = None
+    if 'user_id' in session:
+        try:
+            import asyncio
+            from mongo import get_user_settings
+            user_settings = asyncio.run(get_user_settings(session['user_id']))
+        except Exception as e:
+            logging.warning(f"Could not load download limits for {session['user_id']}: {e}")
+
     # Generate unique download ID
     download_id = f"download_{int(time.time())}_{hash(url) % 10000}"
     
@@ -169,7 +236,11 @@ def download_video():
     def download_worker():
         try:
             from multi_platform_downloader import download_video_with_progress
-            result = download_video_with_progress(url, quality, download_id, progress_data)
+            result = download_video_with_progress(url, quality, download_id, progress_data, selection_token, user_settings)
+            
+            # Rejected by the size/duration admission check (status already 'cancelled')
+            if result.get('error'):
+                return
             
             progress_data[download_id].update({
                 'status': 'completed',
@@ -191,6 +262,46 @@ def download_video():
 
     return jsonify({'download_id': download_id})
 
+@app.route('/download_playlist', methods=['POST'])
+def download_playlist_route():
+    """Download every entry of a playlist or channel; re-submitting it resumes where it stopped"""
+    url = request.form.get('url')
+    quality = request.form.get('quality')
+    concurrency = request.form.get('concurrency', type=int)
+    
+    if not url:
+        return jsonify({'error': 'No URL provided'}), 400
+
+    user_settings = None
+    if 'user_id' in session:
+        try:
+            import asyncio
+            from mongo import get_user_settings
+            user_settings = asyncio.run(get_user_settings(session['user_id']))
+        except Exception as e:
+            logging.warning(f"Could not load download limits for {session['user_id']}: {e}")
+
+    playlist_id = f"playlist_{int(time.time())}_{hash(url) % 10000}"
+    progress_data[playlist_id] = {'status': 'starting', 'type': 'playlist', 'entries': []}
+
+    def playlist_worker():
+        try:
+            from playlist_downloader import download_playlist
+            download_playlist(url, quality, playlist_id, progress_data, user_settings, concurrency)
+        except Exception as e:
+            logging.error(f"Playlist download error: {e}")
+            progress_data[playlist_id].update({
+                'status': 'error',
+                'error': str(e)
+            })
+
+    thread = threading.Thread(target=playlist_worker)
+    thread.daemon = True
+    thread.start()
+
+    # Entry progress: /download_progress/<id> for each id in the playlist's 'entries'
+    return jsonify({'playlist_id': playlist_id})
+
 @app.route('/download_progress/<download_id>')
 def download_progress(download_id):
     """Get download progress"""
@@ -703,10 +814,16 @@ def platform_status():
             'color': config['color']
         })
 
+    # Adaptive request rates, cooldowns and cookie jar health of the extractors
+    from rate_limiter import rate_limit_status
+    from cookie_pool import cookie_pool_status
+
     return jsonify({
         'platforms': platforms_info,
         'total_count': len(platforms_info),
         'supported_count': len([p for p in platforms_info if p['supported']]),
+        'rate_limits': rate_limit_status(),
+        'cookie_jars': cookie_pool_status(),
         'success': True
     })
 
@@ -1320,15 +1437,7 @@ def add_automation_channel():
             return jsonify({'error': 'Channel info is required'}), 400
         
         import asyncio
-        from mongo import get_user_channels, save_user_channels
-        
-        # Load existing channels
-        channels_data = asyncio.run(get_user_channels(user_id))
-        
-        # Check if channel already exists
-        for existing_channel in channels_data['channels']:
-            if existing_channel['channel_id'] == channel_info['channel_id']:
-                return jsonify({'error': 'Channel is already being monitored'}), 400
+        from mongo import add_user_channel
         
         # Add monitor interval and quality defaults
         channel_info['monitor_interval'] = 10
@@ -1336,16 +1445,118 @@ def add_automation_channel():
         channel_info['last_checked'] = None
         channel_info['last_video_count'] = channel_info.get('total_videos', 0)
         
-        # Add new channel
-        channels_data['channels'].append(channel_info)
-        
-        asyncio.run(save_user_channels(user_id, channels_data))
+        # Add new channel (the unique (user_id, channel_id) index rejects duplicates)
+        if not asyncio.run(add_user_channel(user_id, channel_info)):
+            return jsonify({'error': 'Channel is already being monitored'}), 400
+        channel_info.pop('_id', None)
         
         return jsonify({'success': True, 'channel': channel_info})
     except Exception as e:
         logging.error(f"Error adding automation channel: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/automation/import_channels', methods=['POST'])
+def import_automation_channels():
+    """Bulk import channels for monitoring from a URL list or an OPML/CSV file"""
+    try:
+        user_id = get_user_id()
+
+        from channel_resolver import resolve_channel_ids, parse_channel_import_file
+
+        # Collect channel references from an uploaded file or a JSON list
+        upload = request.files.get('file')
+        if upload:
+            try:
+                channel_urls = parse_channel_import_file(upload.filename, upload.read())
+            except Exception as parse_error:
+                return jsonify({'error': str(parse_error)}), 400
+        else:
+            data = request.get_json(silent=True) or {}
+            channel_urls = data.get('channel_urls') or []
+            if isinstance(channel_urls, str):
+                channel_urls = channel_urls.splitlines()
+
+        channel_urls = [url.strip() for url in channel_urls if url and url.strip()]
+        if not channel_urls:
+            return jsonify({'error': 'No channel URLs provided'}), 400
+        if len(channel_urls) > 500:
+            return jsonify({'error': 'A maximum of 500 channels can be imported at once'}), 400
+
+        import asyncio
+        from mongo import get_user_settings, get_user_channel_ids, add_user_channels
+
+        settings = asyncio.run(get_user_settings(user_id))
+        api_key = settings.get('api_key')
+
+        # Resolve all handles/custom URLs concurrently (cached ones cost nothing)
+        resolved = resolve_channel_ids(channel_urls, api_key)
+
+        # Deduplicate against existing channels and within the import itself
+        known_ids = asyncio.run(get_user_channel_ids(user_id))
+
+        results = []
+        new_ids = []
+        for url in channel_urls:
+            entry = resolved[url]
+            channel_id = entry['channel_id']
+            if entry['error']:
+                results.append({'input': url, 'status': 'error', 'error': entry['error']})
+            elif channel_id in known_ids:
+                results.append({'input': url, 'status': 'duplicate', 'channel_id': channel_id})
+            else:
+                known_ids.add(channel_id)
+                new_ids.append(channel_id)
+                results.append({'input': url, 'status': 'pending', 'channel_id': channel_id})
+
+        # Fetch channel details in batches of 50 IDs per API request
+        details = {}
+        if new_ids:
+            try:
+                from auth_helper import get_channels_details_batch_api_v3
+                details = get_channels_details_batch_api_v3(new_ids, api_key)
+            except Exception as api_error:
+                logging.error(f"Batch channel details failed: {api_error}")
+                for result in results:
+                    if result['status'] == 'pending':
+                        result.update({'status': 'error', 'error': str(api_error)})
+
+        new_channels = []
+        for result in results:
+            if result['status'] != 'pending':
+                continue
+            channel_details = details.get(result['channel_id'])
+            if not channel_details:
+                result.update({'status': 'error', 'error': 'Channel not found or may be private/deleted.'})
+                continue
+
+            channel_info = {
+                'channel_id': channel_details['channel_id'],
+                'name': channel_details['name'],
+                'logo_url': channel_details['logo_url'],
+                'subscriber_count': channel_details['subscribers'],
+                'total_videos': channel_details['video_count'],
+                'monitor_interval': 10,
+                'quality': '1080p',
+                'last_checked': None,
+                'last_video_count': channel_details['video_count']
+            }
+            new_channels.append(channel_info)
+            result.update({'status': 'added', 'name': channel_info['name']})
+
+        # Persist all new channels in one write
+        asyncio.run(add_user_channels(user_id, new_channels))
+
+        return jsonify({
+            'success': True,
+            'added': len(new_channels),
+            'duplicates': sum(1 for r in results if r['status'] == 'duplicate'),
+            'errors': sum(1 for r in results if r['status'] == 'error'),
+            'results': results
+        })
+    except Exception as e:
+        logging.error(f"Error importing automation channels: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/automation/remove_channel', methods=['POST'])
 def remove_automation_channel():
     """Remove channel from monitoring"""
@@ -1357,11 +1568,9 @@ def remove_automation_channel():
             return jsonify({'error': 'Channel ID is required'}), 400
         
         import asyncio
-        from mongo import get_user_channels, save_user_channels
+        from mongo import remove_user_channel
         
-        data = asyncio.run(get_user_channels(user_id))
-        data['channels'] = [ch for ch in data['channels'] if ch['channel_id'] != channel_id]
-        asyncio.run(save_user_channels(user_id, data))
+        asyncio.run(remove_user_channel(user_id, channel_id))
         
         return jsonify({'success': True})
     except Exception as e:
@@ -1517,6 +1726,9 @@ def store_user_tokens(user_email_dir, access_token, refresh_token):
 
 def process_video_for_automation(user_id, video_url, video_title, video_metadata):
     """Process video download and upload for automation"""
+    from job_workspace import create_job_dir, remove_job_dir
+    
+    job_dir = None
     try:
         # Get stored user tokens
         access_token, refresh_token = get_stored_user_tokens(user_id)
@@ -1546,12 +1758,22 @@ def process_video_for_automation(user_id, video_url, video_title, video_metadata
         download_path = f"{user_dir}/downloads"
         os.makedirs(download_path, exist_ok=True)
         
-        # Download the video
-        downloaded_file = download_from_platform(video_url, download_path, platform)
+        # Download the video into a directory of its own so parallel jobs never collide
+        job_dir = create_job_dir(download_path, f"auto_{user_id}")
+        downloaded_file, info = download_from_platform(video_url, job_dir, platform, return_info=True, partial_root=download_path)
         
         if not downloaded_file or not os.path.exists(downloaded_file):
             raise Exception("Video download failed")
         
+        # Complete light (snippet-only) metadata from the download's info dict
+        if video_metadata.get('metadata_mode') == 'light' and info:
+            from multi_platform_downloader import build_metadata_from_info
+            try:
+                video_metadata = {**video_metadata, **build_metadata_from_info(info, video_url, platform)}
+                video_metadata['metadata_mode'] = 'full'
+            except Exception as metadata_err:
+                logging.warning(f"Could not complete metadata from download info: {metadata_err}")
+        
         # Upload to YouTube using yt_uploader
         from yt_uploader import upload_to_youtube
         
@@ -1574,64 +1796,27 @@ def process_video_for_automation(user_id, video_url, video_title, video_metadata
             upload_tags,
             upload_privacy,
             upload_id,
-            progress_data
+            progress_data,
+            captions=info.get('memory_subtitles') if info else None
         )
         
         # Clean up downloaded file
-        try:
-            if os.path.exists(downloaded_file):
-                os.remove(downloaded_file)
-        except Exception:
-            pass
+        remove_job_dir(job_dir)
         
         return youtube_url
         
     except Exception as e:
         logging.error(f"Error processing video for automation: {e}")
+        remove_job_dir(job_dir)
         raise e
 
 def get_channel_info_hybrid(channel_url):
     """Extract YouTube channel information using YouTube API v3 + RSS"""
-    import re
     import feedparser
+    from channel_resolver import resolve_channel_id
     
-    # Extract channel ID from URL
-    channel_id = None
-    
-    if 'youtube.com/@' in channel_url:
-        # Handle @username format - need to resolve to channel ID via scraping
-        response = requests.get(channel_url, headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'})
-        response.raise_for_status()
-        
-        # Extract channel ID from page
-        channel_id_match = re.search(r'"channelId":"([^"]+)"', response.text)
-        if channel_id_match:
-            channel_id = channel_id_match.group(1)
-        else:
-            raise Exception('Could not extract channel ID from @username URL')
-    
-    elif 'youtube.com/channel/' in channel_url:
-        # Direct channel ID extraction
-        channel_id = channel_url.split('/channel/')[-1].split('?')[0]
-    
-    elif 'youtube.com/c/' in channel_url or 'youtube.com/user/' in channel_url:
-        # Handle custom URLs by scraping
-        response = requests.get(channel_url, headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'})
-        response.raise_for_status()
-        
-        channel_id_match = re.search(r'"channelId":"([^"]+)"', response.text)
-        if channel_id_match:
-            channel_id = channel_id_match.group(1)
-        else:
-            raise Exception('Could not extract channel ID from custom URL')
-    
-    elif channel_url.startswith('UC') and len(channel_url) == 24:
-        # Direct channel ID
-        channel_id = channel_url
-        channel_url = f"https://www.youtube.com/channel/{channel_id}"
-    
-    else:
-        raise Exception('Invalid YouTube channel URL format')
+    # Extract channel ID from URL (handles and custom URLs are resolved once and cached)
+    channel_id = resolve_channel_id(channel_url)
     
     if not channel_id:
         raise Exception('Could not extract channel ID')
@@ -1913,25 +2098,24 @@ def automation_monitor_worker(user_id):
                 
                 # Load settings for API key and interval
                 import asyncio
-                from mongo import get_user_settings, get_user_channels, save_user_channels
+                from mongo import get_user_settings, get_due_channels, count_user_channels, update_user_channels
                 
                 settings = asyncio.run(get_user_settings(user_id))
                 api_key = settings.get('api_key')
                 monitor_interval = settings.get('monitor_interval', 300)
                 
-                # Load channels
-                channels_data = asyncio.run(get_user_channels(user_id))
-                channels = channels_data.get('channels', [])
+                # Load only the channels that are due for a check
+                channels = asyncio.run(get_due_channels(user_id))
                 
                 if not channels:
-                    add_automation_log(user_id, 'warning', 'No channels configured yet, waiting...')
-                    time.sleep(10)
-                    continue
-                if not channels:
-                    add_automation_log(user_id, 'warning', 'No channels to monitor')
+                    if not asyncio.run(count_user_channels(user_id)):
+                        add_automation_log(user_id, 'warning', 'No channels configured yet, waiting...')
                     time.sleep(10)
                     continue
                 
+                # Field-level updates per channel, written in one bulk write after the cycle
+                channel_updates = {}
+                
                 # Build channel names list for logging
                 channel_names = [ch.get('name', 'Unknown') for ch in channels]
                 channels_str = ', '.join(channel_names)
@@ -1943,9 +2127,11 @@ def automation_monitor_worker(user_id):
                 new_videos_found = []
                 
                 # Check each channel for new videos
-                for i, channel in enumerate(channels):
+                for channel in channels:
                     channel_name = channel.get('name', 'Unknown')
                     channel_id = channel.get('channel_id', '')
+                    checked_at = time.time()
+                    channel_updates[channel_id] = {'next_check_at': checked_at + monitor_interval}
                     
                     try:
                         # Use user's API key if available, otherwise use default
@@ -1967,8 +2153,8 @@ def automation_monitor_worker(user_id):
                             total_new_videos += new_videos_count
                             
                             # Update the count
-                            channels[i]['last_video_count'] = current_video_count
-                            channels[i]['last_checked'] = time.time()
+                            channel_updates[channel_id]['last_video_count'] = current_video_count
+                            channel_updates[channel_id]['last_checked'] = checked_at
                             
                             # Get latest videos with metadata extraction
                             try:
@@ -1980,9 +2166,9 @@ def automation_monitor_worker(user_id):
                                     add_automation_log(user_id, 'info', f"📄 Extracting video metadata... {video.get('title', 'Unknown')} , {video.get('published_at', 'Unknown date')}")
                                     
                                     try:
-                                        # Extract metadata using yt-dlp
-                                        from multi_platform_downloader import extract_platform_metadata
-                                        metadata = extract_platform_metadata(video.get('url', ''))
+                                        # Reuse the API snippet; full metadata comes from the download's own extraction
+                                        from multi_platform_downloader import extract_light_metadata
+                                        metadata = extract_light_metadata(video.get('url', ''), video)
                                         add_automation_log(user_id, 'success', f"✅ Successfully Extracted metadata")
                                         add_automation_log(user_id, 'info', f"    📺 {metadata.get('title', 'Unknown')} , {metadata.get('upload_date', 'Unknown date')}")
                                         
@@ -2002,7 +2188,7 @@ def automation_monitor_worker(user_id):
                         
                         elif current_video_count < last_known_count:
                             # Video count decreased
-                            channels[i]['last_video_count'] = current_video_count
+                            channel_updates[channel_id]['last_video_count'] = current_video_count
                     
                     except Exception as channel_err:
                         add_automation_log(user_id, 'error', f"❌ Error checking {channel_name}: {str(channel_err)}")
@@ -2046,10 +2232,8 @@ def automation_monitor_worker(user_id):
                     except Exception as upload_err:
                         add_automation_log(user_id, 'error', f"❌ Upload process error: {str(upload_err)}")
                 
-                # Save updated channels data
-                import asyncio
-                from mongo import save_user_channels
-                asyncio.run(save_user_channels(user_id, channels_data))
+                # Save only the changed channel fields
+                asyncio.run(update_user_channels(user_id, channel_updates))
                 
                 # Cooldown timer with real-time countdown
                 add_automation_log(user_id, 'info', f"⏰ STARTING COOLDOWN: {monitor_interval} seconds")
@@ -21,13 +21,15 @@ GOOGLE_AUTH_URL = 'https://accounts.google.com/o/oauth2/auth'
 GOOGLE_TOKEN_URL = 'https://oauth2.googleapis.com/token'
 GOOGLE_USERINFO_URL = 'https://www.googleapis.com/oauth2/v2/userinfo'
 
-# Scopes for YouTube upload
+# Scopes for YouTube upload (youtube.force-ssl is needed for captions.insert;
+# accounts that consented before it was added must log in again to upload captions)
 SCOPES = [
     'openid',
     'email',
     'profile',
     'https://www.googleapis.com/auth/youtube.upload',
-    'https://www.googleapis.com/auth/youtube'
+    'https://www.googleapis.com/auth/youtube',
+    'https://www.googleapis.com/auth/youtube.force-ssl'
 ]
 
 def get_redirect_uri():
@@ -124,37 +126,12 @@ def get_youtube_api_service(access_token):
 
 def get_channel_details_api_v3(channel_id_or_url, api_key=None):
     """Get channel details using YouTube API v3"""
-    import re
+    from channel_resolver import resolve_channel_id
     
-    # Extract channel ID from URL if needed
+    # Extract channel ID from URL if needed (handles and custom URLs are cached)
     channel_id = channel_id_or_url
-    if 'youtube.com' in channel_id_or_url:
-        if '/channel/' in channel_id_or_url:
-            channel_id = channel_id_or_url.split('/channel/')[-1].split('?')[0]
-        elif '/@' in channel_id_or_url:
-            # For @username format, we need to resolve it
-            response = requests.get(channel_id_or_url, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            response.raise_for_status()
-            
-            channel_id_match = re.search(r'"channelId":"([^"]+)"', response.text)
-            if channel_id_match:
-                channel_id = channel_id_match.group(1)
-            else:
-                raise Exception('Could not extract channel ID from @username URL')
-        elif '/c/' in channel_id_or_url or '/user/' in channel_id_or_url:
-            # Handle custom URLs
-            response = requests.get(channel_id_or_url, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-            response.raise_for_status()
-            
-            channel_id_match = re.search(r'"channelId":"([^"]+)"', response.text)
-            if channel_id_match:
-                channel_id = channel_id_match.group(1)
-            else:
-                raise Exception('Could not extract channel ID from custom URL')
+    if 'youtube.com' in channel_id_or_url or channel_id_or_url.startswith('@'):
+        channel_id = resolve_channel_id(channel_id_or_url, api_key)
     
     # Use API key priority: user provided > environment variable
     if not api_key:
@@ -178,7 +155,36 @@ def get_channel_details_api_v3(channel_id_or_url, api_key=None):
     if not data.get('items'):
         raise Exception('Channel not found or API request failed')
     
-    channel_info = data['items'][0]
+    return _format_channel_details(data['items'][0])
+
+def get_channels_details_batch_api_v3(channel_ids, api_key=None):
+    """Get details for many channels using YouTube API v3 (50 IDs per request)"""
+    if not api_key:
+        api_key = os.environ.get('YOUTUBE_API_KEY')
+        if not api_key:
+            raise Exception('YouTube API key not found. Please provide API key in settings.')
+    
+    api_url = 'https://www.googleapis.com/youtube/v3/channels'
+    channel_ids = list(channel_ids)
+    details = {}
+    
+    for start in range(0, len(channel_ids), 50):
+        params = {
+            'part': 'snippet,statistics',
+            'id': ','.join(channel_ids[start:start + 50]),
+            'key': api_key,
+            'maxResults': 50
+        }
+        response = requests.get(api_url, params=params)
+        response.raise_for_status()
+        
+        for item in response.json().get('items', []):
+            details[item['id']] = _format_channel_details(item)
+    
+    return details
+
+def _format_channel_details(channel_info):
+    """Format a channels.list item into the channel details dict"""
     snippet = channel_info['snippet']
     statistics = channel_info['statistics']
     
@@ -192,7 +198,7 @@ def get_channel_details_api_v3(channel_id_or_url, api_key=None):
         subscribers = f"{subscriber_count} subscribers"
     
     return {
-        'channel_id': channel_id,
+        'channel_id': channel_info['id'],
         'name': snippet.get('title', 'Unknown Channel'),
         'logo_url': snippet.get('thumbnails', {}).get('high', {}).get('url', 
                     f"https://yt3.ggpht.com/a/default-user=s800-c-k-c0x00ffffff-no-rj"),
@@ -0,0 +1,286 @@
+import os
+import re
+import time
+import logging
+import threading
+import requests
+from urllib.parse import urlparse, unquote
+from concurrent.futures import ThreadPoolExecutor
+
+# Channel IDs are always "UC" followed by 22 URL-safe base64 characters
+CHANNEL_ID_RE = re.compile(r'^UC[\w-]{22}$')
+
+# The canonical link and externalId appear in the page <head>, well before the
+# large ytInitialData blob, so streaming can usually stop after a few KB
+PAGE_CHANNEL_ID_RE = re.compile(
+    rb'<link rel="canonical" href="https://www\.youtube\.com/channel/(UC[\w-]{22})"'
+    rb'|"externalId":"(UC[\w-]{22})"'
+    rb'|"channelId":"(UC[\w-]{22})"'
+)
+
+CHANNELS_API_URL = 'https://www.googleapis.com/youtube/v3/channels'
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+STREAM_CHUNK_SIZE = 16 * 1024
+MAX_PAGE_BYTES = 2 * 1024 * 1024  # Give up scanning after 2MB
+BATCH_WORKERS = 8
+
+# Process-level cache in front of MongoDB (key -> channel_id)
+_memory_cache = {}
+_cache_lock = threading.Lock()
+
+_session = requests.Session()
+_session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=BATCH_WORKERS))
+
+
+def parse_channel_reference(value):
+    """Parse a channel URL, @handle or channel ID into (kind, key, url)
+
+    kind is one of 'id', 'handle', 'custom' or 'user'. For 'id' the key is the
+    channel ID itself; for the others it is the normalized cache key.
+    """
+    value = (value or '').strip()
+    if not value:
+        raise Exception('Invalid YouTube channel URL format')
+
+    if CHANNEL_ID_RE.match(value):
+        return 'id', value, f"https://www.youtube.com/channel/{value}"
+
+    if value.startswith('@'):
+        handle = value.split('/')[0].split('?')[0]
+        return 'handle', handle.lower(), f"https://www.youtube.com/{handle}"
+
+    if '://' not in value:
+        value = f"https://{value}"
+
+    parsed = urlparse(value)
+    host = (parsed.hostname or '').lower()
+    if not (host == 'youtube.com' or host.endswith('.youtube.com')):
+        raise Exception('Invalid YouTube channel URL format')
+
+    parts = [unquote(p) for p in parsed.path.split('/') if p]
+    if not parts:
+        raise Exception('Invalid YouTube channel URL format')
+
+    if parts[0] == 'channel' and len(parts) > 1 and CHANNEL_ID_RE.match(parts[1]):
+        return 'id', parts[1], f"https://www.youtube.com/channel/{parts[1]}"
+    if parts[0].startswith('@'):
+        return 'handle', parts[0].lower(), f"https://www.youtube.com/{parts[0]}"
+    if parts[0] == 'c' and len(parts) > 1:
+        return 'custom', f"c/{parts[1].lower()}", f"https://www.youtube.com/c/{parts[1]}"
+    if parts[0] == 'user' and len(parts) > 1:
+        return 'user', f"user/{parts[1].lower()}", f"https://www.youtube.com/user/{parts[1]}"
+
+    raise Exception('Invalid YouTube channel URL format')
+
+
+def scan_chunks_for_channel_id(chunks, max_bytes=MAX_PAGE_BYTES):
+    """Scan an iterable of byte chunks and return the first channel ID found"""
+    tail = b''
+    seen = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        seen += len(chunk)
+        # Keep a small overlap so IDs split across chunk boundaries still match
+        window = tail + chunk
+        match = PAGE_CHANNEL_ID_RE.search(window)
+        if match:
+            channel_id = next(group for group in match.groups() if group)
+            return channel_id.decode('ascii')
+        tail = window[-128:]
+        if seen >= max_bytes:
+            break
+    return None
+
+
+def _resolve_via_api(kind, key, api_key):
+    """Resolve handles and legacy usernames with a 1-unit channels.list call"""
+    if not api_key or kind not in ('handle', 'user'):
+        return None
+
+    params = {'part': 'id', 'key': api_key}
+    if kind == 'handle':
+        params['forHandle'] = key
+    else:
+        params['forUsername'] = key.split('/', 1)[1]
+
+    try:
+        response = _session.get(CHANNELS_API_URL, params=params, timeout=10)
+        response.raise_for_status()
+        items = response.json().get('items') or []
+        if items:
+            return items[0]['id']
+    except Exception as e:
+        logging.warning(f"Channel API lookup failed for {key}: {e}")
+    return None
+
+
+def _resolve_via_page(url):
+    """Stream the channel page and stop reading as soon as the ID appears"""
+    with _session.get(url, headers=BROWSER_HEADERS, stream=True, timeout=15) as response:
+        response.raise_for_status()
+        return scan_chunks_for_channel_id(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+
+
+def _load_cached(keys):
+    """Look up keys in the memory cache, then MongoDB for the remainder"""
+    found = {}
+    with _cache_lock:
+        for key in keys:
+            if key in _memory_cache:
+                found[key] = _memory_cache[key]
+
+    missing = [key for key in keys if key not in found]
+    if missing:
+        try:
+            import asyncio
+            from mongo import get_channel_handle_ids
+            stored = asyncio.run(get_channel_handle_ids(missing))
+            found.update(stored)
+            with _cache_lock:
+                _memory_cache.update(stored)
+        except Exception as e:
+            logging.warning(f"Channel handle cache lookup failed: {e}")
+    return found
+
+
+def _store_cached(resolved):
+    """Persist new resolutions to the memory cache and MongoDB in one write"""
+    if not resolved:
+        return
+    with _cache_lock:
+        _memory_cache.update(resolved)
+    try:
+        import asyncio
+        from mongo import save_channel_handle_ids
+        asyncio.run(save_channel_handle_ids(resolved))
+    except Exception as e:
+        logging.warning(f"Could not persist channel handle cache: {e}")
+
+
+def _resolve_uncached(kind, key, url, api_key):
+    """Resolve a single reference without consulting the cache"""
+    channel_id = _resolve_via_api(kind, key, api_key)
+    if channel_id:
+        return channel_id, 'api'
+
+    channel_id = _resolve_via_page(url)
+    if channel_id:
+        return channel_id, 'page'
+
+    if kind == 'handle':
+        raise Exception('Could not extract channel ID from @username URL')
+    raise Exception('Could not extract channel ID from custom URL')
+
+
+def resolve_channel_ids(values, api_key=None, max_workers=BATCH_WORKERS):
+    """Resolve many channel URLs/handles to channel IDs
+
+    Returns a dict mapping each input value to
+    {'channel_id': str or None, 'source': str, 'error': str or None}.
+    Cached lookups cost one MongoDB query for the whole batch and new
+    resolutions are written back in a single bulk write.
+    """
+    if not api_key:
+        api_key = os.environ.get('YOUTUBE_API_KEY')
+
+    results = {}
+    pending = {}  # key -> (kind, url, [values])
+
+    for value in values:
+        try:
+            kind, key, url = parse_channel_reference(value)
+        except Exception as e:
+            results[value] = {'channel_id': None, 'source': None, 'error': str(e)}
+            continue
+
+        if kind == 'id':
+            results[value] = {'channel_id': key, 'source': 'url', 'error': None}
+        elif key in pending:
+            pending[key][2].append(value)
+        else:
+            pending[key] = (kind, url, [value])
+
+    if not pending:
+        return results
+
+    cached = _load_cached(list(pending.keys()))
+    for key, channel_id in cached.items():
+        for value in pending.pop(key)[2]:
+            results[value] = {'channel_id': channel_id, 'source': 'cache', 'error': None}
+
+    resolved = {}
+    if pending:
+        start_time = time.time()
+        workers = max(1, min(max_workers, len(pending)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                key: executor.submit(_resolve_uncached, kind, key, url, api_key)
+                for key, (kind, url, _) in pending.items()
+            }
+            for key, future in futures.items():
+                try:
+                    channel_id, source = future.result()
+                    resolved[key] = channel_id
+                    entry = {'channel_id': channel_id, 'source': source, 'error': None}
+                except Exception as e:
+                    entry = {'channel_id': None, 'source': None, 'error': str(e)}
+                for value in pending[key][2]:
+                    results[value] = dict(entry)
+        logging.info(f"Resolved {len(resolved)}/{len(pending)} channel handles in {time.time() - start_time:.2f}s")
+
+    _store_cached(resolved)
+    return results
+
+
+def resolve_channel_id(value, api_key=None):
+    """Resolve a single channel URL, @handle or ID to a channel ID"""
+    result = resolve_channel_ids([value], api_key=api_key, max_workers=1)[value]
+    if result['error']:
+        raise Exception(result['error'])
+    return result['channel_id']
+
+
+def parse_channel_import_file(filename, content):
+    """Extract channel references from an OPML or CSV subscriptions export
+
+    Supports the YouTube/RSS-reader OPML format (feed URLs with channel_id=)
+    and CSV files such as the Google Takeout subscriptions.csv, where any cell
+    holding a channel ID, @handle or channel URL is picked up.
+    """
+    import csv
+    import io
+    import xml.etree.ElementTree as ET
+    from urllib.parse import parse_qs
+
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig', errors='replace')
+
+    references = []
+    name = (filename or '').lower()
+
+    if name.endswith(('.opml', '.xml')) or content.lstrip().startswith('<'):
+        try:
+            root = ET.fromstring(content)
+        except ET.ParseError as e:
+            raise Exception(f'Invalid OPML file: {e}')
+        for outline in root.iter('outline'):
+            feed_url = outline.get('xmlUrl') or ''
+            channel_ids = parse_qs(urlparse(feed_url).query).get('channel_id')
+            if channel_ids:
+                references.append(channel_ids[0])
+            elif outline.get('htmlUrl'):
+                references.append(outline.get('htmlUrl'))
+        return references
+
+    for row in csv.reader(io.StringIO(content)):
+        for cell in row:
+            cell = cell.strip()
+            if CHANNEL_ID_RE.match(cell) or cell.startswith('@') or 'youtube.com/' in cell:
+                references.append(cell)
+                break
+    return references
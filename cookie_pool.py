@@ -0,0 +1,173 @@
+import os
+import glob
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from yt_dlp.cookies import YoutubeDLCookieJar
+from rate_limiter import rate_limited, is_throttle_error, is_network_error
+
+# Cookie jars per platform, parsed once and shared in memory. A platform can
+# have several accounts: cookies/<stem>.txt, cookies/<stem>_<anything>.txt and
+# cookies/<stem>/*.txt. Requests rotate over the healthy jars (least recently
+# used first); a jar that gets throttled or bot-checked loses score and is
+# benched for a while, longer on repeated strikes, so the other accounts carry
+# the load. Files are re-read only when they change on disk. yt-dlp is only
+# ever given the in-memory jars (never a cookiefile), so it cannot rewrite them.
+COOKIES_DIR = os.environ.get('COOKIES_DIR', 'cookies')
+PLATFORM_COOKIE_STEMS = {
+    'youtube': ['youtube'],
+    'instagram': ['insta'],
+    'facebook': ['facebook'],
+    'twitter': ['x'],
+    'dailymotion': ['dailymotion'],
+    'vimeo': ['vimeo'],
+    'twitch': ['twitch'],
+    'rumble': ['rumble'],
+    'tiktok': ['tiktok', 'insta'],  # Instagram cookies as fallback when there are no TikTok jars
+}
+REFRESH_INTERVAL = 300
+BENCH_SECONDS = 120
+BOT_CHECK_BENCH_FACTOR = 4
+MAX_BENCH = 3600
+BOT_CHECK_MARKERS = ('not a bot', 'sign in to confirm', 'login required', 'checkpoint')
+
+_pools = {}  # platform -> {'jars': [...], 'refreshed': timestamp}
+_pool_lock = threading.Lock()
+_CHECKOUT = object()
+
+
+def _jar_paths(platform):
+    for stem in PLATFORM_COOKIE_STEMS.get(platform, []):
+        paths = [os.path.join(COOKIES_DIR, f'{stem}.txt')]
+        paths += sorted(glob.glob(os.path.join(COOKIES_DIR, f'{stem}_*.txt')))
+        paths += sorted(glob.glob(os.path.join(COOKIES_DIR, stem, '*.txt')))
+        paths = [path for path in paths if os.path.isfile(path)]
+        if paths:
+            return paths
+    return []
+
+
+def _load_jar(path):
+    jar = YoutubeDLCookieJar(path)
+    jar.load()
+    return jar
+
+
+def _refresh(platform, now):
+    """(Re)load the jars of a platform whose files are new or changed (lock must be held)"""
+    pool = _pools.setdefault(platform, {'jars': [], 'refreshed': 0})
+    known = {jar['path']: jar for jar in pool['jars']}
+    jars = []
+    for path in _jar_paths(platform):
+        mtime = os.path.getmtime(path)
+        jar = known.get(path)
+        if jar and jar['mtime'] == mtime:
+            jars.append(jar)
+            continue
+        try:
+            cookie_jar = _load_jar(path)
+        except Exception as e:
+            logging.warning(f"Could not load cookie jar {path}: {e}")
+            continue
+        if jar:
+            jar.update(jar=cookie_jar, mtime=mtime)  # Keep its health record
+        else:
+            jar = {'path': path, 'jar': cookie_jar, 'mtime': mtime, 'score': 1.0, 'strikes': 0,
+                   'benched_until': 0.0, 'last_used': 0.0, 'requests': 0, 'failures': 0}
+        jars.append(jar)
+    pool['jars'] = jars
+    pool['refreshed'] = now
+    return pool
+
+
+def checkout_jar(platform):
+    """Healthy cookie jar for a platform's next request, or None (no jars, or all benched)"""
+    now = time.time()
+    with _pool_lock:
+        pool = _pools.get(platform)
+        if not pool or now - pool['refreshed'] >= REFRESH_INTERVAL:
+            pool = _refresh(platform, now)
+        healthy = [jar for jar in pool['jars'] if jar['benched_until'] <= now]
+        if not healthy:
+            if pool['jars']:
+                logging.warning(f"⚠️ All {platform} cookie jars are benched, continuing without cookies")
+            return None
+        # Rotation: least recently used first; a recent strike pushes a jar back
+        jar = min(healthy, key=lambda j: (j['last_used'] - (1 - j['score']) * BENCH_SECONDS))
+        jar['last_used'] = now
+        jar['requests'] += 1
+        return jar
+
+
+def attach_cookie_jar(ydl, jar):
+    """Make a YoutubeDL use a pooled in-memory jar instead of parsing (and rewriting) a cookie file
+
+    jar None leaves a new YoutubeDL without cookies and clears them on a reused one.
+    """
+    cookie_jar = jar['jar'] if jar else None
+    current = ydl.__dict__.get('cookiejar')
+    if current is cookie_jar or (cookie_jar is None and (current is None or len(current) == 0)):
+        return ydl
+    if '_request_director' in ydl.__dict__:
+        # Network handlers of a reused instance were built around the previous jar
+        ydl._request_director.close()
+        del ydl._request_director
+    ydl.__dict__['cookiejar'] = cookie_jar if cookie_jar is not None else YoutubeDLCookieJar()  # yt-dlp's cached property
+    return ydl
+
+
+def report_jar(jar, error=None):
+    """Score a jar on a request's outcome; throttling and bot checks bench it
+
+    Network errors (no answer from the platform) leave the score unchanged.
+    """
+    if not jar or (error is not None and is_network_error(error)):
+        return
+    now = time.time()
+    with _pool_lock:
+        if error is None or not is_throttle_error(error):
+            jar['score'] = min(1.0, jar['score'] + 0.1)
+            jar['strikes'] = 0
+            return
+        bot_check = any(marker in str(error).lower() for marker in BOT_CHECK_MARKERS)
+        jar['failures'] += 1
+        jar['strikes'] += 1
+        jar['score'] = max(0.0, jar['score'] * 0.5)
+        bench = BENCH_SECONDS * 2 ** (jar['strikes'] - 1) * (BOT_CHECK_BENCH_FACTOR if bot_check else 1)
+        jar['benched_until'] = now + min(MAX_BENCH, bench)
+    logging.warning(f"⚠️ Benched cookie jar {jar['path']} for {min(MAX_BENCH, bench)}s "
+                    f"({'bot check' if bot_check else 'rate limited'})")
+
+
+@contextmanager
+def pooled_request(ydl, platform, jar=_CHECKOUT):
+    """Attach a cookie jar to ydl, pace the block for that jar and score it
+
+    jar defaults to the platform's next jar; pass one already checked out
+    (or None) to pick the YoutubeDL by jar first (see pooled_ydl) or to keep
+    the same account for a whole download.
+    """
+    if jar is _CHECKOUT:
+        jar = checkout_jar(platform)
+    attach_cookie_jar(ydl, jar)
+    with rate_limited(platform, jar['path'] if jar else None):
+        try:
+            yield jar
+        except Exception as e:
+            report_jar(jar, e)
+            raise
+        report_jar(jar)
+
+
+def cookie_pool_status():
+    """Jars per platform with their score and bench state"""
+    now = time.time()
+    with _pool_lock:
+        return {platform: [{
+            'path': jar['path'],
+            'score': round(jar['score'], 2),
+            'benched_for': max(0, round(jar['benched_until'] - now)),
+            'requests': jar['requests'],
+            'failures': jar['failures'],
+        } for jar in pool['jars']] for platform, pool in _pools.items()}
@@ -0,0 +1,190 @@
+import os
+import time
+import atexit
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import requests
+from urllib.parse import urlparse, urlunparse
+from media_probe import HEAD_BYTES, TAIL_BYTES, REQUEST_TIMEOUT, ranges_from_responses, build_direct_url_analysis, analyze_direct_url
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+    logging.warning("aiohttp not installed. Direct URLs are analyzed with threaded requests.")
+
+# Direct-URL detection and analysis. With aiohttp, HEAD, the head/tail range
+# probes and thumbnail discovery go out together on one shared connection pool
+# from a background event loop, so a direct URL costs one round trip; the
+# Flask routes call the sync wrappers. HEAD responses are kept briefly so the
+# platform detection and the metadata request that follows share one HEAD.
+HEAD_CACHE_TTL = 60
+SERVICE_TIMEOUT = 30
+THUMBNAIL_EXTS = ('.jpg', '.png', '.webp')
+MAX_CONNECTIONS = 32
+
+_head_cache = {}  # url -> (expires_at, headers)
+_head_cache_lock = threading.Lock()
+_loop = None
+_session = None
+_service_lock = threading.Lock()
+_requests_session = requests.Session()  # Connection reuse for the fallback path
+
+
+def _cached_head(url):
+    with _head_cache_lock:
+        entry = _head_cache.get(url)
+        if entry and entry[0] > time.time():
+            return entry[1]
+        _head_cache.pop(url, None)
+        return None
+
+
+def _store_head(url, headers):
+    with _head_cache_lock:
+        now = time.time()
+        for stale in [key for key, (expires_at, _) in _head_cache.items() if expires_at <= now]:
+            del _head_cache[stale]
+        _head_cache[url] = (now + HEAD_CACHE_TTL, headers)
+
+
+def _thumbnail_candidates(url):
+    """Images next to a media file that commonly serve as its thumbnail ('<name>.jpg', ...)"""
+    parsed = urlparse(url)
+    stem, ext = os.path.splitext(parsed.path)
+    if not ext:
+        return []
+    return [urlunparse(parsed._replace(path=stem + thumb_ext, query='', fragment='')) for thumb_ext in THUMBNAIL_EXTS]
+
+
+# --- asyncio service (aiohttp) ---
+
+def _get_loop():
+    """Background event loop with one shared aiohttp session (started on first use)"""
+    global _loop, _session
+    with _service_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='direct-url-service')
+            thread.daemon = True
+            thread.start()
+
+            async def create_session():
+                return aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=MAX_CONNECTIONS, ttl_dns_cache=300),
+                    timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+                )
+            _session = asyncio.run_coroutine_threadsafe(create_session(), loop).result()
+            _loop = loop
+            atexit.register(_close_session)
+        return _loop
+
+
+def _close_session():
+    try:
+        asyncio.run_coroutine_threadsafe(_session.close(), _loop).result(5)
+    except Exception as e:
+        logging.debug(f"Closing the direct URL session failed: {e}")
+
+
+def _run(coro, timeout=None):
+    """Run a coroutine on the service loop from a (Flask) thread and wait for its result
+
+    On timeout the coroutine is cancelled, so it does not keep running on the loop.
+    """
+    timeout = SERVICE_TIMEOUT if timeout is None else timeout
+    future = asyncio.run_coroutine_threadsafe(coro, _get_loop())
+    try:
+        return future.result(timeout)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        raise Exception(f"Direct URL request timed out after {timeout}s")
+
+
+async def _async_head(url):
+    headers = _cached_head(url)
+    if headers is not None:
+        return headers
+    async with _session.head(url, allow_redirects=True) as response:
+        response.raise_for_status()
+        headers = response.headers.copy()
+    _store_head(url, headers)
+    return headers
+
+
+async def _async_range(url, range_header, limit):
+    async with _session.get(url, headers={'Range': range_header}, allow_redirects=True) as response:
+        response.raise_for_status()
+        data = bytearray()
+        while len(data) < limit:
+            chunk = await response.content.read(limit - len(data))
+            if not chunk:
+                break
+            data += chunk
+        return response.status, response.headers.get('Content-Range'), bytes(data)
+
+
+async def _async_image_exists(url):
+    try:
+        async with _session.head(url, allow_redirects=True) as response:
+            return response.status == 200 and response.headers.get('Content-Type', '').startswith('image/')
+    except Exception:
+        return False
+
+
+async def _async_analyze(url):
+    start = time.time()
+    candidates = _thumbnail_candidates(url)
+    head, first, last, *found = await asyncio.gather(
+        _async_head(url),
+        _async_range(url, f'bytes=0-{HEAD_BYTES - 1}', HEAD_BYTES),
+        _async_range(url, f'bytes=-{TAIL_BYTES}', TAIL_BYTES),
+        *[_async_image_exists(candidate) for candidate in candidates],
+        return_exceptions=True,
+    )
+    if isinstance(head, Exception):
+        raise head
+
+    # ffprobe of the ranges is blocking (a subprocess): keep it off the event loop
+    analysis = await asyncio.get_running_loop().run_in_executor(
+        None, lambda: build_direct_url_analysis(url, head, lambda: ranges_from_responses(url, head, first, last), start))
+    analysis['thumbnails'] = [candidate for candidate, exists in zip(candidates, found) if exists is True]
+    return analysis
+
+
+# --- sync API for the Flask routes ---
+
+def head_direct_url(url):
+    """Response headers of a HEAD request (shared for HEAD_CACHE_TTL seconds)"""
+    if aiohttp:
+        return _run(_async_head(url))
+    headers = _cached_head(url)
+    if headers is None:
+        response = _requests_session.head(url, allow_redirects=True, timeout=5)
+        response.raise_for_status()
+        headers = response.headers
+        _store_head(url, headers)
+    return headers
+
+
+def is_direct_media_url(url):
+    """Whether the URL serves a video file or an HLS playlist"""
+    try:
+        content_type = head_direct_url(url).get('Content-Type', '').lower()
+    except Exception:
+        return False
+    return content_type.startswith('video') or 'mpegurl' in content_type
+
+
+def get_direct_url_analysis(url):
+    """Headers, partial-probe metadata and sibling thumbnails of a direct URL
+
+    Same result as media_probe.analyze_direct_url plus 'thumbnails'.
+    """
+    if aiohttp:
+        return _run(_async_analyze(url))
+    analysis = analyze_direct_url(url, known_headers=_cached_head(url))
+    analysis['thumbnails'] = []  # Discovery costs extra round trips without the async client
+    return analysis
@@ -0,0 +1,293 @@
+import os
+import glob
+import time
+import shutil
+import logging
+import threading
+from size_probe import DEFAULT_SIZE_LIMIT
+from job_workspace import JOBS_DIR_NAME, is_job_dir_open
+from download_registry import PARTIAL_DIR_NAME, prune_stale_partials
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Scratch space used by downloads. Every job reserves its estimated size before
+# it starts; a job that does not fit waits for running jobs to finish (and the
+# janitor to evict old artifacts) and is refused after RESERVATION_WAIT seconds.
+SCRATCH_ROOTS = ['downloads', 'db/*/downloads']
+MIN_FREE_BYTES = int(os.environ.get('DOWNLOAD_MIN_FREE_BYTES', str(1024 * 1024 * 1024)))
+SCRATCH_BUDGET_BYTES = int(os.environ.get('DOWNLOAD_SCRATCH_BYTES', '0') or 0)  # 0 = only free space counts
+RESERVATION_WAIT = int(os.environ.get('DOWNLOAD_RESERVATION_WAIT', '300'))
+
+# Janitor: artifacts (finished job dirs, stray videos and .info.json/.description
+# files) and partial downloads older than these are removed. Under space
+# pressure anything not in use and older than MIN_EVICT_AGE goes, oldest first.
+JANITOR_INTERVAL = int(os.environ.get('DOWNLOAD_JANITOR_INTERVAL', '600'))
+ARTIFACT_MAX_AGE = int(os.environ.get('DOWNLOAD_ARTIFACT_MAX_AGE', str(6 * 3600)))
+PARTIAL_MAX_AGE = int(os.environ.get('DOWNLOAD_PARTIAL_MAX_AGE', str(24 * 3600)))
+MIN_EVICT_AGE = 600
+JANITOR_LOCK_FILE = os.path.join('downloads', '.janitor.lock')  # Held by the process running the janitor
+
+# Directories inside a scratch root that are not janitor artifacts
+MANAGED_DIRS = {PARTIAL_DIR_NAME, '.cache', '.playlists'}  # .cache has its own LRU budget (download_cache); .playlists holds resume cursors
+
+_budget_lock = threading.Lock()
+_space_freed = threading.Condition(_budget_lock)
+_reservations = {}  # absolute job dir -> {'bytes', 'used', 'created_at'}
+_janitor_thread = None
+_janitor_lock_file = None
+
+
+def estimate_job_bytes(size, merged=False, fallback=DEFAULT_SIZE_LIMIT):
+    """Disk space a download needs: its size (or fallback), doubled when formats are merged
+
+    Merging keeps the downloaded video and audio next to the merged output
+    until the merge is done.
+    """
+    size = size or fallback
+    return int(size * 2 if merged else size)
+
+
+def _reserved_bytes():
+    """Space still to be written by running jobs (lock must be held)"""
+    return sum(max(0, r['bytes'] - r['used']) for r in _reservations.values())
+
+
+def _scratch_roots():
+    roots = []
+    for pattern in SCRATCH_ROOTS:
+        roots.extend(path for path in glob.glob(pattern) if os.path.isdir(path))
+    return roots
+
+
+def _free_bytes(path):
+    while path and not os.path.exists(path):
+        path = os.path.dirname(path)
+    return shutil.disk_usage(path or '.').free
+
+
+def _fits(size, path):
+    """Whether size more bytes fit next to the running jobs (lock must be held)"""
+    if _free_bytes(path) - _reserved_bytes() - size < MIN_FREE_BYTES:
+        return False
+    if SCRATCH_BUDGET_BYTES and scratch_usage() + _reserved_bytes() + size > SCRATCH_BUDGET_BYTES:
+        return False
+    return True
+
+
+def reserve_space(job_dir, size, wait=None):
+    """Reserve size bytes for a job before it downloads into job_dir
+
+    If the space is not available the janitor evicts what it can; then the
+    call waits up to `wait` seconds (default RESERVATION_WAIT) for other jobs
+    to release theirs and raises if the job still does not fit.
+    """
+    wait = RESERVATION_WAIT if wait is None else wait
+    deadline = time.time() + wait
+    evicted = False
+
+    with _budget_lock:
+        while not _fits(size, job_dir):
+            if not evicted:
+                _budget_lock.release()
+                try:
+                    run_janitor(needed=size)
+                finally:
+                    _budget_lock.acquire()
+                evicted = True
+                continue
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise Exception(
+                    f"Not enough disk space for this download (needs ~{size / (1024 * 1024):.0f} MB, "
+                    f"{_free_bytes(job_dir) / (1024 * 1024):.0f} MB free, "
+                    f"{_reserved_bytes() / (1024 * 1024):.0f} MB reserved by running jobs)"
+                )
+            logging.info(f"Waiting for disk space for {job_dir} ({size} bytes)")
+            _space_freed.wait(min(remaining, 30))
+
+        _reservations[os.path.abspath(job_dir)] = {'bytes': size, 'used': 0, 'created_at': time.time()}
+    return job_dir
+
+
+def record_usage(job_dir, used_bytes):
+    """Bytes a job has written so far; they now show up in the free space"""
+    with _budget_lock:
+        reservation = _reservations.get(os.path.abspath(job_dir))
+        if reservation:
+            reservation['used'] = used_bytes or 0
+
+
+def release_space(job_dir):
+    """Release a job's reservation (after it finished or failed)"""
+    with _budget_lock:
+        if job_dir and _reservations.pop(os.path.abspath(job_dir), None):
+            _space_freed.notify_all()
+
+
+def scratch_usage():
+    """Bytes currently stored in the scratch roots"""
+    total = 0
+    for root in _scratch_roots():
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, name))
+                except OSError:
+                    pass
+    return total
+
+
+def disk_status(path='downloads'):
+    """Free space, reservations and janitor settings"""
+    with _budget_lock:
+        return {
+            'free_bytes': _free_bytes(path),
+            'reserved_bytes': _reserved_bytes(),
+            'reservations': len(_reservations),
+            'min_free_bytes': MIN_FREE_BYTES,
+            'scratch_budget_bytes': SCRATCH_BUDGET_BYTES,
+        }
+
+
+def _last_used(path):
+    """Newest mtime/ctime under path (yt-dlp may set mtime to the upload date, ctime is local)"""
+    stat = os.stat(path)
+    newest = max(stat.st_mtime, stat.st_ctime)
+    if os.path.isdir(path):
+        for dirpath, _, filenames in os.walk(path):
+            for name in filenames:
+                try:
+                    stat = os.stat(os.path.join(dirpath, name))
+                except OSError:
+                    continue
+                newest = max(newest, stat.st_mtime, stat.st_ctime)
+    return newest
+
+
+def _path_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(dirpath, name))
+        for dirpath, _, filenames in os.walk(path) for name in filenames
+        if os.path.exists(os.path.join(dirpath, name))
+    )
+
+
+def _artifacts(root):
+    """Evictable artifacts of a scratch root as (last_used, size, path)"""
+    with _budget_lock:
+        reserved = set(_reservations)
+
+    candidates = []
+    jobs_dir = os.path.join(root, JOBS_DIR_NAME)
+    paths = [os.path.join(jobs_dir, name) for name in os.listdir(jobs_dir)] if os.path.isdir(jobs_dir) else []
+    paths += [os.path.join(root, name) for name in os.listdir(root)
+              if name not in MANAGED_DIRS and name != JOBS_DIR_NAME]
+
+    for path in paths:
+        if os.path.abspath(path) in reserved or (os.path.dirname(path) == jobs_dir and is_job_dir_open(path)):
+            continue
+        try:
+            candidates.append((_last_used(path), _path_size(path), path))
+        except OSError:
+            continue
+    return candidates
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def _under_pressure(needed=0):
+    with _budget_lock:
+        roots = _scratch_roots() or ['downloads']
+        return not _fits(needed, roots[0])
+
+
+def run_janitor(needed=0, now=None):
+    """Remove stale downloads; under space pressure also evict the oldest idle artifacts
+
+    needed is the size of a job waiting for space. Returns the number of bytes freed.
+    """
+    now = now or time.time()
+    freed = 0
+    candidates = []
+
+    for root in _scratch_roots():
+        freed += prune_stale_partials(root, PARTIAL_MAX_AGE, now)
+        for last_used, size, path in _artifacts(root):
+            if now - last_used >= ARTIFACT_MAX_AGE:
+                _remove(path)
+                freed += size
+                logging.info(f"Janitor removed stale {path} ({size} bytes)")
+            elif now - last_used >= MIN_EVICT_AGE:
+                candidates.append((last_used, size, path))
+
+    # Under pressure: finished artifacts first (oldest first), then resumable partials
+    if _under_pressure(needed):
+        for last_used, size, path in sorted(candidates):
+            _remove(path)
+            freed += size
+            logging.info(f"Janitor evicted {path} ({size} bytes) to free disk space")
+            if not _under_pressure(needed):
+                break
+        else:
+            for root in _scratch_roots():
+                freed += prune_stale_partials(root, MIN_EVICT_AGE, now)
+
+    if freed:
+        with _budget_lock:
+            _space_freed.notify_all()
+    return freed
+
+
+def _janitor_loop():
+    while True:
+        try:
+            run_janitor()
+        except Exception as e:
+            logging.error(f"Download janitor error: {e}")
+        time.sleep(JANITOR_INTERVAL)
+
+
+def _claim_janitor():
+    """Take the cross-process janitor lock (gunicorn workers, reloader); False if another process has it"""
+    global _janitor_lock_file
+    if fcntl is None:
+        return True
+    os.makedirs(os.path.dirname(JANITOR_LOCK_FILE) or '.', exist_ok=True)
+    lock_file = open(JANITOR_LOCK_FILE, 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    _janitor_lock_file = lock_file  # Kept open: the lock lasts as long as this process
+    return True
+
+
+def start_janitor():
+    """Start the background janitor thread, unless this or another process already runs one
+
+    Called from app startup (not on import). Returns whether this process runs the janitor.
+    """
+    global _janitor_thread
+    with _budget_lock:
+        if _janitor_thread and _janitor_thread.is_alive():
+            return True
+        if not _claim_janitor():
+            logging.info("🧹 Download janitor runs in another process")
+            return False
+        _janitor_thread = threading.Thread(target=_janitor_loop, name='download-janitor')
+        _janitor_thread.daemon = True
+        _janitor_thread.start()
+    logging.info("🧹 Download janitor started")
+    return True
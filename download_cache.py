@@ -0,0 +1,202 @@
+import os
+import copy
+import time
+import shutil
+import hashlib
+import logging
+import threading
+
+# Optional LRU disk cache of finished downloads, keyed by (extractor, video id,
+# format id, download purpose): purposes write different sidecars and are
+# post-processed differently, so they never share a file. Disabled unless
+# DOWNLOAD_CACHE_BYTES is set to a byte budget.
+DOWNLOAD_CACHE_DIR = os.environ.get('DOWNLOAD_CACHE_DIR', 'downloads/.cache')
+DOWNLOAD_CACHE_BYTES = int(os.environ.get('DOWNLOAD_CACHE_BYTES', '0') or 0)
+SHARED_DOWNLOAD_WAIT = float(os.environ.get('SHARED_DOWNLOAD_WAIT', '900'))  # Max wait for an in-flight download
+
+_cache_lock = threading.Lock()
+_entries = None  # digest -> {'path', 'size', 'last_used', 'refs'}
+_inflight = {}   # digest -> {'event', 'error'} of the download in progress
+
+
+def cache_enabled():
+    return DOWNLOAD_CACHE_BYTES > 0
+
+
+def cache_key(info, format_id=None, purpose=None):
+    """(extractor, video id, format id[, purpose]) of an info dict, or None if it cannot be identified"""
+    extractor = info.get('extractor_key') or info.get('extractor')
+    video_id = info.get('id')
+    format_id = format_id or info.get('format_id')
+    if not (extractor and video_id and format_id):
+        return None
+    key = (extractor.lower(), str(video_id), str(format_id))
+    return key + (purpose,) if purpose else key
+
+
+def resolve_cache_key(ydl, info, purpose):
+    """Cache key of the format yt-dlp will select for info and a download purpose, or None when caching is off"""
+    if not cache_enabled():
+        return None
+    try:
+        selected = ydl.process_ie_result(copy.deepcopy(info), download=False)
+    except Exception as e:
+        logging.debug(f"Could not resolve format for download cache: {e}")
+        return None
+    return cache_key(selected, purpose=purpose) if selected else None
+
+
+def _digest(key):
+    return hashlib.sha256('\0'.join(key).encode()).hexdigest()[:32]
+
+
+def _load_entries():
+    """Index of cached files, rebuilt from the cache directory on first use (lock must be held)"""
+    global _entries
+    if _entries is None:
+        _entries = {}
+        os.makedirs(DOWNLOAD_CACHE_DIR, exist_ok=True)
+        for name in os.listdir(DOWNLOAD_CACHE_DIR):
+            digest, _, ext = name.partition('.')
+            path = os.path.join(DOWNLOAD_CACHE_DIR, name)
+            if len(digest) == 32 and ext and not ext.endswith('.tmp') and os.path.isfile(path):
+                stat = os.stat(path)
+                _entries[digest] = {'path': path, 'size': stat.st_size, 'last_used': stat.st_mtime, 'refs': 0}
+    return _entries
+
+
+def _evict(entries, budget):
+    """Remove least recently used, unreferenced files until the cache fits the budget (lock must be held)"""
+    total = sum(entry['size'] for entry in entries.values())
+    for digest, entry in sorted(entries.items(), key=lambda item: item[1]['last_used']):
+        if total <= budget:
+            break
+        if entry['refs'] > 0:
+            continue
+        try:
+            os.remove(entry['path'])
+        except FileNotFoundError:
+            pass
+        total -= entry['size']
+        del entries[digest]
+        logging.info(f"Evicted cached download {os.path.basename(entry['path'])} ({entry['size']} bytes)")
+
+
+def _publish(digest, source_path):
+    """Atomically move a finished download into the cache and return its cache path"""
+    ext = os.path.splitext(source_path)[1] or '.bin'
+    cache_path = os.path.join(DOWNLOAD_CACHE_DIR, digest + ext)
+    try:
+        os.replace(source_path, cache_path)
+    except OSError:
+        # Different filesystem: copy next to the target, then rename into place
+        tmp_path = cache_path + '.tmp'
+        shutil.copy2(source_path, tmp_path)
+        os.replace(tmp_path, cache_path)
+        os.remove(source_path)
+
+    with _cache_lock:
+        entries = _load_entries()
+        entries[digest] = {'path': cache_path, 'size': os.path.getsize(cache_path), 'last_used': time.time(), 'refs': 1}
+        _evict(entries, DOWNLOAD_CACHE_BYTES)
+    return cache_path
+
+
+def _acquire(digest):
+    """Take a reference on a cached file and return its path, or None (lock must be held)"""
+    entry = _load_entries().get(digest)
+    if not entry:
+        return None
+    if not os.path.exists(entry['path']):
+        del _entries[digest]
+        return None
+    entry['refs'] += 1
+    entry['last_used'] = time.time()
+    return entry['path']
+
+
+def _release(digest):
+    with _cache_lock:
+        entry = _load_entries().get(digest)
+        if entry:
+            entry['refs'] = max(0, entry['refs'] - 1)
+            try:
+                os.utime(entry['path'])  # Keeps LRU order across restarts
+            except OSError:
+                pass
+            _evict(_entries, DOWNLOAD_CACHE_BYTES)
+
+
+def _materialize(cache_path, target_path):
+    """Hard-link (or copy) a cached file to target_path; callers may delete their copy freely"""
+    os.makedirs(os.path.dirname(target_path) or '.', exist_ok=True)
+    if os.path.exists(target_path):
+        os.remove(target_path)
+    try:
+        os.link(cache_path, target_path)
+    except OSError:
+        shutil.copy2(cache_path, target_path)
+    return target_path
+
+
+def fetch_download(key, target_stem, produce):
+    """Return target_stem + ext for a cached download, downloading it at most once
+
+    produce() downloads the file and returns its path. Concurrent calls for the
+    same key wait (up to SHARED_DOWNLOAD_WAIT seconds) for a single in-flight
+    produce() (single-flight). The result
+    is published atomically into the cache, and each caller gets its own hard
+    link (or copy) at target_stem + ext, so deleting it after an upload never
+    touches the cache. Falls back to produce() when the cache is disabled.
+    """
+    if not cache_enabled() or not key:
+        return produce()
+
+    digest = _digest(key)
+    while True:
+        with _cache_lock:
+            cache_path = _acquire(digest)
+            if cache_path:
+                break
+            flight = _inflight.get(digest)
+            leader = flight is None
+            if leader:
+                flight = _inflight[digest] = {'event': threading.Event(), 'error': None}
+
+        if not leader:
+            if not flight['event'].wait(SHARED_DOWNLOAD_WAIT):
+                raise Exception(f"Shared download did not finish within {int(SHARED_DOWNLOAD_WAIT)}s")
+            if flight['error']:
+                raise Exception(f"Shared download failed: {flight['error']}")
+            continue  # Take our reference on the published file
+
+        try:
+            logging.info(f"Download cache miss for {key}")
+            cache_path = _publish(digest, produce())
+            break
+        except Exception as e:
+            flight['error'] = str(e)
+            raise
+        finally:
+            with _cache_lock:
+                _inflight.pop(digest, None)
+            flight['event'].set()
+
+    try:
+        ext = os.path.splitext(cache_path)[1]
+        return _materialize(cache_path, target_stem + ext)
+    finally:
+        _release(digest)
+
+
+def cache_stats():
+    """Current cache usage"""
+    with _cache_lock:
+        entries = _load_entries() if cache_enabled() else {}
+        return {
+            'enabled': cache_enabled(),
+            'files': len(entries),
+            'bytes': sum(entry['size'] for entry in entries.values()),
+            'budget': DOWNLOAD_CACHE_BYTES,
+            'in_use': sum(1 for entry in entries.values() if entry['refs'] > 0),
+        }
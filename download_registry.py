@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from urllib.parse import urlparse, parse_qsl, urlencode
+from job_workspace import output_filename_stem
+
+# Partial downloads live under <partial_root>/.partial with names derived from
+# the canonical URL and format, so a retried or restarted job finds (and
+# yt-dlp continues) the same .part file even if the video title changed.
+PARTIAL_DIR_NAME = '.partial'
+REGISTRY_FILE = 'registry.json'
+SAVE_INTERVAL = 2.0
+SAME_KEY_WAIT = float(os.environ.get('SAME_DOWNLOAD_WAIT', '900'))  # Max wait for another job on the same partial
+
+TRACKING_PARAMS = {'si', 'feature', 'fbclid', 'igshid', 'igsh', 'ref', 'ref_src', 'pp', 'ab_channel'}
+
+_registry_lock = threading.Lock()
+_jobs_changed = threading.Condition(_registry_lock)
+_last_saved = {}
+_active_jobs = set()
+
+
+def canonicalize_url(url):
+    """Stable form of a video URL: lowercase host without www/m, no fragment or tracking params"""
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or '').lower()
+    for prefix in ('www.', 'm.'):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+
+    query = [(k, v) for k, v in parse_qsl(parsed.query) if k not in TRACKING_PARAMS and not k.startswith('utm_')]
+    path = parsed.path.rstrip('/') or '/'
+
+    # All YouTube URL shapes of a video map to the watch URL
+    if host == 'youtu.be':
+        return f"youtube.com/watch?v={path.strip('/')}"
+    if host.endswith('youtube.com'):
+        if path.startswith('/shorts/') or path.startswith('/live/'):
+            return f"youtube.com/watch?v={path.split('/')[2]}"
+        video_id = dict(query).get('v')
+        if path == '/watch' and video_id:
+            return f"youtube.com/watch?v={video_id}"
+
+    canonical = f"{host}{path}"
+    if query:
+        canonical += '?' + urlencode(sorted(query))
+    return canonical
+
+
+def download_key(url, format_spec):
+    """Key of a download job: hash of canonical URL + requested format"""
+    return hashlib.sha1(f"{canonicalize_url(url)}|{format_spec or ''}".encode()).hexdigest()[:20]
+
+
+def _is_partial_file(name):
+    """yt-dlp .part/.part-FragN/.ytdl files and segmented-download state"""
+    return '.part' in name or '.segpart' in name or name.endswith('.ytdl')
+
+
+def _partial_dir(root):
+    return os.path.join(root, PARTIAL_DIR_NAME)
+
+
+def _load_registry(root):
+    """Registry of partial downloads for an output directory (lock must be held)"""
+    try:
+        with open(os.path.join(_partial_dir(root), REGISTRY_FILE), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_registry(root, registry):
+    """Write the registry atomically (lock must be held)"""
+    registry_path = os.path.join(_partial_dir(root), REGISTRY_FILE)
+    tmp_path = registry_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(registry, f)
+    os.replace(tmp_path, registry_path)
+    _last_saved[root] = time.time()
+
+
+def _update_entry(root, key, fields, force=True):
+    with _registry_lock:
+        if not force and time.time() - _last_saved.get(root, 0) < SAVE_INTERVAL:
+            return
+        registry = _load_registry(root)
+        registry[key] = {**registry.get(key, {}), **fields, 'updated_at': time.time()}
+        _save_registry(root, registry)
+
+
+def start_download(url, format_spec, output_path='downloads', partial_root=None):
+    """Register a download job and return it with a stable yt-dlp output template
+
+    Partial files live under <partial_root>/.partial (default: output_path), so
+    jobs writing their result into per-job directories still share partials.
+    If an earlier attempt of the same URL + format left a partial file, the job
+    reuses its path and reports the bytes already on disk in 'resumed_bytes'.
+    A job for the same URL + format that is still running is waited for up to
+    SAME_KEY_WAIT seconds, then this one fails instead of blocking forever.
+    """
+    root = partial_root or output_path
+    key = download_key(url, format_spec)
+    partial_dir = _partial_dir(root)
+    os.makedirs(partial_dir, exist_ok=True)
+
+    with _registry_lock:
+        # Two writers on one partial file would corrupt it: wait for the running job
+        deadline = time.time() + SAME_KEY_WAIT
+        while (root, key) in _active_jobs:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise Exception("Another download of this video and format is still running, try again later")
+            _jobs_changed.wait(remaining)
+        _active_jobs.add((root, key))
+        previous = _load_registry(root).get(key, {})
+
+    resumed_bytes = 0
+    if previous.get('status') in ('downloading', 'failed'):
+        resumed_bytes = sum(
+            os.path.getsize(os.path.join(partial_dir, name))
+            for name in os.listdir(partial_dir)
+            if name.startswith(key + '.') and _is_partial_file(name) and not name.endswith('.json')
+        )
+        if resumed_bytes:
+            logging.info(f"Resuming partial download of {url} ({resumed_bytes} bytes on disk)")
+
+    _update_entry(root, key, {
+        'url': url,
+        'canonical_url': canonicalize_url(url),
+        'format': format_spec,
+        'status': 'downloading',
+        'bytes_done': resumed_bytes,
+        'total_bytes': previous.get('total_bytes'),
+        'started_at': previous.get('started_at') or time.time(),
+    })
+
+    return {
+        'key': key,
+        'url': url,
+        'root': root,
+        'output_path': output_path,
+        'partial_dir': partial_dir,
+        'outtmpl': os.path.join(partial_dir, f'{key}.%(ext)s'),
+        'resumed_bytes': resumed_bytes,
+    }
+
+
+def record_progress(job, d):
+    """yt-dlp progress hook payload -> bytes completed in the registry (throttled)"""
+    if d.get('status') != 'downloading':
+        return
+    _update_entry(job['root'], job['key'], {
+        'bytes_done': d.get('downloaded_bytes') or 0,
+        'total_bytes': d.get('total_bytes') or d.get('total_bytes_estimate'),
+    }, force=False)
+
+
+def final_stem(job, info):
+    """Final path of a job without extension: '<output_path>/<title> [<id>]'"""
+    return os.path.join(job['output_path'], output_filename_stem(info))
+
+
+def finish_download(job, filepath, info):
+    """Move a finished download (and its sidecar files) out of the partial dir
+
+    The final name is '<title> [<id>].<ext>' in the job's output path.
+    Returns the final file path (filepath itself when it is not in the
+    partial dir, e.g. a cached copy).
+    """
+    stem = final_stem(job, info)
+    final_path = filepath
+    prefix = job['key'] + '.'
+    for name in os.listdir(job['partial_dir']):
+        if not name.startswith(prefix) or _is_partial_file(name):
+            continue
+        source = os.path.join(job['partial_dir'], name)
+        target = stem + name[len(job['key']):]
+        os.replace(source, target)
+        if os.path.abspath(source) == os.path.abspath(filepath):
+            final_path = target
+
+    _remove_entry(job)
+    return final_path
+
+
+def fail_download(job, error):
+    """Keep the partial file for the next attempt and record why this one stopped"""
+    _update_entry(job['root'], job['key'], {'status': 'failed', 'error': str(error)[:500]})
+    with _registry_lock:
+        _active_jobs.discard((job['root'], job['key']))
+        _jobs_changed.notify_all()
+
+
+def discard_download(job):
+    """Drop a job that will not be retried (e.g. rejected by the size check) with its partial files"""
+    prefix = job['key'] + '.'
+    for name in os.listdir(job['partial_dir']):
+        if name.startswith(prefix):
+            os.remove(os.path.join(job['partial_dir'], name))
+    _remove_entry(job)
+
+
+def _remove_entry(job):
+    with _registry_lock:
+        registry = _load_registry(job['root'])
+        registry.pop(job['key'], None)
+        _save_registry(job['root'], registry)
+        _active_jobs.discard((job['root'], job['key']))
+        _jobs_changed.notify_all()
+
+
+def list_partial_downloads(root='downloads'):
+    """Registered partial downloads under a partial root"""
+    with _registry_lock:
+        return _load_registry(root)
+
+
+def prune_stale_partials(root, max_age, now=None):
+    """Remove partial files of jobs that stopped more than max_age seconds ago
+
+    Jobs that are currently running are never touched. Returns bytes freed.
+    """
+    partial_dir = _partial_dir(root)
+    if not os.path.isdir(partial_dir):
+        return 0
+    now = now or time.time()
+    freed = 0
+
+    with _registry_lock:
+        registry = _load_registry(root)
+        active = {key for job_root, key in _active_jobs if job_root == root}
+        pruned = set()
+        for name in os.listdir(partial_dir):
+            key = name.split('.', 1)[0]
+            if name.startswith(REGISTRY_FILE) or key in active:
+                continue
+            path = os.path.join(partial_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entry = registry.get(key)
+            last_used = entry.get('updated_at', 0) if entry else max(stat.st_mtime, stat.st_ctime)
+            if now - last_used < max_age:
+                continue
+            os.remove(path)
+            freed += stat.st_size
+            pruned.add(key)
+
+        # Entries whose files are gone (pruned here or removed by hand)
+        pruned.update(key for key, entry in registry.items()
+                      if key not in active and now - entry.get('updated_at', 0) >= max_age)
+        if pruned & registry.keys():
+            for key in pruned:
+                registry.pop(key, None)
+            _save_registry(root, registry)
+
+    if freed:
+        logging.info(f"Pruned {len(pruned)} stale partial download(s) in {root} ({freed} bytes)")
+    return freed
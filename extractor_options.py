@@ -0,0 +1,134 @@
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import yt_dlp
+
+# Options of the extraction-only YoutubeDL instances (nothing is downloaded),
+# built in one place per purpose and platform. Cookies are not part of the
+# options: they come from the cookie pool, attached per request.
+#
+# Constructing a YoutubeDL initializes its extractors and network handlers, so
+# instances are kept per thread, keyed by a fingerprint of their options and
+# the cookie jar they use (network handlers are built around the jar), and
+# reused by the next extraction with the same options and jar on that thread
+# (batch and playlist workers, long-lived server threads). Options that vary
+# per call (PER_CALL_OPTIONS) are set for the call only and do not split the pool.
+EXTRACTION_PURPOSES = {
+    'formats': {
+        'quiet': True,
+        'no_warnings': True,
+        'extract_flat': False,
+        'skip_download': True,
+        'no_check_certificate': True,
+    },
+    'metadata': {
+        'quiet': True,
+        'no_warnings': True,
+        'extract_flat': False,
+        'writeinfojson': False,
+        'writedescription': False,
+        'retries': 2,
+        'socket_timeout': 10,
+        'ignoreerrors': False,  # Errors must raise so throttling (429, bot checks) is recognized
+        'ignore_no_formats_error': True,  # Metadata does not depend on the format being available
+    },
+    'qualities': {
+        'quiet': True,
+        'no_warnings': True,
+        'listformats': False,  # We want actual format data, not just list
+        'extract_flat': False,
+    },
+}
+PLATFORM_EXTRACTOR_OPTIONS = {
+    'rumble': {'extractor_retries': 5},
+    'deadtoons': {'extractor_retries': 5},
+    'cybervynx': {'extractor_retries': 5},
+    'voe': {'extractor_retries': 5},
+    'filemoon': {'extractor_retries': 5},
+    'newerstream': {'extractor_retries': 5},
+    'shortic': {'extractor_retries': 5},
+    'smoothpre': {'extractor_retries': 5},
+}
+PER_CALL_OPTIONS = ('format',)
+MAX_POOLED_PER_THREAD = 16
+
+_local = threading.local()
+_MISSING = object()
+
+
+def build_extractor_options(platform, purpose):
+    """yt-dlp options for an extraction purpose ('formats', 'metadata', 'qualities') on a platform"""
+    if purpose not in EXTRACTION_PURPOSES:
+        raise Exception(f"Unknown extraction purpose: {purpose}")
+    return {**EXTRACTION_PURPOSES[purpose], **PLATFORM_EXTRACTOR_OPTIONS.get(platform, {})}
+
+
+def options_fingerprint(options):
+    return hashlib.sha1(json.dumps(options, sort_keys=True, default=repr).encode()).hexdigest()
+
+
+def _thread_pool():
+    if not hasattr(_local, 'instances'):
+        _local.instances = OrderedDict()  # fingerprint -> YoutubeDL, least recently used first
+    return _local.instances
+
+
+@contextmanager
+def pooled_ydl(options, jar_path=None, **call_options):
+    """A YoutubeDL with these options, reused across calls on this thread with the same cookie jar
+
+    jar_path is the path of the pooled jar the instance will be given (see
+    checkout_jar / pooled_request), None for none. call_options (only
+    PER_CALL_OPTIONS, e.g. format) apply to this call only.
+    """
+    unknown = set(call_options) - set(PER_CALL_OPTIONS)
+    if unknown:
+        raise Exception(f"Not per-call options: {', '.join(sorted(unknown))}")
+
+    instances = _thread_pool()
+    key = (options_fingerprint(options), jar_path)
+    ydl = instances.pop(key, None)  # Taken out while in use, so a nested call gets its own
+    if ydl is None:
+        ydl = yt_dlp.YoutubeDL(dict(options))
+
+    saved = {name: ydl.params.get(name, _MISSING) for name in call_options}
+    saved_selector = ydl.format_selector
+    ydl.params.update(call_options)
+    if 'format' in call_options:
+        # yt-dlp builds the selector from params['format'] in __init__ only
+        ydl.format_selector = ydl.build_format_selector(call_options['format'])
+    try:
+        yield ydl
+    finally:
+        for name, value in saved.items():
+            if value is _MISSING:
+                ydl.params.pop(name, None)
+            else:
+                ydl.params[name] = value
+        ydl.format_selector = saved_selector
+        _return_instance(instances, key, ydl)
+
+
+def _return_instance(instances, key, ydl):
+    if key in instances:
+        _close(ydl)  # A nested call already returned one for these options
+        return
+    instances[key] = ydl
+    while len(instances) > MAX_POOLED_PER_THREAD:
+        _, oldest = instances.popitem(last=False)
+        _close(oldest)
+
+
+def _close(ydl):
+    try:
+        ydl.close()
+    except Exception as e:
+        logging.debug(f"Closing pooled YoutubeDL failed: {e}")
+
+
+def pooled_instance_count():
+    """Number of YoutubeDL instances pooled on the current thread"""
+    return len(_thread_pool())
@@ -0,0 +1,184 @@
+import logging
+
+# Target bitrates (kbps) per resolution - reasonable quality without waste
+TARGET_BITRATES = {
+    2160: 15000,  # 4K: 15 Mbps target
+    1440: 10000,  # 1440p: 10 Mbps target
+    1080: 6000,   # 1080p: 6 Mbps target
+    720: 4000,    # 720p: 4 Mbps target
+    480: 2000,    # 480p: 2 Mbps target
+    360: 1000,    # 360p: 1 Mbps target
+}
+DEFAULT_TARGET_BITRATE = 5000
+DEFAULT_DURATION = 180  # 3 minutes when the extractor gives no duration
+
+# Codec preferences (efficient and compatible codecs first)
+CODEC_BONUS = {
+    'h264': 200,
+    'vp9': 150,  # VP9 is efficient
+    'av1': 100,  # AV1 is very efficient but less compatible
+    'other': 0,
+}
+MP4_BONUS = 500
+
+
+def codec_class(vcodec):
+    """Classify a yt-dlp vcodec string into h264/vp9/av1/other"""
+    vcodec = (vcodec or '').lower()
+    if 'avc1' in vcodec or 'h264' in vcodec or 'x264' in vcodec:
+        return 'h264'
+    if 'vp9' in vcodec:
+        return 'vp9'
+    if 'av01' in vcodec:
+        return 'av1'
+    return 'other'
+
+
+def is_video_format(fmt):
+    """Formats that carry a video stream with a known height"""
+    return bool(fmt.get('height')) and fmt.get('vcodec') != 'none'
+
+
+def build_format_columns(formats):
+    """Turn a list of yt-dlp format dicts into column lists (one pass over the formats)"""
+    columns = {
+        'format': [],
+        'format_id': [],
+        'height': [],
+        'tbr': [],
+        'filesize': [],
+        'codec': [],
+        'ext': [],
+    }
+    for fmt in formats:
+        columns['format'].append(fmt)
+        columns['format_id'].append(fmt.get('format_id'))
+        columns['height'].append(fmt.get('height') or 0)
+        columns['tbr'].append(fmt.get('tbr', 0) or fmt.get('vbr', 0) or 0)
+        columns['filesize'].append(fmt.get('filesize') or fmt.get('filesize_approx') or 0)
+        columns['codec'].append(codec_class(fmt.get('vcodec')))
+        columns['ext'].append(fmt.get('ext'))
+    return columns
+
+
+def score_format_columns(columns, duration=None):
+    """Score every format in the columns at once
+
+    Prefers formats with size/bitrate info, bitrates close to (not far above)
+    the resolution target, smaller files per minute, mp4 and efficient codecs.
+    """
+    duration = duration or DEFAULT_DURATION
+    minutes = duration / 60 if duration > 0 else None
+    mib = 1024 * 1024
+
+    scores = []
+    for height, tbr, filesize, codec, ext in zip(
+        columns['height'], columns['tbr'], columns['filesize'], columns['codec'], columns['ext']
+    ):
+        score = 0
+        target = TARGET_BITRATES.get(height, DEFAULT_TARGET_BITRATE)
+
+        # Heavily prefer formats with filesize info, then smaller files per minute
+        if filesize > 0:
+            size_per_min = filesize / minutes if minutes else filesize
+            score += 10000 - int(size_per_min / mib)
+
+        # Prefer bitrates near the target; penalize very high bitrates
+        if tbr > 0:
+            score += 5000
+            if tbr <= target * 1.5:
+                score += 2000 + int((target * 1.5 - tbr) / 100)
+            else:
+                score -= int(abs(tbr - target) / 100)
+
+        if ext == 'mp4':
+            score += MP4_BONUS
+        score += CODEC_BONUS[codec]
+        scores.append(score)
+    return scores
+
+
+def rank_formats(formats, duration=None):
+    """Rank all video formats and pick the best representative for each height
+
+    Returns a dict with:
+      ranking        - entries sorted by height desc, then score desc (ties keep extractor order)
+      best_by_height - the first ranking entry of each height, highest first
+      by_id          - format_id -> entry for every format (video or not)
+    Each entry is {'format', 'format_id', 'height', 'tbr', 'filesize', 'score'}.
+    """
+    formats = formats or []
+    columns = build_format_columns(formats)
+    video_rows = [i for i, fmt in enumerate(formats) if is_video_format(fmt)]
+    video_columns = {name: [values[i] for i in video_rows] for name, values in columns.items()}
+    scores = score_format_columns(video_columns, duration)
+
+    entries = [
+        {
+            'format': video_columns['format'][i],
+            'format_id': video_columns['format_id'][i],
+            'height': video_columns['height'][i],
+            'tbr': video_columns['tbr'][i],
+            'filesize': video_columns['filesize'][i],
+            'score': scores[i],
+            'order': i,
+        }
+        for i in range(len(video_rows))
+    ]
+    ranking = sorted(entries, key=lambda e: (-e['height'], -e['score'], e['order']))
+
+    best_by_height = []
+    for entry in ranking:
+        if not best_by_height or best_by_height[-1]['height'] != entry['height']:
+            best_by_height.append(entry)
+
+    by_id = {}
+    for i, fmt in enumerate(formats):
+        format_id = columns['format_id'][i]
+        if format_id is not None and format_id not in by_id:
+            by_id[format_id] = {
+                'format': fmt,
+                'format_id': format_id,
+                'height': columns['height'][i],
+                'tbr': columns['tbr'][i],
+                'filesize': columns['filesize'][i],
+                'score': None,
+                'order': i,
+            }
+    for entry in entries:
+        by_id[entry['format_id']] = entry
+
+    return {
+        'ranking': ranking,
+        'best_by_height': best_by_height,
+        'by_id': by_id,
+    }
+
+
+def height_alternatives(ranking, height, limit=2):
+    """Runner-up entries for a height (for debug logging)"""
+    alternatives = [entry for entry in ranking['ranking'] if entry['height'] == height]
+    return alternatives[1:1 + limit]
+
+
+def log_height_selection(ranking, entry):
+    """Debug-log the selected format of a height and its closest alternatives"""
+    if not logging.getLogger().isEnabledFor(logging.DEBUG):
+        return
+    alternatives = height_alternatives(ranking, entry['height'])
+    if not alternatives:
+        return
+    logging.debug(f"Selected {entry['height']}p format: bitrate={entry['tbr']}kbps, size={entry['filesize']}bytes, score={entry['score']}")
+    for alt in alternatives:
+        logging.debug(f"  Alternative {alt['height']}p: bitrate={alt['tbr']}kbps, size={alt['filesize']}bytes, score={alt['score']}")
+
+
+def best_quality_format_id(ranking):
+    """Highest resolution format, largest file first within the same height"""
+    best = None
+    for entry in ranking['ranking']:
+        if best is not None and entry['height'] != best['height']:
+            break
+        if best is None or (entry['filesize'], -entry['order']) > (best['filesize'], -best['order']):
+            best = entry
+    return best['format_id'] if best else None
@@ -0,0 +1,76 @@
+import copy
+import time
+import secrets
+import threading
+
+from format_ranking import rank_formats
+
+# Direct media URLs from extractors expire (YouTube after a few hours), so
+# selections are only reused for a short time after the quality listing
+SELECTION_TTL = 15 * 60
+MAX_SELECTIONS = 100
+
+_selections = {}
+_selections_lock = threading.Lock()
+
+
+def _prune_selections(now):
+    """Drop expired selections and the oldest ones beyond MAX_SELECTIONS (lock must be held)"""
+    for token in [t for t, entry in _selections.items() if entry['expires_at'] <= now]:
+        del _selections[token]
+    while len(_selections) > MAX_SELECTIONS:
+        del _selections[next(iter(_selections))]
+
+
+def _format_summary(entry):
+    """Resolved format dict, direct media URLs and size of a ranked format"""
+    fmt = entry['format']
+    requested = fmt.get('requested_formats') or [fmt]
+    return {
+        'format': fmt,
+        'urls': [f.get('url') for f in requested if f.get('url')],
+        'filesize': entry['filesize'],
+    }
+
+
+def create_selection(url, info):
+    """Store the sanitized info dict of a quality listing and return a selection token"""
+    ranking = rank_formats(info.get('formats', []), info.get('duration'))
+    now = time.time()
+    token = secrets.token_urlsafe(16)
+
+    with _selections_lock:
+        _prune_selections(now)
+        _selections[token] = {
+            'url': url,
+            'info': info,
+            'formats': {format_id: _format_summary(entry) for format_id, entry in ranking['by_id'].items()},
+            'expires_at': now + SELECTION_TTL,
+        }
+    return token
+
+
+def get_selection(token, url, format_id):
+    """Return (info copy, format summary) for a valid token, or (None, None)
+
+    Tokens are single-URL: a token issued for another URL or a format that was
+    not part of the listing is treated as missing so callers re-extract.
+    """
+    if not token:
+        return None, None
+
+    with _selections_lock:
+        _prune_selections(time.time())
+        entry = _selections.get(token)
+
+    if not entry or entry['url'] != url or format_id not in entry['formats']:
+        return None, None
+
+    # yt-dlp mutates the info dict while processing it, so hand out a copy
+    return copy.deepcopy(entry['info']), entry['formats'][format_id]
+
+
+def discard_selection(token):
+    """Forget a selection (e.g. after its media URLs turned out to be expired)"""
+    with _selections_lock:
+        _selections.pop(token, None)
@@ -0,0 +1,59 @@
+import os
+import uuid
+import shutil
+import logging
+import threading
+from yt_dlp.utils import sanitize_filename
+
+# Every download job writes into its own directory under <base>/jobs, so jobs
+# with the same title (or for the same user) never share or clobber files and
+# can run in parallel. File names inside a job come from the info dict only.
+JOBS_DIR_NAME = 'jobs'
+MAX_TITLE_LENGTH = 150
+
+# yt-dlp output template equivalent of output_filename_stem()
+JOB_OUTTMPL = '%(title).150B [%(id)s].%(ext)s'
+
+# Job directories a running job still works in; the janitor never touches them
+_open_job_dirs = set()
+_open_lock = threading.Lock()
+
+
+def create_job_dir(base_dir, job_id=None):
+    """Create a unique working directory for a download job and return its path"""
+    name = uuid.uuid4().hex[:12]
+    if job_id:
+        name = f"{sanitize_filename(str(job_id), restricted=True)}-{name}"
+    path = os.path.join(base_dir, JOBS_DIR_NAME, name)
+    os.makedirs(path)
+    with _open_lock:
+        _open_job_dirs.add(os.path.abspath(path))
+    return path
+
+
+def close_job_dir(job_dir):
+    """Mark a job directory whose files are kept (e.g. for the user) as no longer in use"""
+    if job_dir:
+        with _open_lock:
+            _open_job_dirs.discard(os.path.abspath(job_dir))
+
+
+def is_job_dir_open(job_dir):
+    with _open_lock:
+        return os.path.abspath(job_dir) in _open_job_dirs
+
+
+def remove_job_dir(job_dir):
+    """Remove a job directory with everything in it"""
+    close_job_dir(job_dir)
+    if job_dir and os.path.isdir(job_dir):
+        shutil.rmtree(job_dir, ignore_errors=True)
+        logging.info(f"Removed job directory {job_dir}")
+
+
+def output_filename_stem(info):
+    """Deterministic file name (without extension) for a video: '<title> [<id>]'"""
+    title = sanitize_filename(info.get('title') or 'video') or 'video'
+    title = title.encode('utf-8')[:MAX_TITLE_LENGTH].decode('utf-8', 'ignore').strip() or 'video'
+    video_id = sanitize_filename(str(info.get('id') or 'unknown'))
+    return f"{title} [{video_id}]"
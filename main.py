@@ -4,6 +4,7 @@ import asyncio
 import logging
 
 # Import app at module level for gunicorn compatibility
+import app as app_module
 from app import app
 
 async def init_database():
@@ -12,6 +13,7 @@ async def init_database():
         from mongo import database_init
         print("🔌 Connecting to MongoDB...")
         await database_init()
+        app_module._startup['done'] = True  # Already done, the first request does not repeat it
         print("✅ MongoDB initialized successfully")
     except Exception as e:
         logging.error(f"❌ Failed to initialize database: {e}")
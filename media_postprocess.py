@@ -0,0 +1,99 @@
+import os
+import shutil
+import logging
+from media_processes import run_media_process
+from media_probe import probe_file
+
+# Downloads are only converted when the upload target cannot take them as-is.
+# YouTube accepts the common containers and codecs directly, so most files need
+# nothing; a container it does not take is remuxed with stream copy (seconds);
+# a full transcode only happens for codecs that cannot be copied.
+TARGET_CONTAINERS = {
+    'youtube': {'mp4', 'm4v', 'mov', 'webm', 'mkv', 'avi', 'flv', '3gp', 'mpg', 'mpeg', 'wmv'},
+    'mp4': {'mp4', 'm4v'},
+}
+# Codecs the target accepts, and codecs that can be stream-copied into mp4
+TARGET_VIDEO_CODECS = {
+    'youtube': {'h264', 'hevc', 'vp8', 'vp9', 'av1', 'mpeg4', 'mpeg2video', 'prores', 'theora', 'wmv3', 'flv1'},
+    'mp4': {'h264', 'hevc', 'av1', 'vp9', 'mpeg4'},
+}
+TARGET_AUDIO_CODECS = {
+    'youtube': {'aac', 'mp3', 'opus', 'vorbis', 'flac', 'ac3', 'eac3', 'pcm_s16le', 'wmav2', 'mp2'},
+    'mp4': {'aac', 'mp3', 'opus', 'flac', 'ac3', 'eac3', 'alac'},
+}
+
+PROBE_TIMEOUT = 60
+TRANSCODE_TIMEOUT = int(os.environ.get('TRANSCODE_TIMEOUT', '3600'))
+TRANSCODE_ARGS = ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '20', '-c:a', 'aac', '-b:a', '192k']
+
+
+def probe_streams(path):
+    """Container and stream codecs of a media file via ffprobe, or None if it cannot be probed"""
+    if not shutil.which('ffprobe'):
+        return None
+    try:
+        data = probe_file(path, timeout=PROBE_TIMEOUT)  # Cached by file fingerprint
+    except Exception as e:
+        logging.warning(f"Could not probe {path}: {e}")
+        return None
+    streams = data.get('streams') or []
+    return {
+        'container': os.path.splitext(path)[1].lstrip('.').lower(),
+        'video_codecs': [s.get('codec_name') for s in streams if s.get('codec_type') == 'video' and not (s.get('disposition') or {}).get('attached_pic')],
+        'audio_codecs': [s.get('codec_name') for s in streams if s.get('codec_type') == 'audio'],
+    }
+
+
+def choose_postprocess(probe, target='youtube'):
+    """'noop', 'remux' or 'transcode' for a probed file and upload target"""
+    if not probe:
+        return 'noop'  # Nothing known about the file: upload as-is rather than guess
+    codecs_ok = (all(c in TARGET_VIDEO_CODECS[target] for c in probe['video_codecs'])
+                 and all(c in TARGET_AUDIO_CODECS[target] for c in probe['audio_codecs']))
+    if codecs_ok and probe['container'] in TARGET_CONTAINERS[target]:
+        return 'noop'
+    copyable = (all(c in TARGET_VIDEO_CODECS['mp4'] for c in probe['video_codecs'])
+                and all(c in TARGET_AUDIO_CODECS['mp4'] for c in probe['audio_codecs']))
+    return 'remux' if copyable else 'transcode'
+
+
+def run_ffmpeg(args, label='ffmpeg', timeout=TRANSCODE_TIMEOUT):
+    """Run ffmpeg under the media process limits; returns {'wall_seconds', 'cpu_seconds', 'queue_wait'}
+
+    CPU time (user + system) comes from the child's rusage via os.wait4.
+    """
+    result = run_media_process(['ffmpeg', '-hide_banner', '-v', 'error', '-y', *args], kind='ffmpeg', timeout=timeout)
+    if result['returncode'] != 0:
+        raise Exception(f"{label} failed ({result['returncode']}): {result['stderr'][-500:]}")
+    return {key: result[key] for key in ('wall_seconds', 'cpu_seconds', 'queue_wait')}
+
+
+def postprocess_media(path, target='youtube'):
+    """Make a downloaded file acceptable for the target with the cheapest operation
+
+    Returns {'action', 'path', 'cpu_seconds', 'wall_seconds', 'queue_wait'}; path is the
+    (possibly new) file, the original is removed after a conversion.
+    """
+    action = choose_postprocess(probe_streams(path), target)
+    result = {'action': action, 'path': path, 'cpu_seconds': 0.0, 'wall_seconds': 0.0, 'queue_wait': 0.0}
+    if action == 'noop':
+        return result
+    if not shutil.which('ffmpeg'):
+        logging.warning(f"ffmpeg not installed, cannot {action} {path}; using it as-is")
+        result['action'] = 'noop'
+        return result
+
+    output = os.path.splitext(path)[0] + ('.remux.mp4' if path.endswith('.mp4') else '.mp4')
+    if action == 'remux':
+        codec_args = ['-map', '0:v', '-map', '0:a?', '-c', 'copy']
+    else:
+        codec_args = ['-map', '0:v', '-map', '0:a?', *TRANSCODE_ARGS]
+    stats = run_ffmpeg(['-i', path, *codec_args, '-movflags', '+faststart', output], label=action)
+
+    os.remove(path)
+    if output.endswith('.remux.mp4'):
+        os.replace(output, path)
+        output = path
+    result.update(stats, path=output)
+    logging.info(f"✅ {action} of {os.path.basename(path)}: {stats['cpu_seconds']}s CPU, {stats['wall_seconds']}s wall")
+    return result
@@ -0,0 +1,289 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import subprocess
+import requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from media_processes import run_media_process
+
+# Direct URLs are analyzed from the start and end of the file only. Container
+# headers (MP4 moov, which may be at either end; MKV/WebM segment info; TS
+# timestamps at the tail) fit in these ranges, so a multi-GB file costs two
+# small Range requests plus a HEAD, all in parallel. The ranges are laid out
+# in a sparse temp file of the real size and ffprobe reads it locally.
+HEAD_BYTES = 512 * 1024
+TAIL_BYTES = 512 * 1024
+REQUEST_TIMEOUT = 10
+PROBE_TIMEOUT = 15
+
+# ffprobe results are cached by what identifies the media: remote sources by
+# URL + ETag/Last-Modified/Content-Length, local files by path + size + mtime
+# + a hash of the first bytes. Remote entries without ETag/Last-Modified can
+# change under the same URL and expire after PROBE_CACHE_TTL.
+PROBE_CACHE_SIZE = 512
+PROBE_CACHE_TTL = 3600
+FINGERPRINT_BYTES = 64 * 1024
+
+_probe_cache = OrderedDict()  # key -> (expires_at or None, ffprobe JSON)
+_probe_cache_lock = threading.Lock()
+
+
+def parse_probe_metadata(probe_data):
+    """ffprobe -show_format -show_streams JSON -> flat metadata dict"""
+    format_info = probe_data.get('format', {})
+    streams = probe_data.get('streams', [])
+    video_stream = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    audio_stream = next((s for s in streams if s.get('codec_type') == 'audio'), None)
+
+    metadata = {}
+    metadata['file_size'] = int(format_info.get('size', 0))
+    metadata['file_size_mb'] = round(metadata['file_size'] / (1024 * 1024), 2) if metadata['file_size'] > 0 else 0
+    metadata['duration'] = float(format_info.get('duration', 0))
+    metadata['bitrate'] = int(format_info.get('bit_rate', 0))
+    metadata['format_name'] = format_info.get('format_name', 'Unknown')
+
+    if video_stream:
+        metadata['width'] = int(video_stream.get('width', 0))
+        metadata['height'] = int(video_stream.get('height', 0))
+        metadata['video_codec'] = video_stream.get('codec_name', 'Unknown')
+        metadata['video_bitrate'] = int(video_stream.get('bit_rate', 0)) if video_stream.get('bit_rate') else 0
+        metadata['fps'] = 0
+        try:
+            num, den = map(int, str(video_stream.get('r_frame_rate', '0/1')).split('/'))
+            metadata['fps'] = round(num / den, 2) if den > 0 else 0
+        except ValueError:
+            pass
+
+    if audio_stream:
+        metadata['audio_codec'] = audio_stream.get('codec_name', 'Unknown')
+        metadata['audio_bitrate'] = int(audio_stream.get('bit_rate', 0)) if audio_stream.get('bit_rate') else 0
+        metadata['sample_rate'] = int(audio_stream.get('sample_rate', 0)) if audio_stream.get('sample_rate') else 0
+        metadata['channels'] = int(audio_stream.get('channels', 0)) if audio_stream.get('channels') else 0
+
+    return metadata
+
+
+def remote_probe_key(url, response_headers):
+    """Cache key of a remote source, or None when the server sends no validators"""
+    etag = response_headers.get('ETag')
+    last_modified = response_headers.get('Last-Modified')
+    length = response_headers.get('Content-Length')
+    if not (etag or last_modified or length):
+        return None
+    return ('url', url, etag, last_modified, length)
+
+
+def file_probe_key(path):
+    """Cache key of a local file: (path, size, mtime, hash of the first bytes)"""
+    stat = os.stat(path)
+    with open(path, 'rb') as f:
+        head_hash = hashlib.sha1(f.read(FINGERPRINT_BYTES)).hexdigest()
+    return ('file', os.path.abspath(path), stat.st_size, stat.st_mtime_ns, head_hash)
+
+
+def get_cached_probe(key):
+    if key is None:
+        return None
+    with _probe_cache_lock:
+        entry = _probe_cache.get(key)
+        if not entry:
+            return None
+        expires_at, probe_data = entry
+        if expires_at and expires_at < time.time():
+            del _probe_cache[key]
+            return None
+        _probe_cache.move_to_end(key)
+        return probe_data
+
+
+def store_probe(key, probe_data, ttl=None):
+    if key is None:
+        return
+    with _probe_cache_lock:
+        _probe_cache[key] = (time.time() + ttl if ttl else None, probe_data)
+        _probe_cache.move_to_end(key)
+        while len(_probe_cache) > PROBE_CACHE_SIZE:
+            _probe_cache.popitem(last=False)
+
+
+def _run_ffprobe(target, timeout=PROBE_TIMEOUT):
+    """Raw ffprobe JSON (format + streams) of a path or URL"""
+    cmd = ['ffprobe', '-v', 'quiet', '-print_format', 'json', '-show_format', '-show_streams', target]
+    result = run_media_process(cmd, kind='ffprobe', timeout=timeout)
+    if result['returncode'] != 0:
+        raise Exception(f"FFprobe failed: {result['stderr']}")
+    return json.loads(result['stdout'] or '{}')
+
+
+def probe_file(path, timeout=PROBE_TIMEOUT):
+    """ffprobe JSON of a local file, reused while the file is unchanged"""
+    key = file_probe_key(path)
+    probe_data = get_cached_probe(key)
+    if probe_data is None:
+        probe_data = _run_ffprobe(path, timeout)
+        store_probe(key, probe_data)
+    return probe_data
+
+
+def _total_from_content_range(value):
+    """Total size from 'bytes 0-99/1234' (None when unknown, e.g. 'bytes 0-99/*')"""
+    total = (value or '').rsplit('/', 1)[-1]
+    return int(total) if total.isdigit() else None
+
+
+def _get_range(url, range_header, limit, headers=None):
+    """GET a byte range; returns (status, content_range, bytes) reading at most limit bytes"""
+    request_headers = {**(headers or {}), 'Range': range_header}
+    with requests.get(url, headers=request_headers, stream=True, timeout=REQUEST_TIMEOUT, allow_redirects=True) as response:
+        response.raise_for_status()
+        data = bytearray()
+        for chunk in response.iter_content(64 * 1024):
+            data += chunk
+            if len(data) >= limit:
+                break  # Servers ignoring Range send the whole file: stop early
+        return response.status_code, response.headers.get('Content-Range'), bytes(data[:limit])
+
+
+def _head(url, headers=None):
+    response = requests.head(url, headers=headers, timeout=REQUEST_TIMEOUT, allow_redirects=True)
+    response.raise_for_status()
+    return response.headers
+
+
+def _start_range_fetch(executor, url, headers, head_bytes, tail_bytes, known_headers=None):
+    return (
+        executor.submit(lambda: known_headers) if known_headers is not None else executor.submit(_head, url, headers),
+        executor.submit(_get_range, url, f'bytes=0-{head_bytes - 1}', head_bytes, headers),
+        executor.submit(_get_range, url, f'bytes=-{tail_bytes}', tail_bytes, headers),
+    )
+
+
+def _future_result(future):
+    """Result of a future, or the exception it raised"""
+    try:
+        return future.result()
+    except Exception as e:
+        return e
+
+
+def ranges_from_responses(url, response_headers, first, last):
+    """Combine the (status, content_range, bytes) results of the head and tail range requests
+
+    last may be the exception the tail request raised; first must have succeeded.
+    """
+    if isinstance(first, Exception):
+        raise first
+    status, content_range, head = first
+    range_supported = status == 206
+    total = _total_from_content_range(content_range) if range_supported else None
+    if total is None and response_headers.get('Content-Length', '').isdigit():
+        total = int(response_headers['Content-Length'])
+
+    tail = b''
+    if isinstance(last, Exception):
+        logging.debug(f"Tail range request failed for {url}: {last}")
+    elif range_supported and last[0] == 206:
+        tail = last[2]
+
+    return {'headers': response_headers, 'total': total, 'head': head, 'tail': tail, 'range_supported': range_supported}
+
+
+def fetch_container_ranges(url, headers=None, head_bytes=HEAD_BYTES, tail_bytes=TAIL_BYTES):
+    """HEAD plus the first and last bytes of a remote file, fetched concurrently
+
+    Returns {'headers', 'total', 'head', 'tail', 'range_supported'}; tail is
+    empty when the server ignores Range requests (head then holds the first
+    head_bytes of the plain response).
+    """
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        head_future, first_future, last_future = _start_range_fetch(executor, url, headers, head_bytes, tail_bytes)
+        return ranges_from_responses(url, head_future.result(), _future_result(first_future), _future_result(last_future))
+
+
+def write_sparse_copy(path, ranges):
+    """Lay out head and tail at their real offsets in a sparse file of the real size"""
+    with open(path, 'wb') as f:
+        f.write(ranges['head'])
+        total = ranges['total']
+        if total and total > len(ranges['head']):
+            f.truncate(total)
+            if ranges['tail']:
+                f.seek(max(len(ranges['head']), total - len(ranges['tail'])))
+                f.write(ranges['tail'][-(total - len(ranges['head'])):])
+
+
+def analyze_direct_url(url, headers=None, known_headers=None):
+    """Headers and ffprobe metadata of a direct media URL without downloading the whole file
+
+    Returns {'content_type', 'content_length', 'content_disposition',
+    'metadata', 'range_supported', 'bytes_read', 'elapsed', 'cached'}.
+    metadata is {} when ffprobe is unavailable or cannot make sense of the
+    ranges. A cached probe of the same URL + validators skips the range
+    reads (they were started with the HEAD and are abandoned). known_headers
+    (of a recent HEAD) saves the HEAD request.
+    """
+    start = time.time()
+    executor = ThreadPoolExecutor(max_workers=3)
+    try:
+        head_future, first_future, last_future = _start_range_fetch(
+            executor, url, headers, HEAD_BYTES, TAIL_BYTES, known_headers)
+        response_headers = head_future.result()
+        return build_direct_url_analysis(
+            url, response_headers,
+            lambda: ranges_from_responses(url, response_headers, _future_result(first_future), _future_result(last_future)),
+            start)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def build_direct_url_analysis(url, response_headers, get_ranges, start=None):
+    """Analysis of a direct URL from its HEAD headers, probing get_ranges() only on a cache miss"""
+    start = start or time.time()
+    key = remote_probe_key(url, response_headers)
+    probe_data = get_cached_probe(key)
+    cached = probe_data is not None
+    ranges = None
+
+    if not cached:
+        ranges = get_ranges()
+        if shutil.which('ffprobe'):
+            probe_data = _probe_ranges(url, ranges)
+            if probe_data is not None:
+                validated = response_headers.get('ETag') or response_headers.get('Last-Modified')
+                store_probe(key, probe_data, ttl=None if validated else PROBE_CACHE_TTL)
+
+    length = response_headers.get('Content-Length', '')
+    analysis = {
+        'content_type': response_headers.get('Content-Type', '').lower(),
+        'content_length': ranges['total'] if ranges else (int(length) if length.isdigit() else None),
+        'content_disposition': response_headers.get('Content-Disposition', ''),
+        'metadata': parse_probe_metadata(probe_data) if probe_data else {},
+        'range_supported': ranges['range_supported'] if ranges else None,
+        'bytes_read': len(ranges['head']) + len(ranges['tail']) if ranges else 0,
+        'elapsed': round(time.time() - start, 3),
+        'cached': cached,
+    }
+    logging.info(f"Analyzed {url} from {analysis['bytes_read']} bytes in {analysis['elapsed']}s (cached: {cached})")
+    return analysis
+
+
+def _probe_ranges(url, ranges):
+    """ffprobe JSON of the head/tail ranges laid out in a sparse temp file, or None"""
+    ext = os.path.splitext(urlparse(url).path)[1][:8]
+    tmp = tempfile.NamedTemporaryFile(suffix=ext, delete=False)
+    tmp.close()
+    try:
+        write_sparse_copy(tmp.name, ranges)
+        return _run_ffprobe(tmp.name)
+    except Exception as e:
+        logging.warning(f"Partial probe of {url} failed: {e}")
+        return None
+    finally:
+        os.remove(tmp.name)
@@ -0,0 +1,167 @@
+import os
+import time
+import signal
+import logging
+import tempfile
+import threading
+import subprocess
+
+# All ffmpeg/ffprobe children go through here so a burst of merges or probes
+# cannot take every core from the web workers. Each kind has a concurrency cap;
+# ffmpeg gets a thread count that splits the cores between the allowed
+# processes, and every child runs niced in its own process group so a timeout
+# kills it together with anything it spawned.
+CPU_COUNT = os.cpu_count() or 1
+MEDIA_PROCESS_LIMITS = {
+    'ffmpeg': int(os.environ.get('MEDIA_MAX_FFMPEG', str(max(1, CPU_COUNT // 2)))),
+    'ffprobe': int(os.environ.get('MEDIA_MAX_FFPROBE', str(max(2, CPU_COUNT)))),
+}
+FFMPEG_THREADS = max(1, CPU_COUNT // MEDIA_PROCESS_LIMITS['ffmpeg'])
+MEDIA_NICE = int(os.environ.get('MEDIA_NICE', '10'))
+KILL_GRACE = 5
+
+_slots = {kind: threading.BoundedSemaphore(limit) for kind, limit in MEDIA_PROCESS_LIMITS.items()}
+_stats_lock = threading.Lock()
+_stats = {kind: {'runs': 0, 'running': 0, 'waiting': 0, 'queue_wait_total': 0.0, 'queue_wait_max': 0.0,
+                 'cpu_seconds': 0.0, 'timeouts': 0} for kind in MEDIA_PROCESS_LIMITS}
+_held = threading.local()  # Slots taken by yt-dlp postprocessor hooks of this thread
+
+
+def acquire_slot(kind):
+    """Wait for a free process slot of a kind; returns the seconds spent queued"""
+    with _stats_lock:
+        _stats[kind]['waiting'] += 1
+    start = time.time()
+    _slots[kind].acquire()
+    waited = time.time() - start
+    with _stats_lock:
+        stats = _stats[kind]
+        stats['waiting'] -= 1
+        stats['running'] += 1
+        stats['runs'] += 1
+        stats['queue_wait_total'] += waited
+        stats['queue_wait_max'] = max(stats['queue_wait_max'], waited)
+    if waited > 1:
+        logging.info(f"⏳ {kind} waited {waited:.1f}s for a free slot")
+    return waited
+
+
+def release_slot(kind):
+    with _stats_lock:
+        _stats[kind]['running'] -= 1
+    _slots[kind].release()
+
+
+def _kill_group(process, timed_out, exited):
+    """Terminate a child's process group, then kill it if it has not exited after KILL_GRACE
+
+    Never reaps the child itself (the caller is blocked in os.wait4 for it).
+    """
+    timed_out.set()
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        if exited.is_set():
+            return
+        try:
+            os.killpg(process.pid, sig)
+        except ProcessLookupError:
+            return
+        exited.wait(KILL_GRACE)
+
+
+def run_media_process(cmd, kind='ffmpeg', timeout=None):
+    """Run an ffmpeg/ffprobe command under the media limits
+
+    Returns {'returncode', 'stdout', 'stderr', 'cpu_seconds', 'wall_seconds',
+    'queue_wait'} (stdout/stderr as text). Raises subprocess.TimeoutExpired
+    after killing the process group when timeout seconds pass.
+    """
+    cmd = list(cmd)
+    if kind == 'ffmpeg' and '-threads' not in cmd:
+        cmd[-1:-1] = ['-threads', str(FFMPEG_THREADS)]  # Output option: before the output file
+
+    queue_wait = acquire_slot(kind)
+    try:
+        with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+            start = time.time()
+            # Output goes to files so nothing blocks on a full pipe while we wait4()
+            process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=out, stderr=err, start_new_session=True)
+            try:
+                os.setpriority(os.PRIO_PROCESS, process.pid, MEDIA_NICE)
+            except OSError:
+                pass
+
+            timed_out = threading.Event()
+            exited = threading.Event()
+            timer = None
+            if timeout:
+                timer = threading.Timer(timeout, _kill_group, args=(process, timed_out, exited))
+                timer.daemon = True
+                timer.start()
+            try:
+                _, status, rusage = os.wait4(process.pid, 0)
+            finally:
+                exited.set()
+                if timer:
+                    timer.cancel()
+            process.returncode = os.waitstatus_to_exitcode(status)
+
+            cpu_seconds = rusage.ru_utime + rusage.ru_stime
+            with _stats_lock:
+                _stats[kind]['cpu_seconds'] += cpu_seconds
+                if timed_out.is_set():
+                    _stats[kind]['timeouts'] += 1
+            if timed_out.is_set():
+                raise subprocess.TimeoutExpired(cmd, timeout)
+
+            out.seek(0)
+            err.seek(0)
+            return {
+                'returncode': process.returncode,
+                'stdout': out.read().decode('utf-8', 'replace'),
+                'stderr': err.read().decode('utf-8', 'replace'),
+                'cpu_seconds': round(cpu_seconds, 2),
+                'wall_seconds': round(time.time() - start, 2),
+                'queue_wait': round(queue_wait, 2),
+            }
+    finally:
+        release_slot(kind)
+
+
+def _held_slots():
+    if not hasattr(_held, 'slots'):
+        _held.slots = []
+    return _held.slots
+
+
+def ytdlp_postprocessor_hook(d):
+    """yt-dlp postprocessor hook: ffmpeg postprocessors (merges, fixups) take an ffmpeg slot"""
+    if not str(d.get('postprocessor', '')).startswith('FFmpeg'):
+        return
+    held = _held_slots()
+    if d.get('status') == 'started':
+        acquire_slot('ffmpeg')
+        held.append('ffmpeg')
+    elif d.get('status') == 'finished' and held:
+        release_slot(held.pop())
+
+
+def release_held_slots():
+    """Release slots a failed yt-dlp postprocessor never released (call in a finally)"""
+    held = _held_slots()
+    while held:
+        release_slot(held.pop())
+
+
+def apply_media_limits(config):
+    """Make yt-dlp's own ffmpeg runs use the slot limits and per-process thread count"""
+    config['postprocessor_hooks'] = [*config.get('postprocessor_hooks', []), ytdlp_postprocessor_hook]
+    pp_args = dict(config.get('postprocessor_args') or {})
+    pp_args.setdefault('ffmpeg', ['-threads', str(FFMPEG_THREADS)])
+    config['postprocessor_args'] = pp_args
+    return config
+
+
+def media_process_stats():
+    """Per-kind runs, running/waiting counts, queue wait and CPU totals"""
+    with _stats_lock:
+        return {kind: {**stats, 'limit': MEDIA_PROCESS_LIMITS[kind]} for kind, stats in _stats.items()}
@@ -0,0 +1,136 @@
+import os
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multi_platform_downloader import extract_platform_metadata, get_platform_from_url, get_supported_platforms
+
+# Batch metadata extraction. Platform detection runs in a shared pool; each
+# detected URL is queued on its platform, which is worked by at most
+# 'concurrency' threads (request pacing is left to the per-platform rate
+# limiter of the extractor). A slow or strict platform therefore never holds
+# up the others, and results are yielded in completion order. If no result
+# arrives for RESULT_TIMEOUT seconds the URLs still outstanding are reported as
+# failed, so one hung extraction cannot stall the batch.
+MAX_BATCH_URLS = int(os.environ.get('MAX_BATCH_URLS', '300'))
+RESULT_TIMEOUT = float(os.environ.get('BATCH_RESULT_TIMEOUT', '120'))
+DETECT_WORKERS = 16
+DEFAULT_PLATFORM_LIMIT = {'concurrency': 3}
+PLATFORM_LIMITS = {
+    'youtube': {'concurrency': 4},
+    'instagram': {'concurrency': 2},
+    'facebook': {'concurrency': 2},
+    'tiktok': {'concurrency': 2},
+    'twitter': {'concurrency': 2},
+    'direct_url': {'concurrency': 8},
+}
+
+
+def get_platform_limit(platform):
+    return PLATFORM_LIMITS.get(platform, DEFAULT_PLATFORM_LIMIT)
+
+
+def _result(index, url, platform, metadata=None, error=None):
+    if error is not None:
+        return {'index': index, 'url': url, 'platform': platform, 'success': False, 'error': error}
+    return {'index': index, 'url': url, 'platform': platform, 'success': True, 'metadata': metadata}
+
+
+def _new_platform_queue(platform):
+    """URLs of one platform and the state of the workers extracting them"""
+    return {'platform': platform, 'limit': get_platform_limit(platform), 'items': deque(),
+            'active': 0, 'lock': threading.Lock()}
+
+
+def extract_metadata_batch(urls, extract=extract_platform_metadata, detect=get_platform_from_url,
+                           result_timeout=None):
+    """Extract metadata for many URLs concurrently with per-platform limits
+
+    Generator of {'index', 'url', 'platform', 'success', 'metadata' | 'error'}
+    dicts, one per URL, in completion order (index is the position in urls).
+    Closing the generator stops extractions that have not started yet.
+    """
+    result_timeout = RESULT_TIMEOUT if result_timeout is None else result_timeout
+    urls = list(urls)
+    if len(urls) > MAX_BATCH_URLS:
+        raise Exception(f"Too many URLs: {len(urls)} (maximum {MAX_BATCH_URLS})")
+
+    supported = set(get_supported_platforms())
+    results = queue.Queue()
+    stop = threading.Event()
+    platform_queues = {}
+    queues_lock = threading.Lock()
+
+    def work(platform_queue):
+        while not stop.is_set():
+            with platform_queue['lock']:
+                if not platform_queue['items']:
+                    platform_queue['active'] -= 1
+                    return
+                index, url = platform_queue['items'].popleft()
+            platform = platform_queue['platform']
+            try:
+                results.put(_result(index, url, platform, metadata=extract(url, platform)))
+            except Exception as e:
+                results.put(_result(index, url, platform, error=str(e)))
+        with platform_queue['lock']:
+            platform_queue['active'] -= 1
+
+    def dispatch(index, url):
+        if stop.is_set():
+            return
+        try:
+            platform = detect(url)
+        except Exception as e:
+            results.put(_result(index, url, 'unknown', error=str(e)))
+            return
+        if platform not in supported:
+            results.put(_result(index, url, platform, error=f'Platform "{platform}" is not supported yet'))
+            return
+
+        with queues_lock:
+            platform_queue = platform_queues.setdefault(platform, _new_platform_queue(platform))
+        with platform_queue['lock']:
+            platform_queue['items'].append((index, url))
+            if platform_queue['active'] >= platform_queue['limit']['concurrency']:
+                return
+            platform_queue['active'] += 1
+        threading.Thread(target=work, args=(platform_queue,), name=f'metadata-{platform}', daemon=True).start()
+
+    detector = ThreadPoolExecutor(max_workers=DETECT_WORKERS)
+    try:
+        for index, url in enumerate(urls):
+            detector.submit(dispatch, index, url)
+        pending = dict(enumerate(urls))
+        while pending:
+            try:
+                result = results.get(timeout=result_timeout)
+            except queue.Empty:
+                logging.warning(f"Metadata batch: no result for {result_timeout}s, giving up on {len(pending)} URLs")
+                for index, url in sorted(pending.items()):
+                    yield _result(index, url, 'unknown', error=f'Timed out after {int(result_timeout)}s')
+                return
+            pending.pop(result['index'], None)
+            yield result
+    finally:
+        stop.set()
+        detector.shutdown(wait=False, cancel_futures=True)
+        logging.info(f"Metadata batch of {len(urls)} URLs finished ({', '.join(sorted(platform_queues))})")
+
+
+def run_metadata_batch(urls, batch_id, progress_data, **options):
+    """Background job: extract a batch into progress_data[batch_id] ('results' grows as URLs complete)"""
+    progress = progress_data[batch_id]
+    progress.update({'status': 'extracting', 'type': 'metadata_batch', 'total': len(urls),
+                     'completed': 0, 'failed': 0, 'results': []})
+    try:
+        for result in extract_metadata_batch(urls, **options):
+            progress['results'].append(result)
+            progress['completed' if result['success'] else 'failed'] += 1
+        progress['status'] = 'completed'
+    except Exception as e:
+        logging.error(f"Metadata batch {batch_id} failed: {e}")
+        progress.update({'status': 'error', 'error': str(e)})
+    return progress
@@ -2,8 +2,10 @@
 import os
 import motor.motor_asyncio
 from dotenv import load_dotenv
+import time
 import logging
-from pymongo.errors import CollectionInvalid
+from pymongo import UpdateOne
+from pymongo.errors import CollectionInvalid, DuplicateKeyError
 
 # Load environment variables
 load_dotenv()
@@ -25,8 +27,10 @@ TOKENS_COLLECTION = 'tokens'
 OAUTH_TOKENS_COLLECTION = 'oauth_tokens'  # For token.json data
 HISTORY_COLLECTION = 'history'
 SETTINGS_COLLECTION = 'settings'
-CHANNELS_COLLECTION = 'channels'
+CHANNELS_COLLECTION = 'channels'  # Legacy: one document per user with a channels array
+MONITORED_CHANNELS_COLLECTION = 'monitored_channels'  # One document per (user_id, channel_id)
 LOGS_COLLECTION = 'automation_logs'
+CHANNEL_HANDLES_COLLECTION = 'channel_handles'  # Permanent @handle/custom URL -> channel ID cache
 
 async def database_init():
     """Initialize database and create collections if they don't exist"""
@@ -46,7 +50,9 @@ async def database_init():
             HISTORY_COLLECTION,
             SETTINGS_COLLECTION,
             CHANNELS_COLLECTION,
-            LOGS_COLLECTION
+            MONITORED_CHANNELS_COLLECTION,
+            LOGS_COLLECTION,
+            CHANNEL_HANDLES_COLLECTION
         ]
         
         for collection_name in collections_to_create:
@@ -59,8 +65,15 @@ async def database_init():
         await db[OAUTH_TOKENS_COLLECTION].create_index('user_id', unique=True)
         await db[SETTINGS_COLLECTION].create_index('user_id', unique=True)
         await db[CHANNELS_COLLECTION].create_index('user_id')
+        await db[MONITORED_CHANNELS_COLLECTION].create_index([('user_id', 1), ('channel_id', 1)], unique=True)
+        await db[MONITORED_CHANNELS_COLLECTION].create_index([('user_id', 1), ('next_check_at', 1)])
+        await db[MONITORED_CHANNELS_COLLECTION].create_index('next_check_at')
         await db[HISTORY_COLLECTION].create_index('user_id')
         await db[LOGS_COLLECTION].create_index('user_id')
+        await db[CHANNEL_HANDLES_COLLECTION].create_index('key', unique=True)
+        
+        # One-time move of legacy channel arrays (no-op once migrated)
+        await migrate_legacy_channels()
         
         logging.info("✅ Database initialization complete")
         
@@ -116,22 +129,133 @@ async def save_user_settings(user_id, settings):
     logging.info(f"✅ New Data stored - User settings for {user_id}")
     return result
 
+async def migrate_legacy_channels():
+    """Move legacy channels arrays into per-channel documents (run once at startup)
+
+    The per-channel documents are upserted first; the array is only removed
+    afterwards and only if it is still the one that was copied, so a failure
+    in between leaves it in place for the next run.
+    """
+    migrated = 0
+    cursor = db[CHANNELS_COLLECTION].find({'channels': {'$exists': True}})
+    async for legacy in cursor:
+        channels = legacy.get('channels') or []
+        await add_user_channels(legacy['user_id'], [channel for channel in channels if channel.get('channel_id')])
+        await db[CHANNELS_COLLECTION].update_one(
+            {'_id': legacy['_id'], 'channels': channels},
+            {'$unset': {'channels': ''}}
+        )
+        migrated += 1
+        logging.info(f"✅ Migrated {len(channels)} channels to per-channel documents for {legacy['user_id']}")
+    return migrated
+
 async def get_user_channels(user_id):
     """Get user's monitored channels"""
-    result = await db[CHANNELS_COLLECTION].find_one({'user_id': user_id})
-    if result:
-        return result
-    return {'channels': []}
-
-async def save_user_channels(user_id, channels_data):
-    """Save user's monitored channels"""
-    channels_data['user_id'] = user_id
-    result = await db[CHANNELS_COLLECTION].update_one(
+    cursor = db[MONITORED_CHANNELS_COLLECTION].find(
         {'user_id': user_id},
-        {'$set': channels_data},
-        upsert=True
-    )
-    logging.info(f"✅ New Data stored - User channels for {user_id}")
+        {'_id': 0}
+    ).sort('added_at', 1)
+    channels = await cursor.to_list(length=None)
+    return {'user_id': user_id, 'channels': channels}
+
+async def get_user_channel_ids(user_id):
+    """Get the set of channel IDs a user is monitoring"""
+    channel_ids = await db[MONITORED_CHANNELS_COLLECTION].distinct('channel_id', {'user_id': user_id})
+    return set(channel_ids)
+
+async def get_due_channels(user_id, now=None):
+    """Get user's channels whose next check time has passed"""
+    now = now if now is not None else time.time()
+    cursor = db[MONITORED_CHANNELS_COLLECTION].find(
+        {'user_id': user_id, 'next_check_at': {'$lte': now}},
+        {'_id': 0}
+    ).sort('next_check_at', 1)
+    return await cursor.to_list(length=None)
+
+async def count_user_channels(user_id):
+    """Count user's monitored channels"""
+    return await db[MONITORED_CHANNELS_COLLECTION].count_documents({'user_id': user_id})
+
+def _new_channel_document(user_id, channel_info):
+    """Build a per-channel document with scheduling fields"""
+    now = time.time()
+    document = {key: value for key, value in channel_info.items() if key != '_id'}
+    document['user_id'] = user_id
+    document.setdefault('added_at', now)
+    document.setdefault('next_check_at', now)
+    return document
+
+async def add_user_channel(user_id, channel_info):
+    """Add a monitored channel, returns False if it is already monitored
+
+    An upsert that only inserts, so duplicates are caught even where the
+    unique (user_id, channel_id) index has not been created yet.
+    """
+    try:
+        result = await db[MONITORED_CHANNELS_COLLECTION].update_one(
+            {'user_id': user_id, 'channel_id': channel_info.get('channel_id')},
+            {'$setOnInsert': _new_channel_document(user_id, channel_info)},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    if result.upserted_id is None:
+        return False
+    logging.info(f"✅ New Data stored - Channel {channel_info.get('channel_id')} for {user_id}")
+    return True
+
+async def add_user_channels(user_id, channels):
+    """Add many monitored channels in a single bulk write (existing ones are left untouched)"""
+    if not channels:
+        return None
+    operations = [
+        UpdateOne(
+            {'user_id': user_id, 'channel_id': channel['channel_id']},
+            {'$setOnInsert': _new_channel_document(user_id, channel)},
+            upsert=True
+        )
+        for channel in channels
+    ]
+    result = await db[MONITORED_CHANNELS_COLLECTION].bulk_write(operations, ordered=False)
+    logging.info(f"✅ New Data stored - {len(operations)} channels for {user_id}")
+    return result
+
+async def update_user_channels(user_id, updates):
+    """Apply field-level updates to several channels ({channel_id: {field: value}}) in one bulk write"""
+    operations = [
+        UpdateOne({'user_id': user_id, 'channel_id': channel_id}, {'$set': fields})
+        for channel_id, fields in updates.items() if fields
+    ]
+    if not operations:
+        return None
+    return await db[MONITORED_CHANNELS_COLLECTION].bulk_write(operations, ordered=False)
+
+async def remove_user_channel(user_id, channel_id):
+    """Remove a monitored channel"""
+    result = await db[MONITORED_CHANNELS_COLLECTION].delete_one({'user_id': user_id, 'channel_id': channel_id})
+    logging.info(f"🗑️ Deleted channel {channel_id} for {user_id}")
+    return result
+
+async def get_channel_handle_ids(keys):
+    """Get cached channel IDs for a batch of handle/custom URL keys"""
+    cursor = db[CHANNEL_HANDLES_COLLECTION].find({'key': {'$in': list(keys)}})
+    results = await cursor.to_list(length=None)
+    return {doc['key']: doc['channel_id'] for doc in results}
+
+async def save_channel_handle_ids(resolved):
+    """Save handle/custom URL key -> channel ID mappings in one bulk write"""
+    if not resolved:
+        return None
+    operations = [
+        UpdateOne(
+            {'key': key},
+            {'$set': {'key': key, 'channel_id': channel_id, 'resolved_at': time.time()}},
+            upsert=True
+        )
+        for key, channel_id in resolved.items()
+    ]
+    result = await db[CHANNEL_HANDLES_COLLECTION].bulk_write(operations, ordered=False)
+    logging.info(f"✅ New Data stored - {len(operations)} channel handle mappings")
     return result
 
 async def get_oauth_tokens(user_id):
@@ -1,4 +1,5 @@
 import os
+import copy
 import json
 import yt_dlp
 import logging
@@ -10,18 +11,36 @@ from googleapiclient.errors import HttpError
 import threading
 from urllib.parse import urlparse, parse_qs
 import re
+import shlex
 import subprocess
+import shutil
+from format_ranking import rank_formats, log_height_selection, best_quality_format_id
+from format_selection import get_selection, discard_selection
+from segmented_downloader import prefetch_progressive_download
+from download_registry import start_download, record_progress, final_stem, finish_download, fail_download, discard_download
+from download_cache import fetch_download, resolve_cache_key
+from job_workspace import create_job_dir, close_job_dir, remove_job_dir
+from disk_budget import estimate_job_bytes, reserve_space, record_usage, release_space
+from size_probe import get_size_limit, get_duration_limit, resolve_requested_formats, check_download_admission, probe_download_size
+from subtitle_tracks import fetch_subtitle_tracks, upload_captions
+from media_postprocess import postprocess_media
+from media_processes import run_media_process, apply_media_limits, release_held_slots
+from media_probe import parse_probe_metadata, analyze_direct_url, probe_file
+from direct_url_service import is_direct_media_url, get_direct_url_analysis
+from rate_limiter import PlatformCoolingDown
+from cookie_pool import checkout_jar, attach_cookie_jar, pooled_request
+from extractor_options import build_extractor_options, pooled_ydl
+from text_utils import (
+    clean_string_for_json,
+    clean_strings_for_json,
+    clean_description_from_technical_details,
+    HASHTAG_RE,
+    TAG_WORD_RE
+)
 
 def is_direct_download_url(url):
-    """Check if URL is a direct video download using HTTP headers"""
-    try:
-        r = requests.head(url, allow_redirects=True, timeout=5)
-        content_type = r.headers.get("Content-Type", "")
-        if content_type.startswith("video") or "mpegurl" in content_type.lower():
-            return True
-    except Exception:
-        pass
-    return False
+    """Check if URL is a direct video download using HTTP headers (HEAD shared with the metadata analysis)"""
+    return is_direct_media_url(url)
 
 def get_platform_from_url(url):
     """Detect platform from URL"""
@@ -71,8 +90,138 @@ def get_platform_from_url(url):
     
     return 'unknown'
 
-def get_platform_config(platform):
-    """Get yt-dlp configuration for specific platform"""
+# Download tuning per platform. HLS/DASH fragments are fetched concurrently;
+# on a simulated CDN throttling each connection (tests/bench_download_tuning.py)
+# 8 concurrent fragments were ~6x faster than sequential and 16 only 1.5x more,
+# so HLS hosts use 8 and everything else 4. Buffer size made no measurable
+# difference and is left to yt-dlp unless overridden.
+DEFAULT_DOWNLOAD_TUNING = {
+    'concurrent_fragment_downloads': 4,
+    'http_chunk_size': 10485760,  # 10MB chunks for stability
+    'buffersize': None,
+    'external_downloader': None,
+    'external_downloader_args': None,
+}
+HLS_DOWNLOAD_TUNING = {
+    **DEFAULT_DOWNLOAD_TUNING,
+    'concurrent_fragment_downloads': 8,
+}
+DOWNLOAD_TUNING = {
+    'rumble': HLS_DOWNLOAD_TUNING,
+    'twitch': HLS_DOWNLOAD_TUNING,
+    'deadtoons': HLS_DOWNLOAD_TUNING,
+    'cybervynx': HLS_DOWNLOAD_TUNING,
+    'voe': HLS_DOWNLOAD_TUNING,
+    'filemoon': HLS_DOWNLOAD_TUNING,
+    'newerstream': HLS_DOWNLOAD_TUNING,
+    'shortic': HLS_DOWNLOAD_TUNING,
+    'smoothpre': HLS_DOWNLOAD_TUNING,
+}
+# Numeric options users may override, with their allowed range (values are clamped)
+TUNING_RANGES = {
+    'concurrent_fragment_downloads': (1, 16),
+    'http_chunk_size': (1048576, 104857600),  # 1MB - 100MB
+    'buffersize': (1024, 16777216),  # 1KB - 16MB
+}
+# External downloaders run a binary with arguments, so they are server-side only:
+# EXTERNAL_DOWNLOADER / EXTERNAL_DOWNLOADER_ARGS from the environment, or a user
+# picks one of these presets by name ('external_downloader': 'aria2c').
+EXTERNAL_DOWNLOADER_PRESETS = {
+    'aria2c': ['-x', '8', '-s', '8', '-k', '1M'],
+}
+SERVER_EXTERNAL_DOWNLOADER = os.environ.get('EXTERNAL_DOWNLOADER') or None
+SERVER_EXTERNAL_DOWNLOADER_ARGS = shlex.split(os.environ.get('EXTERNAL_DOWNLOADER_ARGS', ''))
+
+def _tuning_override(key, value):
+    """Validated user value for a tuning option, or raise ValueError"""
+    if key == 'external_downloader':
+        if value is not None and value not in EXTERNAL_DOWNLOADER_PRESETS:
+            raise ValueError(f"not one of {', '.join(sorted(EXTERNAL_DOWNLOADER_PRESETS))}")
+        return value
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        raise ValueError("not a number")
+    low, high = TUNING_RANGES[key]
+    return max(low, min(high, int(value)))
+
+def get_download_tuning(platform, user_settings=None):
+    """Download tuning for a platform, overridable via settings['download_tuning']
+    
+    Overrides are {'default': {...}, '<platform>': {...}} with the numeric keys of
+    TUNING_RANGES (clamped) and 'external_downloader' (a preset name);
+    platform overrides win over 'default'. Invalid values are logged and ignored.
+    """
+    tuning = dict(DOWNLOAD_TUNING.get(platform, DEFAULT_DOWNLOAD_TUNING))
+    if SERVER_EXTERNAL_DOWNLOADER:
+        tuning['external_downloader'] = SERVER_EXTERNAL_DOWNLOADER
+        tuning['external_downloader_args'] = SERVER_EXTERNAL_DOWNLOADER_ARGS or None
+    overrides = (user_settings or {}).get('download_tuning') or {}
+    if not isinstance(overrides, dict):
+        logging.warning("Ignoring invalid download tuning settings")
+        overrides = {}
+    for scope in ('default', platform):
+        scope_overrides = overrides.get(scope) or {}
+        if not isinstance(scope_overrides, dict):
+            logging.warning(f"Ignoring invalid download tuning settings for {scope}")
+            continue
+        for key, value in scope_overrides.items():
+            if key not in TUNING_RANGES and key != 'external_downloader':
+                logging.warning(f"Ignoring download tuning option that cannot be set per user: {key}")
+                continue
+            try:
+                value = _tuning_override(key, value)
+            except (TypeError, ValueError) as e:
+                logging.warning(f"Ignoring invalid download tuning value {key}={value!r}: {e}")
+                continue
+            tuning[key] = value
+            if key == 'external_downloader':
+                tuning['external_downloader_args'] = EXTERNAL_DOWNLOADER_PRESETS.get(value)
+    
+    # External downloaders are optional binaries; fall back to yt-dlp's native one
+    if tuning['external_downloader'] and not shutil.which(tuning['external_downloader']):
+        logging.warning(f"External downloader {tuning['external_downloader']} not installed, using native downloader")
+        tuning['external_downloader'] = None
+    return tuning
+
+# What a download is for decides which sidecar files yt-dlp fetches. Re-uploads
+# and user downloads only need the video (re-upload subtitles are fetched into
+# memory and attached to the upload instead); archives keep everything.
+SIDECAR_OPTIONS = ('writeinfojson', 'writedescription', 'writesubtitles', 'writeautomaticsub', 'writethumbnail')
+# postprocess_target is what the file must play in: YouTube takes most containers
+# as-is, files downloaded to a device are always delivered as mp4.
+DOWNLOAD_PURPOSES = {
+    'reupload': {'sidecars': False, 'memory_subtitles': True, 'postprocess_target': 'youtube'},
+    'user_download': {'sidecars': False, 'memory_subtitles': False, 'postprocess_target': 'mp4'},
+    'archive': {'sidecars': True, 'memory_subtitles': False, 'postprocess_target': 'youtube'},
+}
+
+def apply_download_purpose(config, purpose):
+    """Enable or disable sidecar writes (info json, description, subtitles, thumbnail) for a purpose"""
+    if purpose not in DOWNLOAD_PURPOSES:
+        raise Exception(f"Unknown download purpose: {purpose}")
+    for option in SIDECAR_OPTIONS:
+        config[option] = DOWNLOAD_PURPOSES[purpose]['sidecars']
+    return config
+
+def apply_download_tuning(config, tuning):
+    """Set yt-dlp download options from a tuning profile"""
+    config['concurrent_fragment_downloads'] = tuning['concurrent_fragment_downloads']
+    config['http_chunk_size'] = tuning['http_chunk_size']
+    if tuning['buffersize']:
+        config['buffersize'] = tuning['buffersize']
+    if tuning['external_downloader']:
+        config['external_downloader'] = {'default': tuning['external_downloader']}
+        if tuning['external_downloader_args']:
+            config['external_downloader_args'] = {'default': list(tuning['external_downloader_args'])}
+    return config
+
+def get_platform_config(platform, user_settings=None, purpose=None):
+    """Get yt-dlp configuration for specific platform (including its download tuning)
+    
+    purpose ('reupload', 'user_download', 'archive') overrides the platform's
+    sidecar settings; None keeps them.
+    """
     # Ultra high quality base config - prefer highest available quality
     base_config = {
         'format': 'best[height>=1440][ext=mp4]/best[height>=1080][ext=mp4]/best[height>=720][ext=mp4]/best[ext=mp4]/best',
@@ -90,7 +239,6 @@ def get_platform_config(platform):
         'retries': 5,
         'file_access_retries': 5,
         'fragment_retries': 5,
-        'http_chunk_size': 10485760,  # 10MB chunks for stability
         'merge_output_format': 'mp4',
     }
     
@@ -100,32 +248,26 @@ def get_platform_config(platform):
             'format': 'best[height>=720][height<=1080][ext=mp4]/best[height>=720][ext=mp4]/best[height>=720]/best[ext=mp4]/best',
             'writesubtitles': True,
             'writeautomaticsub': True,
-            'cookiefile': 'cookies/youtube.txt',  # YouTube authentication cookies - platform specific
         },
         'instagram': {
             **base_config,
             'format': 'best[height>=720][height<=1080][ext=mp4]/best[height>=720][ext=mp4]/best[height>=720]/best[ext=mp4]/best',
-            'cookiefile': 'cookies/insta.txt',  # Instagram authentication cookies
         },
         'facebook': {
             **base_config,
             'format': 'best[height>=720][height<=1080][ext=mp4]/best[height>=720][ext=mp4]/best[height>=720]/best[ext=mp4]/best',
-            'cookiefile': 'cookies/facebook.txt',  # Facebook authentication cookies
         },
         'twitter': {
             **base_config,
             'format': 'best[height>=720][height<=1080][ext=mp4]/best[height>=720][ext=mp4]/best[height>=720]/best[ext=mp4]/best',
-            'cookiefile': 'cookies/x.txt',  # Twitter/X authentication cookies
         },
         'dailymotion': {
             **base_config,
             'format': 'best[height>=720][height<=1080][ext=mp4]/best[height>=720][ext=mp4]/best[height>=720]/best[ext=mp4]/best',
-            'cookiefile': 'cookies/dailymotion.txt',  # Dailymotion authentication cookies
         },
         'vimeo': {
             **base_config,
             'format': 'best[height>=720][height<=1080][ext=mp4]/best[height>=720][ext=mp4]/best[height>=720]/best[ext=mp4]/best',
-            'cookiefile': 'cookies/vimeo_cookies.txt',
         },
         'pinterest': {
             **base_config,
@@ -138,7 +280,6 @@ def get_platform_config(platform):
         'tiktok': {
             **base_config,
             'format': 'best[height>=720][height<=1080][ext=mp4]/best[height>=720][ext=mp4]/best[height>=720]/best[ext=mp4]/best',
-            'cookiefile': 'cookies/insta.txt',  # Use Instagram cookies for TikTok as fallback
         },
         'snapchat': {
             **base_config,
@@ -147,22 +288,15 @@ def get_platform_config(platform):
         'twitch': {
             **base_config,
             'format': 'best[height>=720][height<=1080][ext=mp4]/best[height>=720][ext=mp4]/best[height>=720]/best[ext=mp4]/best',
-            'cookiefile': 'cookies/twitch.txt',  # Twitch authentication cookies
         },
         'rumble': {
             **base_config,
             'format': 'best[height>=1440][ext=mp4]/best[height>=1080][ext=mp4]/best[height>=720][ext=mp4]/best[ext=mp4]/best',
             'writesubtitles': True,
             'merge_output_format': 'mp4',
-            'postprocessors': [{
-                'key': 'FFmpegVideoConvertor',
-                'preferedformat': 'mp4',
-            }],
             'extractor_retries': 5,
-            'http_chunk_size': 10485760,  # 10MB chunks for better stability
             'hls_use_mpegts': False,
             'extract_flat': False,
-            'cookiefile': 'cookies/rumble.txt',  # Rumble authentication cookies
         },
         'direct_url': {
             **base_config,
@@ -173,11 +307,6 @@ def get_platform_config(platform):
             'writeinfojson': False,
             'writedescription': False,
             'merge_output_format': 'mp4',
-            'postprocessors': [{
-                'key': 'FFmpegVideoConvertor',
-                'preferedformat': 'mp4',
-            }],
-            'http_chunk_size': 10485760,  # 10MB chunks for stability
             'retries': 10,  # More retries for direct downloads
             'file_access_retries': 10,
             'fragment_retries': 10,
@@ -186,84 +315,58 @@ def get_platform_config(platform):
             **base_config,
             'format': 'best[height>=720][ext=mp4]/best[ext=mp4]/best',
             'extractor_retries': 5,
-            'http_chunk_size': 10485760,
         },
         'cybervynx': {
             **base_config,
             'format': 'best[height>=720][ext=mp4]/best[ext=mp4]/best',
             'extractor_retries': 5,
-            'http_chunk_size': 10485760,
         },
         'voe': {
             **base_config,
             'format': 'best[height>=720][ext=mp4]/best[ext=mp4]/best',
             'extractor_retries': 5,
-            'http_chunk_size': 10485760,
         },
         'filemoon': {
             **base_config,
             'format': 'best[height>=720][ext=mp4]/best[ext=mp4]/best',
             'extractor_retries': 5,
-            'http_chunk_size': 10485760,
         },
         'newerstream': {
             **base_config,
             'format': 'best[height>=720][ext=mp4]/best[ext=mp4]/best',
             'extractor_retries': 5,
-            'http_chunk_size': 10485760,
         },
         'shortic': {
             **base_config,
             'format': 'best[height>=720][ext=mp4]/best[ext=mp4]/best',
             'extractor_retries': 5,
-            'http_chunk_size': 10485760,
         },
         'smoothpre': {
             **base_config,
             'format': 'best[height>=720][ext=mp4]/best[ext=mp4]/best',
             'extractor_retries': 5,
-            'http_chunk_size': 10485760,
         }
     }
     
-    return platform_configs.get(platform, base_config)
+    config = platform_configs.get(platform, base_config)
+    # Authentication cookies are not part of the config: callers attach the next
+    # healthy jar of the platform's cookie pool (pooled_request)
+    if purpose:
+        apply_download_purpose(config, purpose)
+    apply_media_limits(config)
+    return apply_download_tuning(config, get_download_tuning(platform, user_settings))
 
 def get_available_formats_list(url):
     """Get list of all available formats for a video with complete information"""
     try:
         platform = get_platform_from_url(url)
         
-        # Config to get complete format information (not just list)
-        list_config = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': False,
-            'skip_download': True,
-            'no_check_certificate': True,
-        }
-        
-        # Add cookies for specific platforms
-        if platform == 'youtube':
-            list_config['cookiefile'] = 'cookies/youtube.txt'
-        elif platform == 'instagram':
-            list_config['cookiefile'] = 'cookies/insta.txt'
-        elif platform == 'facebook':
-            list_config['cookiefile'] = 'cookies/facebook.txt'
-        elif platform == 'twitter':
-            list_config['cookiefile'] = 'cookies/x.txt'
-        elif platform == 'vimeo':
-            list_config['cookiefile'] = 'cookies/vimeo.txt'
-        elif platform == 'dailymotion':
-            list_config['cookiefile'] = 'cookies/dailymotion.txt'
-        elif platform == 'twitch':
-            list_config['cookiefile'] = 'cookies/twitch.txt'
-        elif platform == 'rumble':
-            list_config['cookiefile'] = 'cookies/rumble.txt'
-        elif platform == 'tiktok':
-            list_config['cookiefile'] = 'cookies/insta.txt'  # TikTok uses Instagram cookies as fallback
-        
-        with yt_dlp.YoutubeDL(list_config) as ydl:
-            info = ydl.extract_info(url, download=False)
+        # Complete format information (not just list) from this thread's pooled YoutubeDL
+        # for the platform's next cookie jar; paced by the rate limit of that account
+        jar = checkout_jar(platform)
+        with pooled_ydl(build_extractor_options(platform, 'formats'), jar and jar['path']) as ydl:
+            with pooled_request(ydl, platform, jar):
+                info = ydl.extract_info(url, download=False)
             if info and 'formats' in info:
                 # Ensure all formats have complete data
                 formats = info['formats']
@@ -289,14 +392,8 @@ def get_best_available_format(url):
         if not formats:
             return 'best'  # Fallback to generic best
         
-        # Filter video formats and sort by quality
-        video_formats = [f for f in formats if f.get('height') and f.get('vcodec') != 'none']
-        if video_formats:
-            # Sort by height (quality) descending, then by filesize descending
-            video_formats.sort(key=lambda x: (x.get('height', 0), x.get('filesize', 0)), reverse=True)
-            return video_formats[0]['format_id']
-        
-        return 'best'
+        # Highest resolution first, then largest file within that resolution
+        return best_quality_format_id(rank_formats(formats)) or 'best'
     except Exception as e:
         logging.error(f"Error getting best format: {e}")
         return 'best'
@@ -313,199 +410,21 @@ def extract_platform_metadata(url, platform=None):
     # Get safe format that actually exists
     safe_format = get_best_available_format(url)
     
-    # Create safe config for metadata extraction
-    config = {
-        'format': safe_format,  # Use available format instead of specific requirements
-        'quiet': True,
-        'no_warnings': True,
-        'extract_flat': False,
-        'writeinfojson': False,
-        'writedescription': False,
-        'retries': 2,
-        'socket_timeout': 10,
-        'ignoreerrors': True,
-    }
-    
-    # Add cookies for authentication
-    if platform == 'youtube':
-        config['cookiefile'] = 'cookies/youtube.txt'
-    elif platform == 'instagram':
-        config['cookiefile'] = 'cookies/insta.txt'
-    elif platform == 'facebook':
-        config['cookiefile'] = 'cookies/facebook.txt'
-    elif platform == 'twitter':
-        config['cookiefile'] = 'cookies/x.txt'
-    elif platform == 'vimeo':
-        config['cookiefile'] = 'cookies/vimeo.txt'
-    elif platform == 'dailymotion':
-        config['cookiefile'] = 'cookies/dailymotion.txt'
-    elif platform == 'twitch':
-        config['cookiefile'] = 'cookies/twitch.txt'
-    elif platform == 'rumble':
-        config['cookiefile'] = 'cookies/rumble.txt'
-    elif platform == 'tiktok':
-        config['cookiefile'] = 'cookies/insta.txt'  # TikTok uses Instagram cookies as fallback
-    
     try:
-        with yt_dlp.YoutubeDL(config) as ydl:
-            # Add minimal delay for social media platforms to avoid overwhelming servers
-            if platform in ['instagram', 'facebook', 'tiktok', 'twitter']:
-                import time
-                time.sleep(0.5)  # Reduced to 0.5 second delay
-            
-            # Extract info without downloading
-            info = ydl.extract_info(url, download=False)
+        # Use available format instead of specific requirements
+        jar = checkout_jar(platform)
+        with pooled_ydl(build_extractor_options(platform, 'metadata'), jar and jar['path'], format=safe_format) as ydl:
+            # Extract info without downloading, with a pooled cookie jar and paced by its rate limit
+            with pooled_request(ydl, platform, jar):
+                info = ydl.extract_info(url, download=False)
             
             if not info:
                 raise Exception("Failed to extract video information")
             
-            # Clean and format data with comprehensive error handling
-            try:
-                title = clean_string_for_json(info.get('title', 'No title'))
-            except Exception:
-                title = 'No title'
-            
-            try:
-                raw_description = info.get('description', '')
-                # Clean description - remove technical details that shouldn't be in user-facing description
-                description = clean_description_from_technical_details(raw_description)
-                description = clean_string_for_json(description)
-            except Exception:
-                description = 'No description'
-            
-            try:
-                uploader = clean_string_for_json(info.get('uploader', 'Unknown'))
-            except Exception:
-                uploader = 'Unknown'
-            
-            try:
-                duration = int(info.get('duration', 0)) if info.get('duration') else 0
-            except (ValueError, TypeError):
-                duration = 0
-            
-            try:
-                view_count = info.get('view_count', 0)
-                if view_count is None:
-                    view_count = 0
-                # Convert to int if it's a float
-                if isinstance(view_count, float):
-                    view_count = int(view_count)
-            except (ValueError, TypeError):
-                view_count = 0
-            
-            try:
-                thumbnail = str(info.get('thumbnail', ''))
-            except Exception:
-                thumbnail = ''
-            
-            try:
-                upload_date = str(info.get('upload_date', ''))
-            except Exception:
-                upload_date = ''
-            
-            # Platform-specific metadata extraction with error handling
-            tags = []
-            try:
-                if platform == 'youtube':
-                    tags = info.get('tags', []) or []
-                elif platform == 'instagram':
-                    # Extract hashtags from description
-                    hashtags = re.findall(r'#(\w+)', str(description))
-                    tags = hashtags[:10]  # Limit to 10 tags
-                elif platform == 'twitter':
-                    # Extract hashtags and mentions
-                    hashtags = re.findall(r'#(\w+)', str(description) + ' ' + str(title))
-                    tags = hashtags[:10]
-                elif platform == 'facebook':
-                    # Facebook-specific tag extraction
-                    hashtags = re.findall(r'#(\w+)', str(description) + ' ' + str(title))
-                    tags = hashtags[:8]  # Limit to 8 tags for Facebook
-                else:
-                    # Extract tags from description and title for other platforms
-                    tags = extract_tags_from_text(str(title) + ' ' + str(description))
-            except Exception as tag_error:
-                logging.warning(f"Tag extraction failed for {platform}: {tag_error}")
-                tags = []
-            
-            # Format duration
-            duration_str = format_duration(duration)
-            
-            # Format view count with error handling
-            try:
-                view_count_str = format_number(view_count) if view_count is not None else "0"
-            except Exception:
-                view_count_str = "0"
-            
-            # Extract advanced technical information if available
-            advanced_info = {}
-            try:
-                # Get video stream information
-                formats = info.get('formats', [])
-                if formats:
-                    # Find best quality format for technical details
-                    best_format = max(formats, key=lambda x: (x.get('height', 0), x.get('width', 0)))
-                    
-                    advanced_info.update({
-                        'quality': f"{best_format.get('width', 0)}x{best_format.get('height', 0)}" if best_format.get('width') and best_format.get('height') else None,
-                        'video_codec': best_format.get('vcodec', 'Unknown') if best_format.get('vcodec') != 'none' else None,
-                        'audio_codec': best_format.get('acodec', 'Unknown') if best_format.get('acodec') != 'none' else None,
-                        'fps': f"{best_format.get('fps', 0)} FPS" if best_format.get('fps') else None,
-                        'file_size': f"{round(best_format.get('filesize', 0) / (1024 * 1024), 2)} MB" if best_format.get('filesize') and best_format.get('filesize') > 0 else None,
-                        'format': best_format.get('ext', 'Unknown').upper() if best_format.get('ext') else None
-                    })
-                
-                # Additional video info from main info object
-                if info.get('width') and info.get('height'):
-                    advanced_info['quality'] = f"{info.get('width')}x{info.get('height')}"
-                if info.get('fps'):
-                    advanced_info['fps'] = f"{info.get('fps')} FPS"
-                if info.get('filesize') or info.get('filesize_approx'):
-                    filesize = info.get('filesize') or info.get('filesize_approx')
-                    if filesize and filesize > 0:
-                        advanced_info['file_size'] = f"{round(filesize / (1024 * 1024), 2)} MB"
-                
-            except Exception as tech_error:
-                logging.warning(f"Advanced technical info extraction failed: {tech_error}")
-            
-            # Build enhanced description for platforms with technical details
-            enhanced_description = clean_string_for_json(description)
-            if advanced_info and platform in ['rumble', 'vimeo', 'dailymotion']:
-                tech_details = []
-                if advanced_info.get('quality'):
-                    tech_details.append(f"**Resolution:** {advanced_info['quality']}")
-                if advanced_info.get('file_size'):
-                    tech_details.append(f"**File Size:** {advanced_info['file_size']}")
-                if advanced_info.get('format'):
-                    tech_details.append(f"**Format:** {advanced_info['format']}")
-                if advanced_info.get('fps'):
-                    tech_details.append(f"**Frame Rate:** {advanced_info['fps']}")
-                if advanced_info.get('video_codec'):
-                    tech_details.append(f"**Video Codec:** {advanced_info['video_codec']}")
-                if advanced_info.get('audio_codec'):
-                    tech_details.append(f"**Audio Codec:** {advanced_info['audio_codec']}")
-                
-                if tech_details:
-                    enhanced_description += f"\n\n--- **Technical Details** ---\n" + "\n".join(tech_details)
-            
-            # Ensure all strings are properly cleaned for JSON serialization
-            result = {
-                'title': clean_string_for_json(title),
-                'description': enhanced_description,
-                'uploader': clean_string_for_json(uploader),
-                'duration': duration_str,
-                'view_count': view_count_str,
-                'thumbnail': thumbnail or '',
-                'tags': [clean_string_for_json(tag) for tag in tags],
-                'url': url,
-                'platform': platform,
-                'upload_date': upload_date
-            }
-            
-            # Add advanced technical info to result
-            result.update(advanced_info)
-            
-            return result
+            return build_metadata_from_info(info, url, platform)
             
+    except PlatformCoolingDown:
+        raise
     except Exception as e:
         error_msg = str(e)
         logging.error(f"Error extracting metadata from {platform}: {error_msg}")
@@ -520,41 +439,271 @@ def extract_platform_metadata(url, platform=None):
         else:
             raise Exception(f"Failed to extract metadata from {platform}: {clean_string_for_json(error_msg)}")
 
-def download_from_platform(url, output_path='downloads', platform=None, progress_callback=None):
-    """Download video from any supported platform"""
+def build_metadata_from_info(info, url, platform):
+    """Build the metadata response dict from a yt-dlp info dict"""
+    # Clean and format data with comprehensive error handling
+    try:
+        title = clean_string_for_json(info.get('title', 'No title'))
+    except Exception:
+        title = 'No title'
+    
+    try:
+        raw_description = info.get('description', '')
+        # Clean description - remove technical details that shouldn't be in user-facing description
+        description = clean_description_from_technical_details(raw_description)
+        description = clean_string_for_json(description)
+    except Exception:
+        description = 'No description'
+    
+    try:
+        uploader = clean_string_for_json(info.get('uploader', 'Unknown'))
+    except Exception:
+        uploader = 'Unknown'
+    
+    try:
+        duration = int(info.get('duration', 0)) if info.get('duration') else 0
+    except (ValueError, TypeError):
+        duration = 0
+    
+    try:
+        view_count = info.get('view_count', 0)
+        if view_count is None:
+            view_count = 0
+        # Convert to int if it's a float
+        if isinstance(view_count, float):
+            view_count = int(view_count)
+    except (ValueError, TypeError):
+        view_count = 0
+    
+    try:
+        thumbnail = str(info.get('thumbnail', ''))
+    except Exception:
+        thumbnail = ''
+    
+    try:
+        upload_date = str(info.get('upload_date', ''))
+    except Exception:
+        upload_date = ''
+    
+    # Platform-specific metadata extraction with error handling
+    tags = []
+    try:
+        if platform == 'youtube':
+            tags = info.get('tags', []) or []
+        elif platform == 'instagram':
+            # Extract hashtags from description
+            hashtags = HASHTAG_RE.findall(str(description))
+            tags = hashtags[:10]  # Limit to 10 tags
+        elif platform == 'twitter':
+            # Extract hashtags and mentions
+            hashtags = HASHTAG_RE.findall(str(description) + ' ' + str(title))
+            tags = hashtags[:10]
+        elif platform == 'facebook':
+            # Facebook-specific tag extraction
+            hashtags = HASHTAG_RE.findall(str(description) + ' ' + str(title))
+            tags = hashtags[:8]  # Limit to 8 tags for Facebook
+        else:
+            # Extract tags from description and title for other platforms
+            tags = extract_tags_from_text(str(title) + ' ' + str(description))
+    except Exception as tag_error:
+        logging.warning(f"Tag extraction failed for {platform}: {tag_error}")
+        tags = []
+    
+    # Format duration
+    duration_str = format_duration(duration)
+    
+    # Format view count with error handling
+    try:
+        view_count_str = format_number(view_count) if view_count is not None else "0"
+    except Exception:
+        view_count_str = "0"
+    
+    # Extract advanced technical information if available
+    advanced_info = {}
+    try:
+        # Get video stream information
+        formats = info.get('formats', [])
+        if formats:
+            # Find best quality format for technical details
+            best_format = max(formats, key=lambda x: (x.get('height', 0), x.get('width', 0)))
+    
+            advanced_info.update({
+                'quality': f"{best_format.get('width', 0)}x{best_format.get('height', 0)}" if best_format.get('width') and best_format.get('height') else None,
+                'video_codec': best_format.get('vcodec', 'Unknown') if best_format.get('vcodec') != 'none' else None,
+                'audio_codec': best_format.get('acodec', 'Unknown') if best_format.get('acodec') != 'none' else None,
+                'fps': f"{best_format.get('fps', 0)} FPS" if best_format.get('fps') else None,
+                'file_size': f"{round(best_format.get('filesize', 0) / (1024 * 1024), 2)} MB" if best_format.get('filesize') and best_format.get('filesize') > 0 else None,
+                'format': best_format.get('ext', 'Unknown').upper() if best_format.get('ext') else None
+            })
+    
+        # Additional video info from main info object
+        if info.get('width') and info.get('height'):
+            advanced_info['quality'] = f"{info.get('width')}x{info.get('height')}"
+        if info.get('fps'):
+            advanced_info['fps'] = f"{info.get('fps')} FPS"
+        if info.get('filesize') or info.get('filesize_approx'):
+            filesize = info.get('filesize') or info.get('filesize_approx')
+            if filesize and filesize > 0:
+                advanced_info['file_size'] = f"{round(filesize / (1024 * 1024), 2)} MB"
+    
+    except Exception as tech_error:
+        logging.warning(f"Advanced technical info extraction failed: {tech_error}")
+    
+    # Build enhanced description for platforms with technical details
+    enhanced_description = clean_string_for_json(description)
+    if advanced_info and platform in ['rumble', 'vimeo', 'dailymotion']:
+        tech_details = []
+        if advanced_info.get('quality'):
+            tech_details.append(f"**Resolution:** {advanced_info['quality']}")
+        if advanced_info.get('file_size'):
+            tech_details.append(f"**File Size:** {advanced_info['file_size']}")
+        if advanced_info.get('format'):
+            tech_details.append(f"**Format:** {advanced_info['format']}")
+        if advanced_info.get('fps'):
+            tech_details.append(f"**Frame Rate:** {advanced_info['fps']}")
+        if advanced_info.get('video_codec'):
+            tech_details.append(f"**Video Codec:** {advanced_info['video_codec']}")
+        if advanced_info.get('audio_codec'):
+            tech_details.append(f"**Audio Codec:** {advanced_info['audio_codec']}")
+    
+        if tech_details:
+            enhanced_description += f"\n\n--- **Technical Details** ---\n" + "\n".join(tech_details)
+    
+    # Ensure all strings are properly cleaned for JSON serialization
+    result = {
+        'title': clean_string_for_json(title),
+        'description': enhanced_description,
+        'uploader': clean_string_for_json(uploader),
+        'duration': duration_str,
+        'view_count': view_count_str,
+        'thumbnail': thumbnail or '',
+        'tags': clean_strings_for_json(tags),
+        'url': url,
+        'platform': platform,
+        'upload_date': upload_date
+    }
+    
+    # Add advanced technical info to result
+    result.update(advanced_info)
+    
+    return result
+
+def extract_light_metadata(url, snippet, platform=None):
+    """Build metadata from an API/RSS snippet without calling the extractor
+
+    Used by channel automation, where the YouTube API or RSS response already
+    carries the title, description and publish date. Fields that need the
+    extractor (duration, technical details) are filled in at download time
+    from the download's own info dict via build_metadata_from_info.
+    """
+    if not platform:
+        platform = 'youtube' if 'youtube.com' in url or 'youtu.be' in url else get_platform_from_url(url)
+    
+    # API snippets use ISO 8601 (publishedAt), RSS uses "published"; normalize to yt-dlp's YYYYMMDD
+    published = snippet.get('published_at') or snippet.get('published') or ''
+    upload_date = re.sub(r'[^0-9]', '', published[:10]) if re.match(r'\d{4}-\d{2}-\d{2}', published) else ''
+    
+    title = clean_string_for_json(snippet.get('title', 'No title'))
+    description = clean_string_for_json(snippet.get('description', ''))
+    
+    return {
+        'title': title,
+        'description': description,
+        'uploader': clean_string_for_json(snippet.get('channel_title', '')),
+        'duration': '',
+        'view_count': '',
+        'thumbnail': snippet.get('thumbnail_url') or snippet.get('thumbnail') or '',
+        'tags': [],
+        'url': url,
+        'platform': platform,
+        'upload_date': upload_date,
+        'metadata_mode': 'light'
+    }
+
+def get_downloaded_filepath(ydl, info):
+    """Get the final file path of a completed download (after merging/post-processing)"""
+    requested = info.get('requested_downloads') or []
+    if requested and requested[0].get('filepath'):
+        return requested[0]['filepath']
+    return ydl.prepare_filename(info)
+
+def download_from_platform(url, output_path='downloads', platform=None, progress_callback=None, return_info=False, partial_root=None, purpose='reupload'):
+    """Download video from any supported platform
+    
+    The file is written to output_path as '<title> [<id>].<ext>'; pass a job
+    directory (job_workspace.create_job_dir) as output_path and the shared
+    downloads directory as partial_root to keep resumable partials.
+    With return_info=True returns (filename, info) so callers can reuse the
+    info dict of the download instead of running another extraction. For
+    re-uploads info['memory_subtitles'] then holds the subtitle tracks
+    (fetched into memory) to attach to the upload.
+    """
     if not platform:
         platform = get_platform_from_url(url)
     
     # Create downloads directory if it doesn't exist
     os.makedirs(output_path, exist_ok=True)
     
-    config = get_platform_config(platform)
-    config['outtmpl'] = os.path.join(output_path, '%(title)s.%(ext)s')
+    config = get_platform_config(platform, purpose=purpose)
+    
+    # Stable partial path per URL + format so retries/restarts resume
+    job = start_download(url, config['format'], output_path, partial_root)
+    config['outtmpl'] = job['outtmpl']
     
     # Progress hook
     def progress_hook(d):
+        record_progress(job, d)
+        if d['status'] == 'downloading':
+            record_usage(output_path, d.get('downloaded_bytes'))
         if progress_callback and d['status'] == 'downloading':
             progress_callback(d)
     
     config['progress_hooks'] = [progress_hook]
     
     try:
+        jar = checkout_jar(platform)
         with yt_dlp.YoutubeDL(config) as ydl:
-            # Download the video
-            ydl.download([url])
+            # With the platform's next cookie jar, paced by the rate limit of that account
+            with pooled_request(ydl, platform, jar):
+                info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+            
+            # Reserve scratch space for the selected format(s) before downloading
+            selected = ydl.process_ie_result(copy.deepcopy(info), download=False) or {}
+            requested_formats = selected.get('requested_formats') or [selected]
+            size = probe_download_size(requested_formats, info.get('duration'))['size']
+            reserve_space(output_path, estimate_job_bytes(size, len(requested_formats) > 1))
             
-            # Get the downloaded file path
-            info = ydl.extract_info(url, download=False)
-            filename = ydl.prepare_filename(info)
+            def produce():
+                # Parallel ranged fetch for progressive HTTP sources, then download/post-process
+                # from the same info dict (no second extraction)
+                prefetch_progressive_download(ydl, info, config['progress_hooks'])
+                return get_downloaded_filepath(ydl, ydl.process_ie_result(info, download=True))
             
+            # Shared/cached download when the download cache is enabled, then the final name
+            filename = fetch_download(resolve_cache_key(ydl, info, purpose), final_stem(job, info), produce)
+            filename = finish_download(job, filename, info)
+            
+            # Convert only if the container/codecs need it (usually nothing to do)
+            info['postprocess'] = postprocess_media(filename, DOWNLOAD_PURPOSES[purpose]['postprocess_target'])
+            filename = info['postprocess']['path']
+            
+            if return_info:
+                if DOWNLOAD_PURPOSES[purpose]['memory_subtitles']:
+                    info['memory_subtitles'] = fetch_subtitle_tracks(ydl, info)
+                return filename, info
             return filename
             
     except Exception as e:
+        fail_download(job, e)
         logging.error(f"Error downloading from {platform}: {e}")
         raise Exception(f"Failed to download from {platform}: {str(e)}")
+    finally:
+        release_held_slots()
+        release_space(output_path)
 
 def download_and_upload_multi_platform(url, access_token, user_id, title, description, tags, privacy, upload_id, progress_data):
     """Download from any platform and upload to YouTube"""
+    job_dir = None
     try:
         # Detect platform
         platform = get_platform_from_url(url)
@@ -601,30 +750,20 @@ def download_and_upload_multi_platform(url, access_token, user_id, title, descri
                 progress_data[upload_id]['status'] = 'download_complete'
                 progress_data[upload_id]['progress'] = 50
         
-        # Download the video
-        downloaded_file = download_from_platform(url, 'downloads', platform, download_progress)
+        # Download the video into this job's own directory
+        job_dir = create_job_dir('downloads', upload_id)
+        downloaded_file, info = download_from_platform(url, job_dir, platform, download_progress, return_info=True, partial_root='downloads')
         
         if not os.path.exists(downloaded_file):
             raise Exception("Downloaded file not found")
         
         progress_data[upload_id]['status'] = 'uploading'
         progress_data[upload_id]['local_file'] = downloaded_file
+        progress_data[upload_id]['postprocess'] = info.get('postprocess')
         
         # Upload to YouTube
-        result = upload_to_youtube(downloaded_file, access_token, title, description, tags, privacy, upload_id, progress_data)
-        
-        # Clean up downloaded file
-        try:
-            os.remove(downloaded_file)
-            # Also remove info and description files if they exist
-            info_file = downloaded_file + '.info.json'
-            desc_file = downloaded_file + '.description'
-            if os.path.exists(info_file):
-                os.remove(info_file)
-            if os.path.exists(desc_file):
-                os.remove(desc_file)
-        except Exception as e:
-            logging.warning(f"Could not clean up files: {e}")
+        result = upload_to_youtube(downloaded_file, access_token, title, description, tags, privacy, upload_id, progress_data,
+                                   captions=info.get('memory_subtitles'))
         
         progress_data[upload_id]['status'] = 'completed'
         progress_data[upload_id]['progress'] = 100
@@ -636,9 +775,12 @@ def download_and_upload_multi_platform(url, access_token, user_id, title, descri
         progress_data[upload_id]['error'] = str(e)
         logging.error(f"Multi-platform download/upload error: {e}")
         raise
+    finally:
+        # Clean up the video with its info/description files
+        remove_job_dir(job_dir)
 
-def upload_to_youtube(video_file, access_token, title, description, tags, privacy, upload_id, progress_data):
-    """Upload video file to YouTube"""
+def upload_to_youtube(video_file, access_token, title, description, tags, privacy, upload_id, progress_data, captions=None):
+    """Upload video file to YouTube (with optional in-memory caption tracks)"""
     try:
         # Create credentials from access token
         from google.auth.transport.requests import Request
@@ -724,6 +866,7 @@ def upload_to_youtube(video_file, access_token, title, description, tags, privac
         if response:
             video_id = response.get('id')
             video_url = f"https://www.youtube.com/watch?v={video_id}"
+            upload_captions(youtube, video_id, captions)
             
             return {
                 'success': True,
@@ -816,7 +959,7 @@ def extract_tags_from_text(text):
     }
     
     # Extract words that could be tags
-    words = re.findall(r'\b[a-zA-Z]{3,}\b', text.lower())
+    words = TAG_WORD_RE.findall(text.lower())
     tags = []
     
     for word in words:
@@ -856,92 +999,15 @@ def is_platform_supported(url):
     platform = get_platform_from_url(url)
     return platform in get_supported_platforms()
 
-def clean_string_for_json(text):
-    """Clean string for safe JSON serialization"""
-    if not text:
-        return ''
-    
-    try:
-        # Convert to string and handle encoding issues
-        if not isinstance(text, str):
-            text = str(text)
-        
-        # Remove non-printable characters and clean up
-        import re
-        text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text)
-        
-        # Remove or replace problematic characters for JSON
-        text = text.replace('\\', '').replace('\r', '').replace('\n', ' ')
-        
-        # Limit length to prevent huge JSON responses
-        if len(text) > 5000:
-            text = text[:5000] + '...'
-        
-        return text.strip()
-    except Exception:
-        return 'Content unavailable'
-
 def get_advanced_video_metadata(file_path_or_url):
-    """Extract detailed video metadata using ffprobe"""
+    """Extract detailed video metadata using ffprobe (cached per file fingerprint / URL validators)"""
     try:
-        cmd = [
-            "ffprobe", "-v", "quiet", "-print_format", "json",
-            "-show_format", "-show_streams", file_path_or_url
-        ]
-        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=30)
-        
-        if result.returncode != 0:
-            raise Exception(f"FFprobe failed: {result.stderr}")
-            
-        probe_data = json.loads(result.stdout)
-        
-        # Extract format information
-        format_info = probe_data.get('format', {})
-        streams = probe_data.get('streams', [])
-        
-        # Find video stream
-        video_stream = None
-        audio_stream = None
-        
-        for stream in streams:
-            if stream.get('codec_type') == 'video' and not video_stream:
-                video_stream = stream
-            elif stream.get('codec_type') == 'audio' and not audio_stream:
-                audio_stream = stream
-        
-        # Extract comprehensive metadata
-        metadata = {}
-        
-        # File information
-        metadata['file_size'] = int(format_info.get('size', 0))
-        metadata['file_size_mb'] = round(metadata['file_size'] / (1024 * 1024), 2) if metadata['file_size'] > 0 else 0
-        metadata['duration'] = float(format_info.get('duration', 0))
-        metadata['bitrate'] = int(format_info.get('bit_rate', 0))
-        metadata['format_name'] = format_info.get('format_name', 'Unknown')
-        
-        # Video stream information
-        if video_stream:
-            metadata['width'] = int(video_stream.get('width', 0))
-            metadata['height'] = int(video_stream.get('height', 0))
-            metadata['video_codec'] = video_stream.get('codec_name', 'Unknown')
-            metadata['video_bitrate'] = int(video_stream.get('bit_rate', 0)) if video_stream.get('bit_rate') else 0
-            metadata['fps'] = video_stream.get('r_frame_rate', '0/1')
-            
-            # Calculate FPS from fraction
-            if '/' in str(metadata['fps']):
-                try:
-                    num, den = map(int, str(metadata['fps']).split('/'))
-                    metadata['fps'] = round(num / den, 2) if den > 0 else 0
-                except:
-                    metadata['fps'] = 0
-        
-        # Audio stream information
-        if audio_stream:
-            metadata['audio_codec'] = audio_stream.get('codec_name', 'Unknown')
-            metadata['audio_bitrate'] = int(audio_stream.get('bit_rate', 0)) if audio_stream.get('bit_rate') else 0
-            metadata['sample_rate'] = int(audio_stream.get('sample_rate', 0)) if audio_stream.get('sample_rate') else 0
-            metadata['channels'] = int(audio_stream.get('channels', 0)) if audio_stream.get('channels') else 0
+        if os.path.exists(file_path_or_url):
+            return parse_probe_metadata(probe_file(file_path_or_url, timeout=30))
         
+        metadata = analyze_direct_url(file_path_or_url)['metadata']
+        if not metadata:
+            raise Exception("FFprobe could not analyze the URL")
         return metadata
         
     except subprocess.TimeoutExpired:
@@ -953,23 +1019,20 @@ def get_advanced_video_metadata(file_path_or_url):
 
 def extract_direct_url_metadata(url):
     """Extract metadata from direct video URLs with comprehensive analysis"""
-    import urllib.parse
     from urllib.parse import urlparse
-    import requests
-    import yt_dlp
     
     try:
-        # First verify this is actually a direct video URL
+        # HEAD, first/last range fetch and thumbnail discovery run concurrently; ffprobe reads the ranges locally
         try:
-            response = requests.head(url, timeout=10, allow_redirects=True)
-            content_type = response.headers.get('content-type', '').lower()
+            analysis = get_direct_url_analysis(url)
+            content_type = analysis['content_type']
             
             if not (content_type.startswith('video') or 'mpegurl' in content_type):
                 raise Exception("URL does not point to a direct video file")
                 
             # Get file info from headers
-            file_size = response.headers.get('content-length')
-            content_disposition = response.headers.get('content-disposition', '')
+            file_size = analysis['content_length']
+            content_disposition = analysis['content_disposition']
             
         except Exception as e:
             raise Exception(f"Failed to verify direct video URL: {str(e)}")
@@ -1006,44 +1069,15 @@ def extract_direct_url_metadata(url):
         # Clean up title
         title = title.replace('_', ' ').replace('-', ' ').replace('%20', ' ')
         
-        # Get advanced metadata using ffprobe
-        advanced_metadata = {}
-        try:
-            advanced_metadata = get_advanced_video_metadata(url)
-        except Exception as probe_error:
-            logging.warning(f"FFprobe analysis failed: {probe_error}")
-        
-        # Try to get detailed video information using yt-dlp
-        ydl_metadata = {}
-        try:
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'extract_flat': False,
-                'skip_download': True
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-                if info:
-                    ydl_metadata = {
-                        'duration': info.get('duration', 0),
-                        'width': info.get('width', 0),
-                        'height': info.get('height', 0),
-                        'filesize': info.get('filesize', 0) or info.get('filesize_approx', 0),
-                        'thumbnails': info.get('thumbnails', [])[:10]
-                    }
-                        
-        except Exception as ydl_error:
-            logging.warning(f"yt-dlp metadata extraction failed: {ydl_error}")
+        # Container/stream metadata from the partial probe
+        advanced_metadata = analysis['metadata']
         
         # Combine metadata from all sources (ffprobe takes priority)
-        duration = advanced_metadata.get('duration', 0) or ydl_metadata.get('duration', 0)
+        duration = advanced_metadata.get('duration', 0)
         duration_str = format_duration(int(duration)) if duration else 'Unknown'
         
-        # File size (ffprobe > yt-dlp > HTTP headers)
-        filesize = advanced_metadata.get('file_size', 0) or ydl_metadata.get('filesize', 0)
+        # File size (ffprobe > HTTP headers)
+        filesize = advanced_metadata.get('file_size', 0)
         if not filesize and file_size:
             try:
                 filesize = int(file_size)
@@ -1052,9 +1086,9 @@ def extract_direct_url_metadata(url):
         
         file_size_mb = round(filesize / (1024 * 1024), 2) if filesize > 0 else 0
         
-        # Video quality (ffprobe > yt-dlp)
-        width = advanced_metadata.get('width', 0) or ydl_metadata.get('width', 0)
-        height = advanced_metadata.get('height', 0) or ydl_metadata.get('height', 0)
+        # Video quality (ffprobe)
+        width = advanced_metadata.get('width', 0)
+        height = advanced_metadata.get('height', 0)
         quality = f"{width}x{height}" if width and height else 'Unknown'
         
         # Build comprehensive description with all available info
@@ -1097,9 +1131,8 @@ def extract_direct_url_metadata(url):
         
         description = "\n".join(description_parts) if description_parts else "Direct video file"
         
-        # Get thumbnails
-        thumbnails = ydl_metadata.get('thumbnails', [])
-        thumbnail_urls = [thumb.get('url', '') for thumb in thumbnails if thumb.get('url')]
+        # Images published next to the file ('<name>.jpg', ...)
+        thumbnail_urls = analysis['thumbnails']
         
         return {
             'title': clean_string_for_json(title) if title else filename,
@@ -1182,207 +1215,85 @@ def get_platform_display_name(platform):
     }
     return display_names.get(platform, platform.title())
 
-def clean_description_from_technical_details(raw_description):
-    """Clean description by removing technical details that should not be shown to users"""
-    if not raw_description:
-        return "No description available"
-    
-    # Remove technical details patterns that shouldn't be in user-facing descriptions
-    technical_patterns = [
-        r'--- \*\*Technical Details\*\* ---.*?(?=\n\n|\Z)',
-        r'\*\*Technical Details\*\*.*?(?=\n\n|\Z)',
-        r'\*\*Resolution:\*\*.*?(?=\n|\Z)',
-        r'\*\*Format:\*\*.*?(?=\n|\Z)',
-        r'\*\*Video Codec:\*\*.*?(?=\n|\Z)',
-        r'\*\*Audio Codec:\*\*.*?(?=\n|\Z)',
-        r'\*\*Bitrate:\*\*.*?(?=\n|\Z)',
-        r'\*\*FPS:\*\*.*?(?=\n|\Z)',
-        r'\*\*File Size:\*\*.*?(?=\n|\Z)',
-        r'\*\*Sample Rate:\*\*.*?(?=\n|\Z)',
-        r'\*\*Audio:\*\*.*?(?=\n|\Z)',
-        r'\*\*Total Bitrate:\*\*.*?(?=\n|\Z)'
-    ]
+def get_video_qualities_info(url, return_info=False):
+    """Get available video qualities and file sizes for a URL using --list-formats approach
     
-    clean_desc = raw_description
-    for pattern in technical_patterns:
-        clean_desc = re.sub(pattern, '', clean_desc, flags=re.DOTALL | re.MULTILINE)
-    
-    # Clean up extra whitespace and newlines
-    clean_desc = re.sub(r'\n\s*\n\s*\n', '\n\n', clean_desc)  # Replace multiple newlines with double newlines
-    clean_desc = clean_desc.strip()
-    
-    return clean_desc if clean_desc else "No description available"
-
-def get_video_qualities_info(url):
-    """Get available video qualities and file sizes for a URL using --list-formats approach"""
+    With return_info=True returns (qualities, info) where info is the sanitized
+    info dict of the listing (None when nothing usable was extracted), so the
+    download of a selected quality can reuse it instead of re-extracting.
+    """
+    info = None
     try:
         platform = get_platform_from_url(url)
         
         # Use --list-formats equivalent config for accurate data
-        list_config = {
-            'quiet': True,
-            'no_warnings': True,
-            'listformats': False,  # We want actual format data, not just list
-            'extract_flat': False,
-        }
-        
-        # Add cookies for specific platforms
-        if platform == 'youtube':
-            list_config['cookiefile'] = 'cookies/cookies.txt'
-        elif platform == 'instagram':
-            list_config['cookiefile'] = 'cookies/instagram_cookies.txt'
-        elif platform == 'vimeo':
-            list_config['cookiefile'] = 'cookies/vimeo_cookies.txt'
-        
-        with yt_dlp.YoutubeDL(list_config) as ydl:
-            info = ydl.extract_info(url, download=False)
+        jar = checkout_jar(platform)
+        with pooled_ydl(build_extractor_options(platform, 'qualities'), jar and jar['path']) as ydl:
+            with pooled_request(ydl, platform, jar):
+                info = ydl.extract_info(url, download=False)
             
             if not info or 'formats' not in info:
-                return [
+                qualities = [
                     {'format_id': 'best', 'height': 'Best Available', 'filesize': '~Auto', 'fps': 30, 'ext': 'mp4'}
                 ]
+                return (qualities, None) if return_info else qualities
             
+            info = ydl.sanitize_info(info)
             formats = info['formats']
             qualities = []
-            seen_heights = set()
-            
-            # Filter and sort formats by quality  
-            video_formats = [f for f in formats if f.get('height') and f.get('vcodec') != 'none']
             
-            # Group formats by height to find the best representative for each resolution
-            height_groups = {}
-            for fmt in video_formats:
-                height = fmt.get('height')
-                if height:
-                    if height not in height_groups:
-                        height_groups[height] = []
-                    height_groups[height].append(fmt)
+            # Score all video formats once and take the best representative per height
+            ranking = rank_formats(formats, info.get('duration'))
             
-            # Sort by height descending
-            for height in sorted(height_groups.keys(), reverse=True):
-                if height not in seen_heights:
-                    seen_heights.add(height)
-                    
-                    # Choose the best format for this height
-                    formats_for_height = height_groups[height]
-                    
-                    # Choose the format with the best balance of quality and efficiency
-                    # Prefer smaller bitrates and file sizes while maintaining quality
-                    def format_score(fmt):
-                        score = 0
-                        
-                        # Get bitrate info
-                        tbr = fmt.get('tbr', 0) or fmt.get('vbr', 0) or 0
-                        filesize = fmt.get('filesize') or fmt.get('filesize_approx') or 0
-                        
-                        # Define target bitrates for each resolution (reasonable quality)
-                        target_bitrates = {
-                            2160: 15000,  # 4K: 15 Mbps target
-                            1440: 10000,  # 1440p: 10 Mbps target  
-                            1080: 6000,   # 1080p: 6 Mbps target
-                            720: 4000,    # 720p: 4 Mbps target
-                            480: 2000,    # 480p: 2 Mbps target
-                            360: 1000,    # 360p: 1 Mbps target
-                        }
-                        
-                        # Find target bitrate for this height
-                        target = target_bitrates.get(height, 5000)
-                        
-                        # Heavily prefer formats with filesize info
-                        if filesize > 0:
-                            score += 10000
-                            # For formats with filesize, prefer smaller files (efficiency)
-                            # Calculate size per minute to normalize for duration
-                            duration = info.get('duration', 180) or 180  # fallback to 3 min
-                            size_per_min = filesize / (duration / 60) if duration > 0 else filesize
-                            # Penalty increases with file size - prefer smaller files
-                            score -= int(size_per_min / (1024 * 1024))  # Penalty per MB per minute
-                        
-                        # For bitrate scoring, prefer rates close to target (not too high)
-                        if tbr > 0:
-                            score += 5000  # Has bitrate info
-                            # Calculate distance from target (penalty for being too far from ideal)
-                            distance_from_target = abs(tbr - target)
-                            if tbr <= target * 1.5:  # Within 150% of target is good
-                                score += 2000
-                                # Prefer lower bitrates when close to target
-                                score += int((target * 1.5 - tbr) / 100)  # More points for lower bitrate
-                            else:
-                                # Penalty for very high bitrates
-                                score -= int(distance_from_target / 100)
-                        
-                        # Format preferences
-                        if fmt.get('ext') == 'mp4':
-                            score += 500
-                        
-                        # Codec preferences (efficient codecs)
-                        vcodec = fmt.get('vcodec', '').lower()
-                        if any(codec in vcodec for codec in ['avc1', 'h264', 'x264']):
-                            score += 200
-                        elif 'vp9' in vcodec:
-                            score += 150  # VP9 is efficient
-                        elif 'av01' in vcodec:
-                            score += 100  # AV1 is very efficient but less compatible
-                        
-                        return score
-                    
-                    # Sort formats by score and pick the best one
-                    formats_for_height.sort(key=format_score, reverse=True)
-                    fmt = formats_for_height[0]
-                    
-                    # Debug logging for format selection
-                    if len(formats_for_height) > 1:
-                        selected_tbr = fmt.get('tbr', 0) or fmt.get('vbr', 0) or 0
-                        selected_size = fmt.get('filesize') or fmt.get('filesize_approx') or 0
-                        logging.debug(f"Selected {height}p format: bitrate={selected_tbr}kbps, size={selected_size}bytes, score={format_score(fmt)}")
-                        # Log alternatives for comparison
-                        for alt_fmt in formats_for_height[1:3]:  # Show up to 2 alternatives
-                            alt_tbr = alt_fmt.get('tbr', 0) or alt_fmt.get('vbr', 0) or 0
-                            alt_size = alt_fmt.get('filesize') or alt_fmt.get('filesize_approx') or 0
-                            logging.debug(f"  Alternative {height}p: bitrate={alt_tbr}kbps, size={alt_size}bytes, score={format_score(alt_fmt)}")
-                    
-                    # Get real file size from format data
-                    filesize = fmt.get('filesize') or fmt.get('filesize_approx')
+            for entry in ranking['best_by_height']:
+                fmt = entry['format']
+                height = entry['height']
+                
+                # Debug logging for format selection
+                log_height_selection(ranking, entry)
+                
+                # Get real file size from format data
+                filesize = fmt.get('filesize') or fmt.get('filesize_approx')
+                
+                if filesize and filesize > 0:
+                    if filesize < 1024 * 1024:  # Less than 1MB
+                        size_str = f"{round(filesize / 1024, 1)} KB"
+                    elif filesize < 1024 * 1024 * 1024:  # Less than 1GB
+                        size_mb = round(filesize / (1024 * 1024), 1)
+                        size_str = f"{size_mb} MB"
+                    else:  # 1GB or larger
+                        size_gb = round(filesize / (1024 * 1024 * 1024), 1)
+                        size_str = f"{size_gb} GB"
+                else:
+                    # If no exact size, try to calculate from bitrate and duration
+                    tbr = fmt.get('tbr') or fmt.get('vbr', 0)  # Total bitrate or video bitrate
+                    duration = info.get('duration', 0)
                     
-                    if filesize and filesize > 0:
-                        if filesize < 1024 * 1024:  # Less than 1MB
-                            size_str = f"{round(filesize / 1024, 1)} KB"
-                        elif filesize < 1024 * 1024 * 1024:  # Less than 1GB
-                            size_mb = round(filesize / (1024 * 1024), 1)
-                            size_str = f"{size_mb} MB"
-                        else:  # 1GB or larger
-                            size_gb = round(filesize / (1024 * 1024 * 1024), 1)
-                            size_str = f"{size_gb} GB"
-                    else:
-                        # If no exact size, try to calculate from bitrate and duration
-                        tbr = fmt.get('tbr') or fmt.get('vbr', 0)  # Total bitrate or video bitrate
-                        duration = info.get('duration', 0)
-                        
-                        if tbr and duration and tbr > 0 and duration > 0:
-                            # Calculate size: bitrate (kbps) * duration (seconds) / 8 (bits to bytes) / 1024 (to MB)
-                            estimated_mb = (tbr * duration) / (8 * 1024)
-                            if estimated_mb < 1:
-                                size_str = f"~{round(estimated_mb * 1024)} KB"
-                            elif estimated_mb < 1024:
-                                size_str = f"~{round(estimated_mb)} MB"
-                            else:
-                                size_str = f"~{round(estimated_mb / 1024, 1)} GB"
+                    if tbr and duration and tbr > 0 and duration > 0:
+                        # Calculate size: bitrate (kbps) * duration (seconds) / 8 (bits to bytes) / 1024 (to MB)
+                        estimated_mb = (tbr * duration) / (8 * 1024)
+                        if estimated_mb < 1:
+                            size_str = f"~{round(estimated_mb * 1024)} KB"
+                        elif estimated_mb < 1024:
+                            size_str = f"~{round(estimated_mb)} MB"
                         else:
-                            # Last resort - basic estimation based on quality
-                            estimated_size = estimate_file_size(height, duration or 180)
-                            size_str = f"~{estimated_size}"
-                    
-                    qualities.append({
-                        'format_id': fmt.get('format_id'),
-                        'height': height,
-                        'filesize': size_str,
-                        'fps': fmt.get('fps', 30),
-                        'ext': fmt.get('ext', 'mp4'),
-                        'tbr': fmt.get('tbr', 0),  # Total bitrate
-                        'vbr': fmt.get('vbr', 0),  # Video bitrate
-                        'protocol': fmt.get('protocol', 'https'),
-                        'format_note': fmt.get('format_note', '')
-                    })
+                            size_str = f"~{round(estimated_mb / 1024, 1)} GB"
+                    else:
+                        # Last resort - basic estimation based on quality
+                        estimated_size = estimate_file_size(height, duration or 180)
+                        size_str = f"~{estimated_size}"
+                
+                qualities.append({
+                    'format_id': fmt.get('format_id'),
+                    'height': height,
+                    'filesize': size_str,
+                    'fps': fmt.get('fps', 30),
+                    'ext': fmt.get('ext', 'mp4'),
+                    'tbr': fmt.get('tbr', 0),  # Total bitrate
+                    'vbr': fmt.get('vbr', 0),  # Video bitrate
+                    'protocol': fmt.get('protocol', 'https'),
+                    'format_note': fmt.get('format_note', '')
+                })
             
             # If no video formats found, try to get any formats
             if not qualities:
@@ -1426,13 +1337,16 @@ def get_video_qualities_info(url):
                     {'format_id': 'worst', 'height': 'Lowest Quality', 'filesize': '~Auto', 'fps': 30, 'ext': 'mp4'}
                 ]
             
-            return qualities
+            return (qualities, info) if return_info else qualities
         
+    except PlatformCoolingDown:
+        raise
     except Exception as e:
         logging.error(f"Error getting video qualities: {e}")
-        return [
+        qualities = [
             {'format_id': 'best', 'height': 'Best Available', 'filesize': '~Auto', 'fps': 30, 'ext': 'mp4'}
         ]
+        return (qualities, None) if return_info else qualities
 
 def estimate_file_size(height, duration):
     """Estimate file size based on quality and duration"""
@@ -1461,17 +1375,40 @@ def estimate_file_size(height, duration):
     else:
         return f"{round(estimated_mb / 1024, 1)} GB"
 
-def download_video_with_progress(url, quality_format_id, download_id, progress_data):
-    """Download video with real-time progress tracking"""
+def download_video_with_progress(url, quality_format_id, download_id, progress_data, selection_token=None, user_settings=None):
+    """Download video with real-time progress tracking
+    
+    selection_token comes from the quality listing; when it is still valid the
+    download starts from its cached info dict without re-extracting.
+    user_settings may override the per-platform size/duration limits.
+    """
+    job = None
+    job_dir = None
     try:
         platform = get_platform_from_url(url)
-        config = get_platform_config(platform)
+        config = get_platform_config(platform, user_settings, purpose='user_download')
+        config['noplaylist'] = True  # A watch URL with a list= parameter (or a playlist entry) is one video
+        size_limit = get_size_limit(platform, user_settings)
+        duration_limit = get_duration_limit(platform, user_settings)
         
         # Create download directory
         download_dir = "downloads"
         os.makedirs(download_dir, exist_ok=True)
         
+        # The file goes to this download's own directory; the partial path is
+        # stable per URL + format so retries/restarts resume
+        job_dir = create_job_dir(download_dir, download_id)
+        job = start_download(url, quality_format_id, job_dir, partial_root=download_dir)
+        
         def progress_hook(d):
+            # Backstop for sources whose size could not be probed up front
+            if d['status'] == 'downloading' and (d.get('downloaded_bytes') or 0) > size_limit:
+                raise yt_dlp.utils.DownloadCancelled(f'Download exceeded {size_limit / (1024*1024):.0f}MB limit')
+            
+            record_progress(job, d)
+            if d['status'] == 'downloading':
+                record_usage(job_dir, d.get('downloaded_bytes'))
+            
             if download_id in progress_data:
                 if d['status'] == 'downloading':
                     # Extract progress information
@@ -1530,43 +1467,73 @@ def download_video_with_progress(url, quality_format_id, download_id, progress_d
         ydl_opts = {
             **config,
             'format': quality_format_id,
-            'outtmpl': f'{download_dir}/%(title)s.%(ext)s',
+            'outtmpl': job['outtmpl'],
             'progress_hooks': [progress_hook],
-            'writeinfojson': False,
-            'writedescription': False,
+            'max_filesize': size_limit,
         }
         
-        # Check file size before download
-        with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
-            info = ydl.extract_info(url, download=False)
+        jar = checkout_jar(platform)
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            # Cookies for the whole download (also when the extraction is skipped)
+            attach_cookie_jar(ydl, jar)
             
-            if not info:
-                raise Exception("Could not extract video information")
+            # Reuse the info dict resolved by the quality listing when the token is still valid
+            info, _ = get_selection(selection_token, url, quality_format_id)
+            from_selection = info is not None
+            
+            if not from_selection:
+                with pooled_request(ydl, platform, jar):
+                    info = ydl.extract_info(url, download=False)
+                
+                if not info:
+                    raise Exception("Could not extract video information")
                 
-            formats = info.get('formats', [])
-            selected_format = None
+                info = ydl.sanitize_info(info)
             
-            for fmt in formats:
-                if fmt.get('format_id') == quality_format_id:
-                    selected_format = fmt
-                    break
+            # Admission check: size from metadata or HEAD/Range probes of the media URLs
+            requested_formats = resolve_requested_formats(info.get('formats', []), quality_format_id)
+            admission = check_download_admission(requested_formats, info.get('duration'), size_limit, duration_limit)
+            if not admission['allowed']:
+                discard_download(job)
+                remove_job_dir(job_dir)
+                progress_data[download_id].update({
+                    'status': 'cancelled',
+                    'error': admission['reason']
+                })
+                return {'error': admission['reason']}
             
-            if selected_format:
-                filesize = selected_format.get('filesize') or selected_format.get('filesize_approx')
-                if filesize and filesize > 300 * 1024 * 1024:  # 300MB limit
-                    progress_data[download_id].update({
-                        'status': 'cancelled',
-                        'error': f'File size ({filesize / (1024*1024):.1f} MB) exceeds 300MB limit'
-                    })
-                    return {'error': 'File too large'}
-        
-        # Perform download
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+            # Reserve scratch space (unknown sizes count as the size limit); waits while the disk is full
+            reserve_space(job_dir, estimate_job_bytes(admission['size'], len(requested_formats) > 1, size_limit))
+            
+            def produce():
+                # Progressive HTTP sources are fetched over parallel ranged connections first;
+                # yt-dlp then finds the file already downloaded and only post-processes it
+                prefetch_progressive_download(ydl, info, ydl_opts['progress_hooks'])
+                
+                # Perform download from the resolved info dict (no further extraction)
+                try:
+                    processed = ydl.process_ie_result(info, download=True)
+                except yt_dlp.utils.DownloadError as e:
+                    if not from_selection:
+                        raise
+                    # Direct media URLs of the listing can expire before the token does
+                    logging.warning(f"Cached selection failed, re-extracting: {e}")
+                    discard_selection(selection_token)
+                    with pooled_request(ydl, platform, jar):
+                        processed = ydl.extract_info(url, download=True)
+                return get_downloaded_filepath(ydl, processed)
+            
+            # Shared/cached download when the download cache is enabled, then the final name
+            filename = fetch_download(resolve_cache_key(ydl, info, 'user_download'), final_stem(job, info), produce)
+            filename = finish_download(job, filename, info)
+            
+            # Delivered as mp4: remux/transcode only when the file is not one already
+            postprocess = postprocess_media(filename, DOWNLOAD_PURPOSES['user_download']['postprocess_target'])
+            filename = postprocess['path']
+            progress_data[download_id]['postprocess'] = postprocess
             
-            # Get the downloaded filename
-            info = ydl.extract_info(url, download=False)
-            filename = ydl.prepare_filename(info)
+            # The file stays for the user; the janitor removes it once it is stale
+            close_job_dir(job_dir)
             
             return {
                 'filename': os.path.basename(filename),
@@ -1575,4 +1542,10 @@ def download_video_with_progress(url, quality_format_id, download_id, progress_d
             
     except Exception as e:
         logging.error(f"Download error: {e}")
-        raise e
\ No newline at end of file
+        if job:
+            fail_download(job, e)
+        remove_job_dir(job_dir)
+        raise e
+    finally:
+        release_held_slots()
+        release_space(job_dir)
\ No newline at end of file
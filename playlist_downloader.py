@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import logging
+import threading
+import yt_dlp
+from download_registry import download_key
+from multi_platform_downloader import get_platform_from_url, get_platform_config, download_video_with_progress
+from cookie_pool import checkout_jar, pooled_request
+
+# Playlist/channel mode. Entries are enumerated with flat extraction
+# (extract_flat='in_playlist', lazy_playlist) so only the playlist pages are
+# fetched, and each entry is resolved and downloaded only when one of
+# 'concurrency' slots is free: the first download starts after the first page.
+# Progress is saved as a cursor (every entry before it is done) plus the ids of
+# entries finished after it, so re-submitting the same playlist resumes.
+PLAYLIST_CONCURRENCY = int(os.environ.get('PLAYLIST_CONCURRENCY', '3'))
+MAX_PLAYLIST_CONCURRENCY = 8
+PLAYLIST_DIR_NAME = '.playlists'
+PLAYLIST_FORMAT = 'bv*[height<=1080]+ba/b[height<=1080]/b'
+# A channel URL flat-extracts to its tabs (Videos, Shorts, Live), which are
+# playlists themselves; they are expanded in place up to this depth.
+NESTED_PLAYLIST_IES = ('YoutubeTab', 'YoutubePlaylist')
+MAX_PLAYLIST_NESTING = 2
+
+_state_lock = threading.Lock()
+
+
+def _state_path(url, quality, root='downloads'):
+    return os.path.join(root, PLAYLIST_DIR_NAME, download_key(url, f'playlist|{quality}') + '.json')
+
+
+def load_playlist_state(url, quality, root='downloads'):
+    """Saved {'cursor', 'done_ids'} of a playlist download, or a fresh state"""
+    try:
+        with open(_state_path(url, quality, root), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'cursor': 0, 'done_ids': []}
+
+
+def save_playlist_state(url, quality, state, root='downloads'):
+    path = _state_path(url, quality, root)
+    with _state_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({**state, 'url': url, 'quality': quality, 'updated_at': time.time()}, f)
+        os.replace(tmp_path, path)
+
+
+def clear_playlist_state(url, quality, root='downloads'):
+    try:
+        os.remove(_state_path(url, quality, root))
+    except OSError:
+        pass
+
+
+def is_nested_playlist(entry):
+    return entry.get('_type') == 'playlist' or (entry.get('_type') == 'url' and entry.get('ie_key') in NESTED_PLAYLIST_IES)
+
+
+def flatten_entries(info, extract, depth=0):
+    """Entries of a flat-extracted playlist with nested playlists (channel tabs) expanded in place
+
+    extract(url) returns the flat info of a nested playlist. Empty entries are
+    yielded as None so indexes stay stable across runs.
+    """
+    for entry in info.get('entries') or []:
+        if entry and is_nested_playlist(entry) and depth < MAX_PLAYLIST_NESTING:
+            nested = entry if entry.get('entries') is not None else extract(entry.get('url') or entry.get('webpage_url'))
+            if nested:
+                yield from flatten_entries(nested, extract, depth + 1)
+            continue
+        yield entry
+
+
+def iter_playlist_entries(url, start=0, platform=None, on_playlist=None):
+    """Lazily yield (index, entry_url, entry_id, title) of a playlist or channel from index start
+
+    Uses flat extraction: entries are not resolved. A single video yields itself.
+    on_playlist(title, entry_count) is called once the playlist page is read
+    (entry_count is None when the site does not report it, or the playlist
+    contains nested playlists such as channel tabs).
+    """
+    platform = platform or get_platform_from_url(url)
+    config = {
+        **get_platform_config(platform),
+        'extract_flat': 'in_playlist',
+        'lazy_playlist': True,
+        'noplaylist': False,
+        'quiet': True,
+        'no_warnings': True,
+    }
+    jar = checkout_jar(platform)
+    with yt_dlp.YoutubeDL(config) as ydl:
+        with pooled_request(ydl, platform, jar):
+            info = ydl.extract_info(url, download=False, process=False)
+        if not info:
+            raise Exception("Could not extract playlist information")
+        is_playlist = info.get('_type') in ('playlist', 'multi_video')
+        if on_playlist:
+            on_playlist(info.get('title'), info.get('playlist_count') if is_playlist else 1)
+        if not is_playlist:
+            if start == 0:
+                yield 0, info.get('webpage_url') or url, info.get('id'), info.get('title')
+            return
+
+        def extract_nested(nested_url):
+            if on_playlist:
+                on_playlist(info.get('title'), None)  # The top-level count was the number of tabs
+            with pooled_request(ydl, platform, jar):
+                return ydl.extract_info(nested_url, download=False, process=False)
+
+        for index, entry in enumerate(flatten_entries(info, extract_nested)):
+            if index < start or not entry:
+                continue
+            entry_url = entry.get('url') or entry.get('webpage_url')
+            if entry_url:
+                yield index, entry_url, entry.get('id'), entry.get('title')
+
+
+def download_playlist(url, quality, playlist_id, progress_data, user_settings=None, concurrency=None,
+                      download_entry=download_video_with_progress, entries=iter_playlist_entries):
+    """Download a playlist's entries with bounded concurrency, resuming from the saved cursor
+
+    progress_data[playlist_id] tracks the playlist ('cursor', counts and the
+    download ids of its entries); each entry has its own progress_data record.
+    Returns the final playlist progress record.
+    """
+    quality = quality or PLAYLIST_FORMAT
+    concurrency = max(1, min(concurrency or PLAYLIST_CONCURRENCY, MAX_PLAYLIST_CONCURRENCY))
+    saved = load_playlist_state(url, quality)
+    previously_done = set(saved.get('done_ids') or [])
+
+    progress = progress_data[playlist_id]
+    progress.update({'status': 'enumerating', 'type': 'playlist', 'cursor': saved.get('cursor', 0),
+                     'total': None, 'queued': 0, 'completed': 0, 'failed': 0, 'skipped': 0, 'entries': []})
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(concurrency)
+    unfinished = set()  # Indexes queued in this run and not completed (failed ones stay here)
+    done = {}  # index -> id of completed entries
+    position = {'next': progress['cursor']}  # First index not enumerated yet
+
+    def save():
+        with lock:
+            cursor = min(unfinished) if unfinished else position['next']
+            progress['cursor'] = cursor
+            done_ids = sorted(entry_id for index, entry_id in done.items() if index >= cursor and entry_id)
+        save_playlist_state(url, quality, {'cursor': cursor, 'done_ids': done_ids})
+
+    def run_entry(index, entry_url, entry_id, title, entry_download_id):
+        try:
+            result = download_entry(entry_url, quality, entry_download_id, progress_data, None, user_settings)
+            if result.get('error'):
+                raise Exception(result['error'])
+            progress_data[entry_download_id].update({
+                'status': 'completed',
+                'progress': 100,
+                'filename': result.get('filename'),
+                'file_path': result.get('file_path')
+            })
+            with lock:
+                unfinished.discard(index)
+                done[index] = entry_id
+                progress['completed'] += 1
+        except Exception as e:
+            logging.error(f"Playlist entry {index} ({entry_url}) failed: {e}")
+            progress_data[entry_download_id].update({'status': 'error', 'error': str(e)})
+            with lock:
+                progress['failed'] += 1
+        finally:
+            save()
+            slots.release()
+
+    def on_playlist(title, entry_count):
+        progress.update({'title': title, 'total': entry_count, 'status': 'downloading'})
+
+    try:
+        for index, entry_url, entry_id, title in entries(url, start=progress['cursor'], on_playlist=on_playlist):
+            with lock:
+                position['next'] = index + 1
+                if entry_id and entry_id in previously_done:
+                    done[index] = entry_id
+                    progress['skipped'] += 1
+                    continue
+                unfinished.add(index)  # Before waiting for a slot, so the cursor cannot pass it
+
+            # Enumeration only advances when a download slot is free
+            slots.acquire()
+            entry_download_id = f"{playlist_id}_{index}"
+            progress_data[entry_download_id] = {
+                'status': 'starting',
+                'progress': 0,
+                'speed': '0 Mbps',
+                'eta': '--:--',
+                'downloaded': '0 B',
+                'total': '0 B',
+                'filename': None,
+                'title': title,
+                'playlist_id': playlist_id,
+                'playlist_index': index
+            }
+            with lock:
+                progress['queued'] += 1
+                progress['entries'].append(entry_download_id)
+            threading.Thread(target=run_entry, args=(index, entry_url, entry_id, title, entry_download_id), daemon=True).start()
+    finally:
+        # Wait for the running entries
+        for _ in range(concurrency):
+            slots.acquire()
+
+    save()
+    if progress['failed']:
+        progress['status'] = 'completed_with_errors'
+    else:
+        progress['status'] = 'completed'
+        clear_playlist_state(url, quality)
+    logging.info(f"✅ Playlist {url}: {progress['completed']} downloaded, {progress['failed']} failed, {progress['skipped']} already done")
+    return progress
@@ -0,0 +1,208 @@
+import os
+import time
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+from urllib.error import URLError, HTTPError
+from yt_dlp.networking.exceptions import TransportError
+
+# Extractor requests are paced per platform and cookie identity by a token
+# bucket whose rate adapts to the platform: every answered request adds a
+# little rate (up to max_rate), every 429 / bot check halves it (AIMD). A
+# throttled key also trips a circuit breaker: requests wait (up to
+# MAX_QUEUE_WAIT) or fail fast while it cools down, then a single probe
+# request decides whether it closes again. Cooldowns double on repeated
+# throttling. Network failures (timeouts, DNS, resets) are no answer from the
+# platform: they neither add rate nor close the breaker.
+DEFAULT_RATE = {'rate': 5.0, 'max_rate': 20.0, 'burst': 5}
+PLATFORM_RATES = {
+    'instagram': {'rate': 1.0, 'max_rate': 4.0, 'burst': 2},
+    'facebook': {'rate': 1.0, 'max_rate': 4.0, 'burst': 2},
+    'tiktok': {'rate': 1.0, 'max_rate': 4.0, 'burst': 2},
+    'twitter': {'rate': 1.0, 'max_rate': 4.0, 'burst': 2},
+    'youtube': {'rate': 3.0, 'max_rate': 10.0, 'burst': 4},
+}
+MIN_RATE = 0.05
+RATE_INCREASE = 0.05  # requests/second added per answered request
+RATE_DECREASE = 0.5  # factor applied on throttling
+COOLDOWN = 60
+MAX_COOLDOWN = 900
+MAX_QUEUE_WAIT = float(os.environ.get('RATE_LIMIT_MAX_WAIT', '30'))
+THROTTLE_MARKERS = ('http error 429', 'status code 429', 'too many requests', 'rate-limit', 'rate limit', 'not a bot',
+                    'sign in to confirm', 'please wait a few minutes', 'temporarily blocked')
+NETWORK_ERRORS = (TimeoutError, ConnectionError, socket.gaierror, TransportError)
+NETWORK_MARKERS = ('timed out', 'connection reset', 'connection refused', 'connection aborted',
+                   'remote end closed connection', 'name or service not known', 'temporary failure in name resolution',
+                   'nodename nor servname', 'getaddrinfo failed', 'failed to resolve', 'network is unreachable')
+
+_buckets = {}  # (platform, identity) -> bucket state
+_lock = threading.Lock()
+
+
+class PlatformCoolingDown(Exception):
+    """Raised instead of sending a request while a platform's circuit breaker is open"""
+
+    def __init__(self, platform, retry_after):
+        self.platform = platform
+        self.retry_after = retry_after
+        super().__init__(f"Rate limited by {platform}. Requests are paused, try again in {int(retry_after) + 1}s.")
+
+
+def _error_chain(error, depth=5):
+    """The error and the causes yt-dlp wraps around it (ExtractorError.cause, DownloadError.exc_info)"""
+    while error is not None and depth > 0:
+        yield error
+        exc_info = getattr(error, 'exc_info', None)
+        error = getattr(error, 'cause', None) or (exc_info[1] if exc_info else None) or error.__cause__ or error.__context__
+        depth -= 1
+
+
+def _http_status(error):
+    status = getattr(error, 'status', None) or getattr(error, 'code', None)
+    response = getattr(error, 'response', None)
+    status = status or getattr(response, 'status_code', None) or getattr(response, 'status', None)
+    return status if isinstance(status, int) else None
+
+
+def is_throttle_error(error):
+    """Whether an extractor error means the platform is rate limiting or bot-checking us
+
+    HTTP 429 is recognized by the status of the wrapped HTTP error or by the
+    HTTP error text, never by the digits alone (video ids contain them).
+    """
+    if isinstance(error, BaseException) and any(_http_status(e) == 429 for e in _error_chain(error)):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in THROTTLE_MARKERS)
+
+
+def is_network_error(error):
+    """Whether a request failed without an answer from the platform (timeout, DNS, connection reset)
+
+    Follows the causes yt-dlp wraps its errors around, then falls back to the message.
+    """
+    for e in _error_chain(error):
+        if isinstance(e, NETWORK_ERRORS) or (isinstance(e, URLError) and not isinstance(e, HTTPError)):
+            return True
+    message = str(error).lower()
+    return any(marker in message for marker in NETWORK_MARKERS)
+
+
+def _bucket(platform, identity):
+    """Bucket of a platform + cookie identity (lock must be held)"""
+    key = (platform, identity)
+    if key not in _buckets:
+        config = PLATFORM_RATES.get(platform, DEFAULT_RATE)
+        _buckets[key] = {
+            'rate': config['rate'], 'max_rate': config['max_rate'], 'burst': config['burst'],
+            'tokens': float(config['burst']), 'updated': time.time(),
+            'state': 'closed', 'open_until': 0.0, 'strikes': 0, 'probing': False,
+            'throttled': 0, 'requests': 0,
+        }
+    return _buckets[key]
+
+
+def _refill(bucket, now):
+    bucket['tokens'] = min(bucket['burst'], bucket['tokens'] + (now - bucket['updated']) * bucket['rate'])
+    bucket['updated'] = now
+
+
+def acquire(platform, identity=None, max_wait=None):
+    """Wait for permission to send one request to a platform
+
+    Raises PlatformCoolingDown when the wait (cooldown or bucket) would exceed
+    max_wait seconds (default MAX_QUEUE_WAIT).
+    """
+    max_wait = MAX_QUEUE_WAIT if max_wait is None else max_wait
+    deadline = time.time() + max_wait
+    while True:
+        with _lock:
+            bucket = _bucket(platform, identity)
+            now = time.time()
+            _refill(bucket, now)
+            if bucket['state'] == 'open' and now >= bucket['open_until']:
+                bucket['state'] = 'half_open'
+
+            if bucket['state'] == 'open':
+                wait = bucket['open_until'] - now
+            elif bucket['state'] == 'half_open' and bucket['probing']:
+                wait = min(1.0, 1 / bucket['rate'])  # Wait for the probe's outcome
+            elif bucket['tokens'] >= 1:
+                bucket['tokens'] -= 1
+                bucket['requests'] += 1
+                if bucket['state'] == 'half_open':
+                    bucket['probing'] = True
+                return
+            else:
+                wait = (1 - bucket['tokens']) / bucket['rate']
+
+            if now + wait > deadline:
+                retry_after = bucket['open_until'] - now if bucket['state'] == 'open' else wait
+                raise PlatformCoolingDown(platform, retry_after)
+        time.sleep(min(wait, max(deadline - time.time(), 0.01)))
+
+
+def report_success(platform, identity=None):
+    """The platform answered (even with an error that is not throttling): add rate, close the breaker"""
+    with _lock:
+        bucket = _bucket(platform, identity)
+        bucket['rate'] = min(bucket['max_rate'], bucket['rate'] + RATE_INCREASE)
+        if bucket['state'] != 'closed':
+            logging.info(f"✅ {platform} answered again, resuming requests at {bucket['rate']:.2f}/s")
+        bucket['state'] = 'closed'
+        bucket['strikes'] = 0
+        bucket['probing'] = False
+
+
+def report_neutral(platform, identity=None):
+    """The request failed without an answer (network error): release a half-open probe, keep the rate"""
+    with _lock:
+        _bucket(platform, identity)['probing'] = False
+
+
+def report_throttled(platform, identity=None, retry_after=None):
+    """The platform throttled a request: halve the rate and open the breaker"""
+    with _lock:
+        bucket = _bucket(platform, identity)
+        now = time.time()
+        bucket['rate'] = max(MIN_RATE, bucket['rate'] * RATE_DECREASE)
+        bucket['strikes'] += 1
+        bucket['throttled'] += 1
+        cooldown = min(MAX_COOLDOWN, COOLDOWN * 2 ** (bucket['strikes'] - 1))
+        cooldown = max(cooldown, retry_after or 0)
+        bucket.update(state='open', open_until=now + cooldown, tokens=0.0, updated=now, probing=False)
+    logging.warning(f"⚠️ {platform} is rate limiting{f' ({identity})' if identity else ''}: "
+                    f"pausing {cooldown}s, then {bucket['rate']:.2f} requests/s")
+
+
+@contextmanager
+def rate_limited(platform, identity=None, max_wait=None):
+    """Pace the request(s) in the block and feed the outcome back to the limiter"""
+    acquire(platform, identity, max_wait)
+    try:
+        yield
+    except Exception as e:
+        if is_throttle_error(e):
+            report_throttled(platform, identity)
+        elif is_network_error(e):
+            report_neutral(platform, identity)
+        else:
+            report_success(platform, identity)
+        raise
+    report_success(platform, identity)
+
+
+def rate_limit_status():
+    """Current rate, breaker state and counters per platform/identity"""
+    now = time.time()
+    with _lock:
+        return [{
+            'platform': platform,
+            'identity': identity,
+            'rate': round(bucket['rate'], 3),
+            'state': bucket['state'],
+            'retry_after': max(0, round(bucket['open_until'] - now, 1)) if bucket['state'] == 'open' else 0,
+            'requests': bucket['requests'],
+            'throttled': bucket['throttled'],
+        } for (platform, identity), bucket in _buckets.items()]
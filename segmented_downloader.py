@@ -0,0 +1,260 @@
+import os
+import copy
+import json
+import time
+import logging
+import threading
+import requests
+from yt_dlp.utils import DownloadCancelled
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from urllib.parse import urlparse
+
+MB = 1024 * 1024
+
+# Parallel connections per host. CDNs that throttle each connection download
+# several times faster with more connections; unknown hosts use the default.
+DEFAULT_CONNECTIONS = 4
+HOST_CONNECTIONS = {}
+
+MIN_SEGMENT_SIZE = 8 * MB  # Smaller files are left to yt-dlp's single connection
+READ_CHUNK_SIZE = 1 * MB
+RANGE_RETRIES = 5
+REQUEST_TIMEOUT = 30
+STATE_SAVE_INTERVAL = 2.0
+PROGRESS_INTERVAL = 0.5
+
+# Own suffixes so yt-dlp never mistakes a sparse preallocated file for its .part
+PART_SUFFIX = '.segpart'
+STATE_SUFFIX = '.segpart.json'
+
+
+class RangeNotSupported(Exception):
+    """The server answered a range request with the full body"""
+
+
+def get_connection_count(url):
+    """Configured number of parallel connections for the URL's host"""
+    host = (urlparse(url).hostname or '').lower()
+    for configured_host, connections in HOST_CONNECTIONS.items():
+        if host == configured_host or host.endswith('.' + configured_host):
+            return connections
+    return DEFAULT_CONNECTIONS
+
+
+def probe_range_support(url, headers=None, timeout=REQUEST_TIMEOUT):
+    """Total size if the server honors byte ranges (206 + Content-Range), else None"""
+    try:
+        with requests.get(url, headers={**(headers or {}), 'Range': 'bytes=0-0'}, stream=True, timeout=timeout) as response:
+            content_range = response.headers.get('Content-Range', '')
+            if response.status_code == 206 and '/' in content_range:
+                total = content_range.rsplit('/', 1)[1]
+                return int(total) if total.isdigit() else None
+    except (requests.RequestException, ValueError) as e:
+        logging.debug(f"Range probe failed for {url}: {e}")
+    return None
+
+
+def split_ranges(size, connections):
+    """Split [0, size) into contiguous inclusive byte ranges of at least MIN_SEGMENT_SIZE"""
+    count = max(1, min(connections, size // MIN_SEGMENT_SIZE))
+    step = size // count
+    ranges = []
+    for i in range(count):
+        start = i * step
+        end = size - 1 if i == count - 1 else start + step - 1
+        ranges.append({'start': start, 'end': end, 'done': 0})
+    return ranges
+
+
+def _load_state(state_path, url, size):
+    """Resume state of a previous attempt for the same URL and size"""
+    try:
+        with open(state_path, 'r') as f:
+            state = json.load(f)
+        if state.get('url') == url and state.get('size') == size:
+            return state
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _save_state(state_path, state):
+    tmp_path = state_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def download_segmented(url, filepath, headers=None, connections=None, progress_callback=None):
+    """Download url into filepath over parallel byte-range connections
+
+    The file is preallocated and each range is written in place with
+    os.pwrite. Ranges retry independently and resume from their last written
+    byte; progress survives restarts in a .segpart.json state file. Returns
+    filepath, or None when the source is not suitable (no range support, too
+    small, or no os.pwrite) so the caller can fall back to yt-dlp.
+    """
+    if not hasattr(os, 'pwrite'):
+        return None
+
+    headers = dict(headers or {})
+    size = probe_range_support(url, headers)
+    connections = connections or get_connection_count(url)
+    if not size or connections < 2 or size < 2 * MIN_SEGMENT_SIZE:
+        return None
+
+    part_path = filepath + PART_SUFFIX
+    state_path = filepath + STATE_SUFFIX
+    state = _load_state(state_path, url, size) if os.path.exists(part_path) else None
+    if state:
+        logging.info(f"Resuming segmented download of {os.path.basename(filepath)}")
+    else:
+        state = {'url': url, 'size': size, 'ranges': split_ranges(size, connections)}
+
+    os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+    fd = os.open(part_path, os.O_RDWR | os.O_CREAT, 0o644)
+    lock = threading.Lock()
+    stop = threading.Event()
+    started = time.time()
+    resumed_bytes = sum(r['done'] for r in state['ranges'])
+    last_save = [time.time()]
+
+    def report(status='downloading'):
+        if not progress_callback:
+            return
+        downloaded = sum(r['done'] for r in state['ranges'])
+        elapsed = max(time.time() - started, 1e-6)
+        speed = (downloaded - resumed_bytes) / elapsed
+        progress_callback({
+            'status': status,
+            'filename': filepath,
+            'downloaded_bytes': downloaded,
+            'total_bytes': size,
+            'speed': speed,
+            'eta': (size - downloaded) / speed if speed > 0 else None,
+        })
+
+    def fetch_range(byte_range):
+        attempt = 0
+        while byte_range['start'] + byte_range['done'] <= byte_range['end']:
+            if stop.is_set():
+                return
+            offset = byte_range['start'] + byte_range['done']
+            try:
+                range_headers = {**headers, 'Range': f"bytes={offset}-{byte_range['end']}"}
+                with requests.get(url, headers=range_headers, stream=True, timeout=REQUEST_TIMEOUT) as response:
+                    if response.status_code == 200:
+                        raise RangeNotSupported(f"Server ignored range request for {url}")
+                    response.raise_for_status()
+                    for chunk in response.iter_content(chunk_size=READ_CHUNK_SIZE):
+                        if stop.is_set():
+                            return
+                        chunk = chunk[:byte_range['end'] + 1 - offset]
+                        if not chunk:
+                            break
+                        os.pwrite(fd, chunk, offset)
+                        offset += len(chunk)
+                        attempt = 0
+                        with lock:
+                            byte_range['done'] = offset - byte_range['start']
+                            now = time.time()
+                            if now - last_save[0] >= STATE_SAVE_INTERVAL:
+                                last_save[0] = now
+                                _save_state(state_path, state)
+            except RangeNotSupported:
+                raise
+            except Exception as e:
+                attempt += 1
+                if attempt > RANGE_RETRIES:
+                    raise Exception(f"Range {byte_range['start']}-{byte_range['end']} failed after {RANGE_RETRIES} retries: {e}")
+                logging.warning(f"Range {offset}-{byte_range['end']} failed ({e}), retry {attempt}/{RANGE_RETRIES}")
+                stop.wait(min(2 ** attempt, 30))
+
+    try:
+        os.ftruncate(fd, size)
+        with ThreadPoolExecutor(max_workers=len(state['ranges'])) as executor:
+            futures = [executor.submit(fetch_range, r) for r in state['ranges']]
+            try:
+                # Progress hooks run here, so an exception from a hook
+                # (e.g. a size limit) stops all ranges instead of being retried
+                pending = futures
+                while pending:
+                    done, pending = wait(pending, timeout=PROGRESS_INTERVAL, return_when=FIRST_EXCEPTION)
+                    for future in done:
+                        future.result()
+                    report()
+            except BaseException:
+                stop.set()
+                raise
+    except BaseException:
+        with lock:
+            _save_state(state_path, state)
+        raise
+    finally:
+        os.close(fd)
+
+    if sum(r['done'] for r in state['ranges']) != size:
+        raise Exception(f"Segmented download incomplete: {os.path.basename(filepath)}")
+
+    os.replace(part_path, filepath)
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    report('finished')
+    return filepath
+
+
+def prefetch_progressive_download(ydl, info, progress_hooks=None):
+    """Fetch a single progressive HTTP format with download_segmented before yt-dlp runs
+
+    Resolves the format yt-dlp would pick and downloads it to the exact file
+    name yt-dlp would use. A following ydl.process_ie_result(info, download=True)
+    then finds the file as already downloaded and only runs post-processing.
+    Returns the file path, or None when yt-dlp should download by itself.
+    """
+    # A configured external downloader (e.g. aria2c) already does its own segmenting
+    if ydl.params.get('external_downloader'):
+        return None
+
+    try:
+        selected = ydl.process_ie_result(copy.deepcopy(info), download=False)
+    except Exception as e:
+        logging.debug(f"Format selection for segmented download failed: {e}")
+        return None
+
+    if (not selected or selected.get('_type', 'video') != 'video' or selected.get('requested_formats')
+            or selected.get('fragments') or selected.get('protocol') not in ('http', 'https')
+            or not selected.get('url')):
+        return None
+
+    filepath = ydl.prepare_filename(selected)
+    if os.path.exists(filepath):
+        return filepath
+
+    headers = dict(selected.get('http_headers') or {})
+    cookie_header = ydl.cookiejar.get_cookie_header(selected['url']) if hasattr(ydl.cookiejar, 'get_cookie_header') else None
+    if cookie_header:
+        headers['Cookie'] = cookie_header
+
+    def progress_callback(d):
+        for hook in progress_hooks or []:
+            hook({**d, 'info_dict': selected})
+
+    try:
+        result = download_segmented(selected['url'], filepath, headers, progress_callback=progress_callback)
+    except DownloadCancelled:
+        raise
+    except Exception as e:
+        logging.warning(f"Segmented download failed, falling back to yt-dlp: {e}")
+        discard_partial_download(filepath)
+        return None
+
+    if result:
+        logging.info(f"✅ Segmented download finished: {os.path.basename(filepath)}")
+    return result
+
+
+def discard_partial_download(filepath):
+    """Remove the preallocated file and resume state of a segmented download"""
+    for path in (filepath + PART_SUFFIX, filepath + STATE_SUFFIX):
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,196 @@
+import os
+import re
+import logging
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+MB = 1024 * 1024
+
+# Download size limits in bytes. PLATFORM_SIZE_LIMITS overrides the default per
+# platform; users can override both with 'max_download_size_mb' and
+# 'platform_size_limits_mb' ({platform: mb}) in their settings, but never above
+# the server caps MAX_SIZE_LIMIT / MAX_DURATION_LIMIT (settings are user-editable).
+DEFAULT_SIZE_LIMIT = 300 * MB
+PLATFORM_SIZE_LIMITS = {}
+MAX_SIZE_LIMIT = int(float(os.environ.get('MAX_DOWNLOAD_SIZE_MB', '2048')) * MB)
+MAX_DURATION_LIMIT = int(float(os.environ.get('MAX_DOWNLOAD_DURATION_MIN', '720')) * 60)
+
+PROBE_TIMEOUT = 10
+MAX_FRAGMENT_PROBES = 64  # Sum DASH segment sizes only for reasonably short fragment lists
+FRAGMENT_PROBE_WORKERS = 8
+
+CONTENT_RANGE_RE = re.compile(r'bytes\s+\d+-\d+/(\d+)')
+
+
+def _user_limit(user_settings, platform, platform_key, global_key):
+    """Positive number from a user's per-platform or global limit setting, or None (invalid values are logged)"""
+    user_settings = user_settings or {}
+    platform_limits = user_settings.get(platform_key)
+    value = platform_limits.get(platform) if isinstance(platform_limits, dict) else None
+    value = value or user_settings.get(global_key)
+    if not value:
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        value = None
+    if value is None or not value > 0 or value == float('inf'):
+        logging.warning(f"Ignoring invalid {global_key}/{platform_key} setting for {platform}")
+        return None
+    return value
+
+
+def get_size_limit(platform, user_settings=None):
+    """Size limit in bytes for a platform, honoring per-user overrides up to MAX_SIZE_LIMIT"""
+    limit_mb = _user_limit(user_settings, platform, 'platform_size_limits_mb', 'max_download_size_mb')
+    if limit_mb:
+        return min(int(limit_mb * MB), MAX_SIZE_LIMIT)
+    return PLATFORM_SIZE_LIMITS.get(platform, DEFAULT_SIZE_LIMIT)
+
+
+def get_duration_limit(platform, user_settings=None):
+    """Duration limit in seconds from user settings ('max_download_duration_min'), or None
+
+    User values are capped at MAX_DURATION_LIMIT.
+    """
+    limit_min = _user_limit(user_settings, platform, 'platform_duration_limits_min', 'max_download_duration_min')
+    return min(int(limit_min * 60), MAX_DURATION_LIMIT) if limit_min else None
+
+
+def probe_url_size(url, headers=None, timeout=PROBE_TIMEOUT):
+    """Exact size of a media URL from a HEAD request or a one-byte Range request, or None"""
+    headers = dict(headers or {})
+
+    try:
+        response = requests.head(url, headers=headers, allow_redirects=True, timeout=timeout)
+        length = response.headers.get('Content-Length')
+        # A compressed HEAD length is not the media size
+        if response.ok and length and not response.headers.get('Content-Encoding'):
+            return int(length)
+    except (requests.RequestException, ValueError):
+        pass
+
+    # Many CDNs reject HEAD or omit Content-Length; Range: bytes=0-0 returns
+    # the full size in Content-Range without transferring the body
+    try:
+        with requests.get(url, headers={**headers, 'Range': 'bytes=0-0'}, stream=True, timeout=timeout) as response:
+            match = CONTENT_RANGE_RE.match(response.headers.get('Content-Range', ''))
+            if match:
+                return int(match.group(1))
+            length = response.headers.get('Content-Length')
+            if response.status_code == 200 and length:
+                return int(length)
+    except (requests.RequestException, ValueError):
+        pass
+    return None
+
+
+def _fragment_urls(fmt):
+    """Absolute URLs of a DASH/HLS format's fragments"""
+    base_url = fmt.get('fragment_base_url') or fmt.get('url') or ''
+    urls = []
+    for fragment in fmt.get('fragments') or []:
+        if fragment.get('url'):
+            urls.append(fragment['url'])
+        elif fragment.get('path'):
+            urls.append(urljoin(base_url, fragment['path']))
+        else:
+            return []
+    return urls
+
+
+def _probe_fragments(fmt):
+    """Sum of fragment sizes, or None when a fragment could not be sized"""
+    fragments = fmt.get('fragments') or []
+    if fragments and all(fragment.get('filesize') for fragment in fragments):
+        return sum(fragment['filesize'] for fragment in fragments)
+
+    urls = _fragment_urls(fmt)
+    if not urls or len(urls) > MAX_FRAGMENT_PROBES:
+        return None
+
+    headers = fmt.get('http_headers')
+    with ThreadPoolExecutor(max_workers=FRAGMENT_PROBE_WORKERS) as executor:
+        sizes = list(executor.map(lambda url: probe_url_size(url, headers), urls))
+    return sum(sizes) if all(size is not None for size in sizes) else None
+
+
+def probe_format_size(fmt, duration=None):
+    """Size of a single format as {'size', 'exact', 'method'}
+
+    Tries extractor metadata, DASH fragment sizes, HEAD/Range probes of the
+    media URL, then approximations (filesize_approx, bitrate x duration).
+    """
+    if fmt.get('filesize'):
+        return {'size': fmt['filesize'], 'exact': True, 'method': 'metadata'}
+
+    if fmt.get('fragments'):
+        size = _probe_fragments(fmt)
+        if size:
+            return {'size': size, 'exact': True, 'method': 'fragments'}
+    elif fmt.get('url') and fmt.get('protocol', 'https') in ('http', 'https'):
+        size = probe_url_size(fmt['url'], fmt.get('http_headers'))
+        if size:
+            return {'size': size, 'exact': True, 'method': 'probe'}
+
+    if fmt.get('filesize_approx'):
+        return {'size': fmt['filesize_approx'], 'exact': False, 'method': 'approx'}
+
+    tbr = fmt.get('tbr') or ((fmt.get('vbr') or 0) + (fmt.get('abr') or 0))
+    duration = fmt.get('duration') or duration
+    if tbr and duration:
+        return {'size': int(tbr * 1000 / 8 * duration), 'exact': False, 'method': 'bitrate'}
+
+    return {'size': None, 'exact': False, 'method': None}
+
+
+def resolve_requested_formats(formats, format_spec):
+    """Formats a simple format spec ('137+140', '18/best', '22') refers to, or []"""
+    by_id = {fmt.get('format_id'): fmt for fmt in formats or []}
+    for alternative in (format_spec or '').split('/'):
+        parts = [by_id.get(format_id.strip()) for format_id in alternative.split('+')]
+        if parts and all(parts):
+            return parts
+    return []
+
+
+def probe_download_size(requested_formats, duration=None):
+    """Total size of the formats a download will fetch
+
+    'size' is the sum of the sized parts (a lower bound when 'complete' is
+    False); 'exact' is only True when every part was sized exactly.
+    """
+    probes = [probe_format_size(fmt, duration) for fmt in requested_formats]
+    sized = [probe for probe in probes if probe['size']]
+    return {
+        'size': sum(probe['size'] for probe in sized) if sized else None,
+        'exact': bool(probes) and len(sized) == len(probes) and all(probe['exact'] for probe in sized),
+        'complete': bool(probes) and len(sized) == len(probes),
+        'methods': [probe['method'] for probe in probes],
+    }
+
+
+def check_download_admission(requested_formats, duration, size_limit, duration_limit=None):
+    """Decide whether a download may start: {'allowed', 'reason', 'size', 'exact'}"""
+    if duration_limit and duration and duration > duration_limit:
+        return {
+            'allowed': False,
+            'reason': f'Duration ({duration / 60:.1f} min) exceeds {duration_limit / 60:.0f} min limit',
+            'size': None,
+            'exact': False,
+        }
+
+    probe = probe_download_size(requested_formats, duration)
+    size = probe['size']
+    logging.debug(f"Size probe: size={size} exact={probe['exact']} methods={probe['methods']}")
+
+    if size and size_limit and size > size_limit:
+        approx = '' if probe['exact'] else '~'
+        return {
+            'allowed': False,
+            'reason': f'File size ({approx}{size / MB:.1f} MB) exceeds {size_limit / MB:.0f}MB limit',
+            'size': size,
+            'exact': probe['exact'],
+        }
+    return {'allowed': True, 'reason': None, 'size': size, 'exact': probe['exact']}
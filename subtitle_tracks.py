@@ -0,0 +1,88 @@
+import io
+import logging
+from googleapiclient.http import MediaIoBaseUpload
+
+# Subtitles for re-uploads are fetched into memory and attached to the YouTube
+# upload with captions.insert; nothing is written to the download directory.
+# Formats are in order of preference (all accepted by YouTube).
+SUBTITLE_EXTS = ('vtt', 'srt', 'ttml')
+MAX_SUBTITLE_TRACKS = 3
+MAX_SUBTITLE_BYTES = 2 * 1024 * 1024
+SCOPE_ERROR_MARKERS = ('insufficient authentication scopes', 'insufficientpermissions', 'access_token_scope_insufficient')
+
+_scope_warning = {'logged': False}
+
+
+def select_subtitle_tracks(info, languages=None, max_tracks=MAX_SUBTITLE_TRACKS):
+    """Uploader-provided subtitle tracks of an info dict: [{'lang', 'ext', 'url', 'name'}]
+
+    Automatic captions are skipped (YouTube generates its own). Tracks in
+    `languages` (default: the video's language, then English) come first.
+    """
+    languages = languages or [lang for lang in (info.get('language'), 'en') if lang]
+    subtitles = info.get('subtitles') or {}
+
+    def preference(lang):
+        base = lang.split('-')[0]
+        for index, wanted in enumerate(languages):
+            if lang == wanted or base == wanted.split('-')[0]:
+                return index
+        return len(languages)
+
+    tracks = []
+    for lang in sorted(subtitles, key=preference):
+        if lang == 'live_chat':
+            continue
+        by_ext = {fmt.get('ext'): fmt for fmt in subtitles[lang] or [] if fmt.get('url')}
+        ext = next((ext for ext in SUBTITLE_EXTS if ext in by_ext), None)
+        if not ext:
+            continue
+        tracks.append({'lang': lang, 'ext': ext, 'url': by_ext[ext]['url'], 'name': by_ext[ext].get('name') or lang})
+        if len(tracks) >= max_tracks:
+            break
+    return tracks
+
+
+def fetch_subtitle_tracks(ydl, info, languages=None):
+    """Download the selected subtitle tracks into memory (adds 'data' bytes to each track)"""
+    fetched = []
+    for track in select_subtitle_tracks(info, languages):
+        try:
+            data = ydl.urlopen(track['url']).read(MAX_SUBTITLE_BYTES + 1)
+        except Exception as e:
+            logging.warning(f"Could not fetch {track['lang']} subtitles: {e}")
+            continue
+        if not data or len(data) > MAX_SUBTITLE_BYTES:
+            continue
+        fetched.append({**track, 'data': data})
+    return fetched
+
+
+def upload_captions(youtube, video_id, tracks):
+    """Attach in-memory subtitle tracks to an uploaded video; returns the number uploaded
+
+    Captions are optional: a failed track is logged and skipped. Tokens granted
+    before the youtube.force-ssl scope was requested cannot insert captions, so
+    the remaining tracks are skipped (logged once per process).
+    """
+    uploaded = 0
+    for track in tracks or []:
+        media = MediaIoBaseUpload(io.BytesIO(track['data']), mimetype='application/octet-stream', resumable=False)
+        try:
+            youtube.captions().insert(
+                part='snippet',
+                body={'snippet': {'videoId': video_id, 'language': track['lang'], 'name': track['name'], 'isDraft': False}},
+                media_body=media
+            ).execute()
+            uploaded += 1
+        except Exception as e:
+            if any(marker in str(e).lower() for marker in SCOPE_ERROR_MARKERS):
+                if not _scope_warning['logged']:
+                    _scope_warning['logged'] = True
+                    logging.warning("⚠️ Skipping captions: the YouTube token lacks the youtube.force-ssl scope, "
+                                    "the account has to log in again to grant it")
+                break
+            logging.warning(f"Could not upload {track['lang']} captions for {video_id}: {e}")
+    if uploaded:
+        logging.info(f"✅ Uploaded {uploaded} caption track(s) for {video_id}")
+    return uploaded
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark download tuning profiles (concurrent fragments, buffer size)
+
+Without arguments a local HLS server simulates a CDN that throttles every
+connection and adds per-request latency. Pass a media URL to measure a real
+source instead:
+
+    python tests/bench_download_tuning.py [url]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yt_dlp
+
+FRAGMENT_COUNT = 48
+FRAGMENT_SIZE = 256 * 1024
+CONNECTION_RATE = 2 * 1024 * 1024  # bytes/s per connection
+REQUEST_LATENCY = 0.05
+
+CONCURRENCY_LEVELS = [1, 2, 4, 8, 16]
+BUFFER_SIZES = [1024, 64 * 1024, 1024 * 1024]
+
+
+class ThrottledHLSHandler(BaseHTTPRequestHandler):
+    """HLS playlist whose fragments are served at CONNECTION_RATE per connection"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        time.sleep(REQUEST_LATENCY)
+        if self.path.endswith('.m3u8'):
+            lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:4', '#EXT-X-MEDIA-SEQUENCE:0']
+            for i in range(FRAGMENT_COUNT):
+                lines += ['#EXTINF:4.0,', f'seg{i}.ts']
+            lines.append('#EXT-X-ENDLIST')
+            body = '\n'.join(lines).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/vnd.apple.mpegurl')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/mp2t')
+        self.send_header('Content-Length', str(FRAGMENT_SIZE))
+        self.end_headers()
+        chunk = b'\x47' * 64 * 1024
+        for _ in range(FRAGMENT_SIZE // len(chunk)):
+            time.sleep(len(chunk) / CONNECTION_RATE)
+            self.wfile.write(chunk)
+
+    def log_message(self, *args):
+        pass
+
+
+class QuietServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # Clients closing keep-alive connections
+
+
+def timed_download(url, options):
+    tmp = tempfile.mkdtemp()
+    try:
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'noprogress': True,
+            'outtmpl': os.path.join(tmp, 'bench.%(ext)s'),
+            **options,
+        }
+        start = time.perf_counter()
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            ydl.download([url])
+        elapsed = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp))
+        return elapsed, size
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def run_benchmark(url=None):
+    server = None
+    if not url:
+        server = QuietServer(('127.0.0.1', 0), ThrottledHLSHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_port}/stream.m3u8'
+        print(f"Simulated HLS: {FRAGMENT_COUNT} x {FRAGMENT_SIZE // 1024} KB fragments, "
+              f"{CONNECTION_RATE // 1024} KB/s per connection, {REQUEST_LATENCY * 1000:.0f} ms latency")
+
+    try:
+        print("concurrent_fragment_downloads")
+        baseline = None
+        for level in CONCURRENCY_LEVELS:
+            elapsed, size = timed_download(url, {'concurrent_fragment_downloads': level})
+            baseline = baseline or elapsed
+            print(f"  {level:3d}: {elapsed:6.2f}s  {size / elapsed / (1024 * 1024):7.2f} MB/s  ({baseline / elapsed:.1f}x)")
+
+        print("buffersize (concurrent_fragment_downloads=8)")
+        for buffersize in BUFFER_SIZES:
+            elapsed, size = timed_download(url, {'concurrent_fragment_downloads': 8, 'buffersize': buffersize})
+            print(f"  {buffersize:8d}: {elapsed:6.2f}s  {size / elapsed / (1024 * 1024):7.2f} MB/s")
+    finally:
+        if server:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for text normalization on 5,000-character descriptions
+
+Compares the original per-call regex implementations with text_utils.
+Run from the repository root: python tests/bench_text_normalization.py
+"""
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from text_utils import clean_string_for_json, clean_description_from_technical_details
+from test_text_utils import legacy_clean_string_for_json, legacy_clean_description, random_description
+
+DESCRIPTION_LENGTH = 5000
+SAMPLE_COUNT = 200
+ROUNDS = 10
+
+
+def measure(func, samples):
+    """Return (calls per second, MB per second) for func over samples"""
+    total_chars = sum(len(s) for s in samples) * ROUNDS
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for sample in samples:
+            func(sample)
+    elapsed = time.perf_counter() - start
+    return (len(samples) * ROUNDS) / elapsed, total_chars / elapsed / (1024 * 1024)
+
+
+def run_benchmark():
+    rng = random.Random(42)
+    technical_block = (
+        "\n\n--- **Technical Details** ---\n**Resolution:** 1920x1080\n"
+        "**File Size:** 20 MB\n**Format:** MP4\n**Video Codec:** avc1"
+    )
+    prose = ('Great video about travel and food #vlog #travel\n' * 120)[:DESCRIPTION_LENGTH - len(technical_block)]
+    sample_sets = {
+        # Typical extractor output: ASCII prose followed by a technical block
+        'ascii + technical block': [prose + technical_block for _ in range(SAMPLE_COUNT)],
+        # Emoji/accents and markers scattered through the whole description
+        'unicode, mixed markers': [random_description(rng, DESCRIPTION_LENGTH)[:DESCRIPTION_LENGTH] for _ in range(SAMPLE_COUNT)],
+    }
+
+    print(f"Text normalization benchmark ({SAMPLE_COUNT} descriptions x {DESCRIPTION_LENGTH} chars, {ROUNDS} rounds)")
+    print("=" * 78)
+    for name, legacy, current in [
+        ('clean_string_for_json', legacy_clean_string_for_json, clean_string_for_json),
+        ('clean_description_from_technical_details', legacy_clean_description, clean_description_from_technical_details),
+    ]:
+        print(name)
+        for set_name, samples in sample_sets.items():
+            legacy_ops, legacy_mbps = measure(legacy, samples)
+            current_ops, current_mbps = measure(current, samples)
+            print(f"  [{set_name}]")
+            print(f"    legacy : {legacy_ops:10.0f} calls/s  {legacy_mbps:8.1f} MB/s")
+            print(f"    current: {current_ops:10.0f} calls/s  {current_mbps:8.1f} MB/s  ({current_ops / legacy_ops:.1f}x)")
+
+
+if __name__ == "__main__":
+    run_benchmark()
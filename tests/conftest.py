@@ -0,0 +1,10 @@
+"""
+Test session setup: yt-dlp must never see the real cookie jars in cookies/
+(it rewrites a cookiefile on close), so the cookie pool reads an empty
+temporary directory unless a test points it elsewhere.
+"""
+
+import os
+import tempfile
+
+os.environ['COOKIES_DIR'] = tempfile.mkdtemp(prefix='test-cookies-')
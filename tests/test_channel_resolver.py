@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Offline tests for channel handle resolution helpers
+"""
+
+from channel_resolver import (
+    parse_channel_reference,
+    scan_chunks_for_channel_id,
+    resolve_channel_ids,
+    parse_channel_import_file
+)
+
+CHANNEL_ID = 'UC_x5XG1OV2P6uZZ5FSM9Ttw'
+
+
+def test_parse_channel_reference():
+    """Channel URLs, handles and IDs normalize to stable cache keys"""
+    assert parse_channel_reference(CHANNEL_ID)[:2] == ('id', CHANNEL_ID)
+    assert parse_channel_reference(f'https://www.youtube.com/channel/{CHANNEL_ID}?view=0')[:2] == ('id', CHANNEL_ID)
+    assert parse_channel_reference('https://www.youtube.com/@GoogleDevelopers/videos')[:2] == ('handle', '@googledevelopers')
+    assert parse_channel_reference('@GoogleDevelopers')[:2] == ('handle', '@googledevelopers')
+    assert parse_channel_reference('youtube.com/c/GoogleDevelopers')[:2] == ('custom', 'c/googledevelopers')
+    assert parse_channel_reference('https://m.youtube.com/user/GoogleDevelopers')[:2] == ('user', 'user/googledevelopers')
+
+    for invalid in ['', 'https://vimeo.com/@someone', 'https://www.youtube.com/watch?v=abc']:
+        try:
+            parse_channel_reference(invalid)
+            assert False, f"Expected {invalid!r} to be rejected"
+        except Exception as e:
+            assert 'Invalid YouTube channel URL format' in str(e)
+
+
+def test_scan_stops_at_first_match_across_chunks():
+    """The streaming scanner finds IDs split across chunk boundaries and stops early"""
+    page = b'<html><head><link rel="canonical" href="https://www.youtube.com/channel/' + CHANNEL_ID.encode() + b'">'
+    consumed = []
+
+    def chunks():
+        for i in range(0, len(page), 7):
+            consumed.append(i)
+            yield page[i:i + 7]
+        # Anything after the match must never be read
+        raise AssertionError('Scanner read past the channel ID')
+
+    assert scan_chunks_for_channel_id(chunks()) == CHANNEL_ID
+    assert scan_chunks_for_channel_id(iter([b'no id here'] * 3)) is None
+
+
+def test_batch_resolution_without_network():
+    """Direct IDs and invalid inputs resolve without any lookups"""
+    results = resolve_channel_ids([CHANNEL_ID, 'not a channel'])
+    assert results[CHANNEL_ID] == {'channel_id': CHANNEL_ID, 'source': 'url', 'error': None}
+    assert results['not a channel']['channel_id'] is None
+    assert results['not a channel']['error']
+
+
+def test_parse_import_files():
+    """OPML feeds and Takeout-style CSV rows yield channel references"""
+    opml = f"""<?xml version="1.0"?>
+<opml version="1.1"><body><outline text="YouTube Subscriptions">
+  <outline text="Google Developers" type="rss" xmlUrl="https://www.youtube.com/feeds/videos.xml?channel_id={CHANNEL_ID}"/>
+  <outline text="Other" htmlUrl="https://www.youtube.com/@SomeHandle"/>
+</outline></body></opml>"""
+    assert parse_channel_import_file('subscriptions.opml', opml.encode()) == [CHANNEL_ID, 'https://www.youtube.com/@SomeHandle']
+
+    csv_data = f"Channel Id,Channel Url,Channel Title\n{CHANNEL_ID},http://www.youtube.com/channel/{CHANNEL_ID},Google Developers\n,@SomeHandle,Handle Only\n"
+    assert parse_channel_import_file('subscriptions.csv', csv_data) == [CHANNEL_ID, '@SomeHandle']
+
+
+if __name__ == "__main__":
+    test_parse_channel_reference()
+    test_scan_stops_at_first_match_across_chunks()
+    test_batch_resolution_without_network()
+    test_parse_import_files()
+    print("✓ Channel resolver tests passed")
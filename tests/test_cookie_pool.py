@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-platform cookie jar pool: load once, rotation, benching
+"""
+
+import os
+import time
+import tempfile
+
+import yt_dlp
+import cookie_pool
+import rate_limiter
+from cookie_pool import checkout_jar, report_jar, pooled_request
+
+COOKIE_LINE = '.example.com\tTRUE\t/\tFALSE\t0\t{name}\t{value}\n'
+
+
+def _write_jar(path, value):
+    with open(path, 'w') as f:
+        f.write('# Netscape HTTP Cookie File\n\n' + COOKIE_LINE.format(name='SID', value=value))
+
+
+def _with_cookies_dir(test):
+    """Run a test against a temporary cookies directory with fresh pools"""
+    def run():
+        saved = cookie_pool.COOKIES_DIR
+        with tempfile.TemporaryDirectory() as tmp:
+            cookie_pool.COOKIES_DIR = tmp
+            cookie_pool._pools.clear()
+            rate_limiter._buckets.clear()
+            try:
+                test(tmp)
+            finally:
+                cookie_pool.COOKIES_DIR = saved
+                cookie_pool._pools.clear()
+    run.__name__ = test.__name__
+    return run
+
+
+@_with_cookies_dir
+def test_jars_load_once_and_rotate(tmp):
+    _write_jar(os.path.join(tmp, 'youtube.txt'), 'a')
+    _write_jar(os.path.join(tmp, 'youtube_2.txt'), 'b')
+    os.makedirs(os.path.join(tmp, 'youtube'))
+    _write_jar(os.path.join(tmp, 'youtube', 'third.txt'), 'c')
+
+    loads = []
+    load = cookie_pool._load_jar
+    cookie_pool._load_jar = lambda path: loads.append(path) or load(path)
+    try:
+        used = [os.path.basename(checkout_jar('youtube')['path']) for _ in range(6)]
+    finally:
+        cookie_pool._load_jar = load
+    assert used == ['youtube.txt', 'youtube_2.txt', 'third.txt'] * 2
+    assert len(loads) == 3
+
+    # TikTok falls back to the Instagram jars
+    _write_jar(os.path.join(tmp, 'insta.txt'), 'i')
+    assert checkout_jar('tiktok')['path'].endswith('insta.txt')
+    assert checkout_jar('pinterest') is None
+
+
+@_with_cookies_dir
+def test_throttled_jar_is_benched(tmp):
+    _write_jar(os.path.join(tmp, 'insta.txt'), 'a')
+    _write_jar(os.path.join(tmp, 'insta_2.txt'), 'b')
+
+    bad = checkout_jar('instagram')
+    report_jar(bad, Exception('HTTP Error 429: Too Many Requests'))
+    assert bad['score'] == 0.5 and bad['benched_until'] > time.time()
+    assert all(checkout_jar('instagram') is not bad for _ in range(3))
+
+    # Errors that are not throttling do not bench
+    good = checkout_jar('instagram')
+    report_jar(good, Exception('Video unavailable'))
+    report_jar(good, Exception('ERROR: [instagram] 3429742900: Requested content is not available'))
+    assert good['benched_until'] == 0.0
+
+    # Network errors are not the account's fault
+    report_jar(bad, TimeoutError('The read operation timed out'))
+    assert bad['score'] == 0.5
+
+    report_jar(good, Exception("Sign in to confirm you're not a bot"))
+    assert good['benched_until'] - time.time() > cookie_pool.BENCH_SECONDS * 2
+    assert checkout_jar('instagram') is None  # Both benched: continue without cookies
+
+
+@_with_cookies_dir
+def test_pooled_request_attaches_in_memory_jar(tmp):
+    path = os.path.join(tmp, 'vimeo.txt')
+    _write_jar(path, 'secret')
+    before = open(path).read()
+
+    with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
+        with pooled_request(ydl, 'vimeo') as jar:
+            assert ydl.cookiejar is jar['jar']
+            assert ydl.cookiejar.get_cookie_header('https://example.com/') == 'SID=secret'
+    assert open(path).read() == before  # The file is not rewritten on close
+    assert jar['requests'] == 1 and jar['score'] == 1.0
+
+
+if __name__ == "__main__":
+    test_jars_load_once_and_rotate()
+    test_throttled_jar_is_benched()
+    test_pooled_request_attaches_in_memory_jar()
+    print("✓ Cookie pool tests passed")
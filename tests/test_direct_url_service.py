@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Tests for direct-URL detection and analysis (shared HEAD, thumbnails) against a local HTTP server
+"""
+
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import direct_url_service
+from direct_url_service import is_direct_media_url, get_direct_url_analysis, _thumbnail_candidates
+
+PAYLOAD = b'\x00' * 256 * 1024
+
+
+class MediaHandler(BaseHTTPRequestHandler):
+    """Serves /clip.mp4 (with ranges), /clip.jpg and an HTML page; counts HEAD requests per path"""
+    heads = {}
+    lock = threading.Lock()
+
+    def _send(self, body):
+        if self.path.startswith('/clip.mp4'):
+            content_type = 'video/mp4'
+        elif self.path.startswith('/clip.jpg'):
+            content_type = 'image/jpeg'
+        elif self.path.startswith('/page'):
+            content_type = 'text/html'
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        status = 200
+        data = PAYLOAD
+        range_header = self.headers.get('Range', '')
+        if body and range_header.startswith('bytes=-'):
+            status, data = 206, PAYLOAD[-int(range_header[7:]):]
+        elif body and range_header.startswith('bytes=0-'):
+            status, data = 206, PAYLOAD[:int(range_header[8:]) + 1]
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        if status == 206:
+            self.send_header('Content-Range', f'bytes 0-{len(data) - 1}/{len(PAYLOAD)}')
+        self.end_headers()
+        if body:
+            self.wfile.write(data)
+
+    def do_HEAD(self):
+        with MediaHandler.lock:
+            MediaHandler.heads[self.path] = MediaHandler.heads.get(self.path, 0) + 1
+        self._send(False)
+
+    def do_GET(self):
+        self._send(True)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MediaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def _with_client(use_aiohttp):
+    """Run a test with the aiohttp service (skipped when it is not installed) or the requests fallback"""
+    def wrap(test):
+        def run():
+            saved = direct_url_service.aiohttp
+            if use_aiohttp:
+                direct_url_service.aiohttp = pytest.importorskip('aiohttp')
+            else:
+                direct_url_service.aiohttp = None
+            direct_url_service._head_cache.clear()
+            MediaHandler.heads.clear()
+            try:
+                test()
+            finally:
+                direct_url_service.aiohttp = saved
+        run.__name__ = test.__name__
+        return run
+    return wrap
+
+
+def _check_detection_and_analysis_share_one_head():
+    """Detecting a direct URL and analyzing it right after costs one HEAD"""
+    server, base = _serve()
+    try:
+        url = f'{base}/clip.mp4'
+        assert is_direct_media_url(url)
+        assert not is_direct_media_url(f'{base}/page')
+        assert not is_direct_media_url(f'{base}/missing.mp4')
+
+        analysis = get_direct_url_analysis(url)
+        assert analysis['content_type'] == 'video/mp4'
+        assert analysis['content_length'] == len(PAYLOAD)
+        assert MediaHandler.heads['/clip.mp4'] == 1
+        return analysis, base
+    finally:
+        server.shutdown()
+
+
+def _check_expired_head_is_requested_again():
+    server, base = _serve()
+    ttl = direct_url_service.HEAD_CACHE_TTL
+    direct_url_service.HEAD_CACHE_TTL = 0
+    try:
+        url = f'{base}/clip.mp4?again'
+        assert is_direct_media_url(url) and is_direct_media_url(url)
+        assert MediaHandler.heads['/clip.mp4?again'] == 2
+    finally:
+        direct_url_service.HEAD_CACHE_TTL = ttl
+        server.shutdown()
+
+
+@_with_client(use_aiohttp=False)
+def test_fallback_shares_one_head():
+    analysis, _ = _check_detection_and_analysis_share_one_head()
+    assert analysis['thumbnails'] == []  # No discovery without the async client
+
+
+@_with_client(use_aiohttp=False)
+def test_fallback_expired_head_is_requested_again():
+    _check_expired_head_is_requested_again()
+
+
+@_with_client(use_aiohttp=True)
+def test_async_analysis_shares_one_head_and_finds_thumbnails():
+    analysis, base = _check_detection_and_analysis_share_one_head()
+    assert analysis['thumbnails'] == [f'{base}/clip.jpg']  # .png/.webp are 404
+
+
+@_with_client(use_aiohttp=True)
+def test_async_expired_head_is_requested_again():
+    _check_expired_head_is_requested_again()
+
+
+@_with_client(use_aiohttp=True)
+def test_async_timeout_cancels_the_request():
+    """A request that outlives the service timeout is cancelled on the loop, not left running"""
+    state = {'cancelled': False}
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            state['cancelled'] = True
+            raise
+
+    try:
+        direct_url_service._run(slow(), timeout=0.1)
+        assert False, "expected a timeout"
+    except Exception as e:
+        assert 'timed out' in str(e)
+    deadline = time.time() + 2
+    while not state['cancelled'] and time.time() < deadline:
+        time.sleep(0.01)
+    assert state['cancelled']
+
+
+def test_thumbnail_candidates():
+    assert _thumbnail_candidates('https://cdn.example.com/v/clip.mp4?sig=1') == [
+        'https://cdn.example.com/v/clip.jpg', 'https://cdn.example.com/v/clip.png', 'https://cdn.example.com/v/clip.webp']
+    assert _thumbnail_candidates('https://cdn.example.com/stream') == []
+
+
+if __name__ == "__main__":
+    test_fallback_shares_one_head()
+    test_fallback_expired_head_is_requested_again()
+    test_async_analysis_shares_one_head_and_finds_thumbnails()
+    test_async_expired_head_is_requested_again()
+    test_async_timeout_cancels_the_request()
+    test_thumbnail_candidates()
+    print("✓ All direct URL service tests passed")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the scratch-disk budget and janitor
+"""
+
+import os
+import time
+import tempfile
+import threading
+
+import disk_budget
+from disk_budget import estimate_job_bytes, reserve_space, release_space, run_janitor
+from download_registry import start_download, fail_download, list_partial_downloads
+from job_workspace import create_job_dir, close_job_dir
+
+
+def _write(path, size=100, age=0):
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    if age:
+        past = time.time() - age
+        os.utime(path, (past, past))
+
+
+def test_janitor_removes_stale_artifacts_only():
+    """Old idle artifacts and partials go; open job dirs and fresh files stay"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'downloads')
+        disk_budget.SCRATCH_ROOTS = [root]
+        open_dir = create_job_dir(root, 'running')
+        done_dir = create_job_dir(root, 'done')
+        close_job_dir(done_dir)
+        _write(os.path.join(open_dir, 'a.mp4'))
+        _write(os.path.join(done_dir, 'b.mp4'))
+        _write(os.path.join(root, 'old.info.json'))
+        _write(os.path.join(root, 'fresh.mp4'))
+
+        job = start_download('https://example.com/v.mp4', 'best', root)
+        _write(job['outtmpl'].replace('%(ext)s', 'mp4.part'))
+        fail_download(job, Exception('stopped'))
+
+        # ctime cannot be faked, so age everything by moving the janitor's clock forward
+        later = time.time() + disk_budget.PARTIAL_MAX_AGE + 1
+        run_janitor(now=later)
+
+        assert os.path.exists(os.path.join(open_dir, 'a.mp4'))
+        assert not os.path.exists(done_dir)
+        assert not os.path.exists(os.path.join(root, 'old.info.json'))
+        assert list_partial_downloads(root) == {}
+        assert os.listdir(job['partial_dir']) == ['registry.json']
+
+
+def test_reservations_wait_and_refuse():
+    """A job that does not fit waits for a release, and is refused after the wait"""
+    with tempfile.TemporaryDirectory() as tmp:
+        disk_budget.SCRATCH_ROOTS = [tmp]
+        saved = disk_budget._free_bytes
+        disk_budget._free_bytes = lambda path: disk_budget.MIN_FREE_BYTES + 1000  # 1000 bytes to spare
+        try:
+            first = create_job_dir(tmp, 'first')
+            second = create_job_dir(tmp, 'second')
+            reserve_space(first, 800, wait=0)
+
+            try:
+                reserve_space(second, 800, wait=0)
+                assert False, 'second reservation should not fit'
+            except Exception as e:
+                assert 'Not enough disk space' in str(e)
+
+            threading.Timer(0.2, release_space, args=(first,)).start()
+            reserve_space(second, 800, wait=5)
+            release_space(second)
+        finally:
+            disk_budget._free_bytes = saved
+
+    assert estimate_job_bytes(None, fallback=10) == 10
+    assert estimate_job_bytes(100, merged=True) == 200
+
+
+def test_only_one_janitor_runs():
+    """The janitor starts on request, not on import, and only in the process holding the lock"""
+    import fcntl
+    assert disk_budget._janitor_thread is None  # Importing the module starts nothing
+    saved = disk_budget.JANITOR_LOCK_FILE, disk_budget.SCRATCH_ROOTS
+    with tempfile.TemporaryDirectory() as tmp:
+        disk_budget.JANITOR_LOCK_FILE = os.path.join(tmp, 'downloads', '.janitor.lock')
+        disk_budget.SCRATCH_ROOTS = [os.path.join(tmp, 'downloads')]
+        try:
+            os.makedirs(os.path.join(tmp, 'downloads'))
+            with open(disk_budget.JANITOR_LOCK_FILE, 'a') as other_worker:
+                fcntl.flock(other_worker, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                assert not disk_budget.start_janitor()
+            assert disk_budget.start_janitor()
+            assert disk_budget.start_janitor() and disk_budget._janitor_thread.is_alive()
+        finally:
+            disk_budget.JANITOR_LOCK_FILE, disk_budget.SCRATCH_ROOTS = saved
+
+
+if __name__ == "__main__":
+    test_janitor_removes_stale_artifacts_only()
+    test_reservations_wait_and_refuse()
+    test_only_one_janitor_runs()
+    print("✓ Disk budget tests passed")
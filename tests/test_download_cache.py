@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed download cache
+"""
+
+import os
+import time
+import tempfile
+import threading
+
+import download_cache
+from download_cache import fetch_download, cache_key, cache_stats
+
+
+def with_cache(budget, test):
+    original = (download_cache.DOWNLOAD_CACHE_DIR, download_cache.DOWNLOAD_CACHE_BYTES)
+    with tempfile.TemporaryDirectory() as tmp:
+        download_cache.DOWNLOAD_CACHE_DIR = os.path.join(tmp, 'cache')
+        download_cache.DOWNLOAD_CACHE_BYTES = budget
+        download_cache._entries = None
+        try:
+            test(tmp)
+        finally:
+            download_cache.DOWNLOAD_CACHE_DIR, download_cache.DOWNLOAD_CACHE_BYTES = original
+            download_cache._entries = None
+
+
+def producer(tmp, name, size, calls, delay=0):
+    def produce():
+        calls.append(name)
+        time.sleep(delay)
+        path = os.path.join(tmp, f'partial-{name}-{len(calls)}.mp4')
+        with open(path, 'wb') as f:
+            f.write(b'v' * size)
+        return path
+    return produce
+
+
+def test_single_flight_and_reuse():
+    """Concurrent requests share one download; later requests and deleted copies reuse the cache"""
+    def check(tmp):
+        key = cache_key({'extractor_key': 'Youtube', 'id': 'abc', 'format_id': '18'})
+        calls, results = [], []
+        threads = [
+            threading.Thread(target=lambda i=i: results.append(
+                fetch_download(key, os.path.join(tmp, f'user{i}', 'Video'), producer(tmp, 'abc', 1000, calls, delay=0.2))))
+            for i in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert calls == ['abc']
+        assert sorted(results) == [os.path.join(tmp, f'user{i}', 'Video.mp4') for i in range(4)]
+        os.remove(results[0])  # An upload job deleting its copy leaves the cache intact
+
+        again = fetch_download(key, os.path.join(tmp, 'later', 'Video'), producer(tmp, 'abc', 1000, calls))
+        assert calls == ['abc'] and os.path.getsize(again) == 1000
+        assert cache_stats()['files'] == 1 and cache_stats()['in_use'] == 0
+
+    with_cache(10_000, check)
+
+
+def test_purposes_and_stuck_downloads():
+    """Purposes never share a cached file; waiting for a stuck in-flight download is bounded"""
+    info = {'extractor_key': 'Youtube', 'id': 'abc', 'format_id': '18'}
+    assert cache_key(info, purpose='reupload') != cache_key(info, purpose='user_download')
+
+    def check(tmp):
+        key = cache_key(info, purpose='reupload')
+        release = threading.Event()
+        leader = threading.Thread(target=fetch_download, args=(
+            key, os.path.join(tmp, 'leader', 'Video'), lambda: release.wait(5) and producer(tmp, 'abc', 10, [])()))
+        leader.start()
+        time.sleep(0.05)
+        wait = download_cache.SHARED_DOWNLOAD_WAIT
+        download_cache.SHARED_DOWNLOAD_WAIT = 0.1
+        try:
+            fetch_download(key, os.path.join(tmp, 'follower', 'Video'), producer(tmp, 'abc', 10, []))
+            assert False, "expected the follower to give up"
+        except Exception as e:
+            assert 'did not finish' in str(e)
+        finally:
+            download_cache.SHARED_DOWNLOAD_WAIT = wait
+            release.set()
+            leader.join()
+
+    with_cache(10_000, check)
+
+
+def test_lru_eviction_within_budget():
+    """The least recently used files are evicted to stay within the byte budget"""
+    def check(tmp):
+        calls = []
+        for name in ['a', 'b', 'c']:
+            fetch_download(('generic', name, 'best'), os.path.join(tmp, name), producer(tmp, name, 400, calls))
+            time.sleep(0.01)
+        assert cache_stats()['bytes'] <= 1000 and cache_stats()['files'] == 2
+
+        fetch_download(('generic', 'a', 'best'), os.path.join(tmp, 'a2'), producer(tmp, 'a', 400, calls))
+        assert calls == ['a', 'b', 'c', 'a']
+
+    with_cache(1000, check)
+
+
+def test_disabled_cache_downloads_directly():
+    """Without a budget the producer's file is returned as-is"""
+    def check(tmp):
+        calls = []
+        path = fetch_download(('generic', 'x', 'best'), os.path.join(tmp, 'x'), producer(tmp, 'x', 10, calls))
+        assert os.path.basename(path) == 'partial-x-1.mp4'
+
+    with_cache(0, check)
+
+
+if __name__ == "__main__":
+    test_single_flight_and_reuse()
+    test_purposes_and_stuck_downloads()
+    test_lru_eviction_within_budget()
+    test_disabled_cache_downloads_directly()
+    print("✓ Download cache tests passed")
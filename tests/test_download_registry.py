@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for the partial-download registry
+"""
+
+import os
+import tempfile
+import threading
+
+import download_registry
+from download_registry import (
+    canonicalize_url,
+    download_key,
+    start_download,
+    record_progress,
+    finish_download,
+    fail_download,
+    list_partial_downloads
+)
+
+
+def test_canonical_urls_share_a_key():
+    """URL variants of the same video map to one job key"""
+    variants = [
+        'https://www.youtube.com/watch?v=dQw4w9WgXcQ&feature=share&si=abc',
+        'https://youtu.be/dQw4w9WgXcQ?si=xyz',
+        'https://m.youtube.com/shorts/dQw4w9WgXcQ',
+        'https://youtube.com/watch?v=dQw4w9WgXcQ#t=10',
+    ]
+    assert {canonicalize_url(url) for url in variants} == {'youtube.com/watch?v=dQw4w9WgXcQ'}
+    assert canonicalize_url('https://Example.com/v.mp4?b=2&a=1&utm_source=x') == 'example.com/v.mp4?a=1&b=2'
+    assert download_key(variants[0], '18') == download_key(variants[1], '18') != download_key(variants[0], '22')
+
+
+def test_failed_job_resumes_and_finishes():
+    """A failed job keeps its partial file; the retry resumes it and finishing renames by title and id"""
+    with tempfile.TemporaryDirectory() as tmp:
+        url = 'https://example.com/video.mp4'
+        job = start_download(url, 'best', tmp)
+
+        # A second job for the same partial file waits until the first one stops
+        started = []
+        waiter = threading.Thread(target=lambda: started.append(start_download(url, 'best', tmp)))
+        waiter.start()
+        waiter.join(0.2)
+        assert not started
+
+        partial = job['outtmpl'].replace('%(ext)s', 'mp4')
+        with open(partial + '.part', 'wb') as f:
+            f.write(b'x' * 1000)
+        record_progress(job, {'status': 'downloading', 'downloaded_bytes': 1000, 'total_bytes': 4000})
+        fail_download(job, Exception('worker died'))
+        waiter.join(5)
+        assert started and started[0]['resumed_bytes'] == 1000
+        fail_download(started[0], Exception('worker died again'))
+        assert list_partial_downloads(tmp)[job['key']]['status'] == 'failed'
+
+        retry = start_download(url, 'best', tmp)
+        assert retry['outtmpl'] == job['outtmpl']
+        assert retry['resumed_bytes'] == 1000
+
+        os.rename(partial + '.part', partial)
+        with open(job['outtmpl'].replace('%(ext)s', 'info.json'), 'w') as f:
+            f.write('{}')
+        final = finish_download(retry, partial, {'title': 'My: Video', 'id': 'x'})
+        assert os.path.dirname(final) == tmp and final.endswith(' [x].mp4') and os.path.exists(final)
+        assert os.path.exists(final[:-len('.mp4')] + '.info.json')
+        assert list_partial_downloads(tmp) == {}
+
+
+def test_same_key_wait_is_bounded():
+    """A job stuck on the same partial file makes the next one fail after SAME_KEY_WAIT, not hang"""
+    wait = download_registry.SAME_KEY_WAIT
+    download_registry.SAME_KEY_WAIT = 0.2
+    with tempfile.TemporaryDirectory() as tmp:
+        url = 'https://example.com/stuck.mp4'
+        job = start_download(url, 'best', tmp)
+        try:
+            start_download(url, 'best', tmp)
+            assert False, "expected the second job to give up"
+        except Exception as e:
+            assert 'still running' in str(e)
+        finally:
+            download_registry.SAME_KEY_WAIT = wait
+            fail_download(job, Exception('stopped'))
+
+
+if __name__ == "__main__":
+    test_canonical_urls_share_a_key()
+    test_failed_job_resumes_and_finishes()
+    test_same_key_wait_is_bounded()
+    print("✓ Download registry tests passed")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for per-platform download tuning profiles
+"""
+
+import shutil
+from multi_platform_downloader import get_platform_config, get_download_tuning, EXTERNAL_DOWNLOADER_PRESETS, TUNING_RANGES
+
+
+def test_platform_profiles_and_overrides():
+    """HLS hosts fetch fragments concurrently; settings override per platform"""
+    assert get_platform_config('rumble')['concurrent_fragment_downloads'] == 8
+    assert get_platform_config('youtube')['concurrent_fragment_downloads'] == 4
+    assert get_platform_config('unknown')['http_chunk_size'] == 10485760
+
+    settings = {'download_tuning': {
+        'default': {'concurrent_fragment_downloads': 2, 'buffersize': 65536},
+        'voe': {'concurrent_fragment_downloads': '12'},
+    }}
+    assert get_platform_config('voe', settings)['concurrent_fragment_downloads'] == 12
+    youtube = get_platform_config('youtube', settings)
+    assert youtube['concurrent_fragment_downloads'] == 2 and youtube['buffersize'] == 65536
+
+
+def test_missing_external_downloader_falls_back():
+    """An external downloader that is not installed is dropped instead of failing downloads"""
+    settings = {'download_tuning': {'default': {'external_downloader': 'aria2c'}}}
+    if shutil.which('aria2c'):
+        assert get_download_tuning('twitch', settings)['external_downloader_args'] == EXTERNAL_DOWNLOADER_PRESETS['aria2c']
+    else:
+        assert get_download_tuning('twitch', settings)['external_downloader'] is None
+        assert 'external_downloader' not in get_platform_config('twitch', settings)
+
+
+def test_user_overrides_are_validated():
+    """Users pick downloader presets only; numbers are clamped and invalid values ignored"""
+    settings = {'download_tuning': {'default': {
+        'external_downloader': 'sh',
+        'external_downloader_args': ['-c', 'touch /tmp/pwned'],
+        'concurrent_fragment_downloads': 10 ** 6,
+        'http_chunk_size': 'huge',
+        'buffersize': 1,
+    }}}
+    tuning = get_download_tuning('youtube', settings)
+    assert tuning['external_downloader'] is None and tuning['external_downloader_args'] is None
+    assert tuning['concurrent_fragment_downloads'] == TUNING_RANGES['concurrent_fragment_downloads'][1]
+    assert tuning['http_chunk_size'] == 10485760
+    assert tuning['buffersize'] == TUNING_RANGES['buffersize'][0]
+    assert get_download_tuning('youtube', {'download_tuning': ['x']})['concurrent_fragment_downloads'] == 4
+
+
+if __name__ == "__main__":
+    test_platform_profiles_and_overrides()
+    test_missing_external_downloader_falls_back()
+    test_user_overrides_are_validated()
+    print("✓ Download tuning tests passed")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for the extractor option registry and the per-thread YoutubeDL pool
+"""
+
+import threading
+import http.cookiejar
+
+from yt_dlp.cookies import YoutubeDLCookieJar
+
+import extractor_options
+from extractor_options import build_extractor_options, pooled_ydl, pooled_instance_count
+from cookie_pool import attach_cookie_jar
+
+
+def test_options_per_purpose_and_platform():
+    metadata = build_extractor_options('youtube', 'metadata')
+    assert metadata['ignore_no_formats_error'] and 'cookiefile' not in metadata
+    assert build_extractor_options('rumble', 'formats')['extractor_retries'] == 5
+    try:
+        build_extractor_options('youtube', 'download')
+        assert False, "expected an unknown purpose to be rejected"
+    except Exception as e:
+        assert 'Unknown extraction purpose' in str(e)
+
+
+def test_instances_are_reused_per_thread_and_options():
+    options = build_extractor_options('youtube', 'metadata')
+    with pooled_ydl(options, format='18') as first:
+        assert first.params['format'] == '18'
+        with pooled_ydl(options) as nested:
+            assert nested is not first  # In use: a nested call gets its own instance
+    assert 'format' not in first.params  # Per-call options do not stick
+
+    # Instances are pooled per cookie jar
+    with pooled_ydl(options, 'cookies/youtube_2.txt') as other_jar:
+        assert other_jar is not first
+    with pooled_ydl(options, 'cookies/youtube_2.txt') as same_jar:
+        assert same_jar is other_jar
+
+    # The instance returned first stays pooled (the other one is closed)
+    with pooled_ydl(options, format='22') as again:
+        assert again is nested
+    with pooled_ydl(build_extractor_options('youtube', 'formats')) as other:
+        assert other is not nested
+
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(pooled_ydl(options).__enter__()))
+    thread.start()
+    thread.join()
+    assert seen[0] is not nested
+
+    try:
+        with pooled_ydl(options, outtmpl='x'):
+            pass
+        assert False, "expected a non per-call option to be rejected"
+    except Exception as e:
+        assert 'Not per-call options' in str(e)
+
+
+def test_per_call_format_is_selected():
+    """The per-call format reaches yt-dlp's format selector, not only params"""
+    formats = [
+        {'format_id': '18', 'url': 'https://x/18.mp4', 'ext': 'mp4', 'height': 360, 'vcodec': 'avc1', 'acodec': 'mp4a'},
+        {'format_id': '22', 'url': 'https://x/22.mp4', 'ext': 'mp4', 'height': 720, 'vcodec': 'avc1', 'acodec': 'mp4a'},
+    ]
+
+    def selected(ydl):
+        info = {'id': 'vid', 'title': 't', 'extractor': 'test', 'extractor_key': 'Test',
+                'webpage_url': 'https://x/vid', 'formats': [dict(f) for f in formats]}
+        return ydl.process_ie_result(info, download=False)['format_id']
+
+    options = {'quiet': True, 'simulate': True, 'retries': 98}
+    with pooled_ydl(options, format='18') as ydl:
+        assert selected(ydl) == '18'
+    with pooled_ydl(options) as again:
+        assert again is ydl and selected(again) == '22'  # Default selection is back
+    with pooled_ydl(options, format='22') as again:
+        assert selected(again) == '22'
+
+
+def test_pool_is_bounded():
+    limit = extractor_options.MAX_POOLED_PER_THREAD
+    for retries in range(limit + 3):
+        with pooled_ydl({'quiet': True, 'retries': retries}):
+            pass
+    assert pooled_instance_count() <= limit
+
+
+def test_reused_instance_switches_cookie_jars():
+    jar_a, jar_b = YoutubeDLCookieJar(), YoutubeDLCookieJar()
+    jar_b.set_cookie(http.cookiejar.Cookie(0, 'SID', 'b', None, False, '.example.com', True, True, '/', True,
+                                           False, None, False, None, None, {}))
+    with pooled_ydl({'quiet': True, 'retries': 99}) as ydl:
+        attach_cookie_jar(ydl, {'jar': jar_a})
+        ydl._request_director  # Handlers built around jar_a
+        attach_cookie_jar(ydl, {'jar': jar_b})
+        assert ydl.cookiejar is jar_b and '_request_director' not in ydl.__dict__
+        attach_cookie_jar(ydl, None)
+        assert ydl.cookiejar is not jar_b and len(ydl.cookiejar) == 0
+
+
+if __name__ == "__main__":
+    test_options_per_purpose_and_platform()
+    test_instances_are_reused_per_thread_and_options()
+    test_per_call_format_is_selected()
+    test_pool_is_bounded()
+    test_reused_instance_switches_cookie_jars()
+    print("✓ Extractor option tests passed")
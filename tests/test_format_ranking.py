@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared format ranking engine
+"""
+
+import random
+
+from format_ranking import rank_formats, best_quality_format_id
+
+
+def legacy_best_by_height(formats, duration):
+    """Per-height selection as previously done inside get_video_qualities_info"""
+    info = {'duration': duration}
+    height_groups = {}
+    for fmt in [f for f in formats if f.get('height') and f.get('vcodec') != 'none']:
+        height_groups.setdefault(fmt.get('height'), []).append(fmt)
+
+    picks = []
+    for height in sorted(height_groups.keys(), reverse=True):
+        def format_score(fmt):
+            score = 0
+            tbr = fmt.get('tbr', 0) or fmt.get('vbr', 0) or 0
+            filesize = fmt.get('filesize') or fmt.get('filesize_approx') or 0
+            target = {2160: 15000, 1440: 10000, 1080: 6000, 720: 4000, 480: 2000, 360: 1000}.get(height, 5000)
+            if filesize > 0:
+                score += 10000
+                duration = info.get('duration', 180) or 180
+                size_per_min = filesize / (duration / 60) if duration > 0 else filesize
+                score -= int(size_per_min / (1024 * 1024))
+            if tbr > 0:
+                score += 5000
+                distance_from_target = abs(tbr - target)
+                if tbr <= target * 1.5:
+                    score += 2000
+                    score += int((target * 1.5 - tbr) / 100)
+                else:
+                    score -= int(distance_from_target / 100)
+            if fmt.get('ext') == 'mp4':
+                score += 500
+            vcodec = fmt.get('vcodec', '').lower()
+            if any(codec in vcodec for codec in ['avc1', 'h264', 'x264']):
+                score += 200
+            elif 'vp9' in vcodec:
+                score += 150
+            elif 'av01' in vcodec:
+                score += 100
+            return score
+
+        group = sorted(height_groups[height], key=format_score, reverse=True)
+        picks.append((group[0]['format_id'], format_score(group[0])))
+    return picks
+
+
+def random_formats(rng, count):
+    formats = []
+    for i in range(count):
+        fmt = {
+            'format_id': str(i),
+            'height': rng.choice([None, 144, 240, 360, 480, 720, 1080, 1440, 2160]),
+            'vcodec': rng.choice(['none', 'avc1.64001F', 'vp9', 'av01.0.08M.08', 'h264', 'hev1']),
+            'ext': rng.choice(['mp4', 'webm']),
+        }
+        if rng.random() < 0.7:
+            fmt['tbr'] = rng.choice([0, None, rng.uniform(100, 30000)])
+        if rng.random() < 0.3:
+            fmt['vbr'] = rng.uniform(100, 20000)
+        if rng.random() < 0.5:
+            fmt[rng.choice(['filesize', 'filesize_approx'])] = rng.choice([None, rng.randint(1, 2 * 1024 ** 3)])
+        formats.append(fmt)
+    return formats
+
+
+def test_matches_legacy_per_height_selection():
+    """Scores and per-height picks (including ties) match the previous closure"""
+    rng = random.Random(7)
+    for _ in range(300):
+        formats = random_formats(rng, rng.randint(0, 120))
+        duration = rng.choice([None, 0, 45, 180, 3600])
+        ranking = rank_formats(formats, duration)
+        picks = [(entry['format_id'], entry['score']) for entry in ranking['best_by_height']]
+        assert picks == legacy_best_by_height(formats, duration)
+
+
+def test_best_quality_and_lookup():
+    """Best quality prefers height, then file size; every format is addressable by id"""
+    formats = [
+        {'format_id': 'a', 'height': 720, 'vcodec': 'avc1', 'filesize': 50},
+        {'format_id': 'b', 'height': 1080, 'vcodec': 'vp9', 'filesize': 10},
+        {'format_id': 'c', 'height': 1080, 'vcodec': 'avc1', 'filesize_approx': 30},
+        {'format_id': 'audio', 'vcodec': 'none', 'filesize': 5},
+    ]
+    ranking = rank_formats(formats)
+    assert best_quality_format_id(ranking) == 'c'
+    assert ranking['by_id']['audio']['filesize'] == 5
+    assert best_quality_format_id(rank_formats([])) is None
+
+
+if __name__ == "__main__":
+    test_matches_legacy_per_height_selection()
+    test_best_quality_and_lookup()
+    print("✓ Format ranking tests passed")
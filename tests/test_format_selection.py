@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for selection tokens shared between quality listing and download
+"""
+
+import format_selection
+from format_selection import create_selection, get_selection, discard_selection
+
+URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+INFO = {
+    'id': 'dQw4w9WgXcQ',
+    'duration': 212,
+    'formats': [
+        {'format_id': '18', 'height': 360, 'vcodec': 'avc1', 'ext': 'mp4', 'filesize': 1000, 'url': 'https://media/18'},
+        {'format_id': '140', 'vcodec': 'none', 'ext': 'm4a', 'filesize_approx': 200, 'url': 'https://media/140'},
+    ],
+}
+
+
+def test_selection_round_trip():
+    """A token yields a private copy of the info and the resolved format"""
+    token = create_selection(URL, INFO)
+    info, selected = get_selection(token, URL, '18')
+    assert info == INFO and info is not INFO
+    assert selected['urls'] == ['https://media/18']
+    assert selected['filesize'] == 1000
+    assert get_selection(token, URL, '140')[1]['filesize'] == 200
+
+    info['formats'].clear()
+    assert get_selection(token, URL, '18')[0]['formats'], "Callers must not mutate the cached info"
+
+
+def test_invalid_selections_fall_back():
+    """Unknown tokens, other URLs, unknown formats and expired tokens are ignored"""
+    token = create_selection(URL, INFO)
+    assert get_selection(None, URL, '18') == (None, None)
+    assert get_selection('unknown', URL, '18') == (None, None)
+    assert get_selection(token, 'https://vimeo.com/1', '18') == (None, None)
+    assert get_selection(token, URL, '999') == (None, None)
+
+    discard_selection(token)
+    assert get_selection(token, URL, '18') == (None, None)
+
+    token = create_selection(URL, INFO)
+    format_selection._selections[token]['expires_at'] = 0
+    assert get_selection(token, URL, '18') == (None, None)
+
+
+if __name__ == "__main__":
+    test_selection_round_trip()
+    test_invalid_selections_fall_back()
+    print("✓ Format selection tests passed")
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Tests for per-job working directories and output names
+"""
+
+import os
+import tempfile
+
+from job_workspace import create_job_dir, remove_job_dir, output_filename_stem
+
+
+def test_job_dirs_are_unique_and_removable():
+    """Jobs with the same id get separate directories under <base>/jobs"""
+    with tempfile.TemporaryDirectory() as tmp:
+        first = create_job_dir(tmp, 'user/1')
+        second = create_job_dir(tmp, 'user/1')
+        assert first != second
+        assert os.path.dirname(first) == os.path.join(tmp, 'jobs')
+        assert '/' not in os.path.basename(first)
+
+        with open(os.path.join(first, 'video.mp4'), 'wb') as f:
+            f.write(b'x')
+        remove_job_dir(first)
+        assert not os.path.exists(first) and os.path.isdir(second)
+        remove_job_dir(None)
+
+
+def test_output_stem_includes_id():
+    """Same titles still produce distinct names thanks to the video id"""
+    assert output_filename_stem({'title': 'Clip', 'id': 'a1'}) != output_filename_stem({'title': 'Clip', 'id': 'b2'})
+    assert output_filename_stem({'title': 'a/b: c', 'id': 'z'}).endswith(' [z]')
+    assert '/' not in output_filename_stem({'title': 'a/b: c', 'id': 'z'})
+    long_stem = output_filename_stem({'title': 'é' * 200, 'id': 'q'})
+    assert len(long_stem.encode('utf-8')) <= 150 + len(' [q]')
+
+
+if __name__ == "__main__":
+    test_job_dirs_are_unique_and_removable()
+    test_output_stem_includes_id()
+    print("✓ Job workspace tests passed")
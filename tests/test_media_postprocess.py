@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for codec-aware post-processing decisions
+"""
+
+import os
+import tempfile
+
+import media_postprocess
+from media_postprocess import choose_postprocess, postprocess_media
+from multi_platform_downloader import DOWNLOAD_PURPOSES
+
+
+def _probe(container, video, audio):
+    return {'container': container, 'video_codecs': video, 'audio_codecs': audio}
+
+
+def test_cheapest_action_is_chosen():
+    """Accepted files are left alone, copyable codecs are remuxed, the rest transcoded"""
+    assert choose_postprocess(_probe('webm', ['vp9'], ['opus'])) == 'noop'
+    assert choose_postprocess(_probe('mkv', ['h264'], ['aac'])) == 'noop'
+    assert choose_postprocess(_probe('ts', ['h264'], ['aac'])) == 'remux'
+    assert choose_postprocess(_probe('ts', ['mpeg2video'], ['mp2'])) == 'transcode'
+    assert choose_postprocess(_probe('webm', ['vp9'], ['opus']), target='mp4') == 'remux'
+    assert choose_postprocess(_probe('webm', ['vp8'], ['vorbis']), target='mp4') == 'transcode'
+    assert choose_postprocess(None) == 'noop'
+
+
+def test_unprobed_file_is_kept():
+    """Without a usable probe the download is uploaded as-is"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'clip [x].mp4')
+        with open(path, 'wb') as f:
+            f.write(b'not really a video')
+        result = postprocess_media(path)
+        assert result['action'] == 'noop' and result['path'] == path and os.path.exists(path)
+
+
+def test_user_download_is_remuxed_to_mp4():
+    """An mkv that YouTube would take as-is is still remuxed to mp4 for a download to the device"""
+    saved = media_postprocess.probe_streams, media_postprocess.run_ffmpeg, media_postprocess.shutil.which
+    commands = []
+
+    def run_ffmpeg(args, label='ffmpeg', timeout=None):
+        commands.append(args)
+        with open(args[-1], 'wb') as f:
+            f.write(b'mp4')
+        return {'wall_seconds': 0.1, 'cpu_seconds': 0.1, 'queue_wait': 0.0}
+
+    media_postprocess.probe_streams = lambda path: _probe('mkv', ['h264'], ['aac'])
+    media_postprocess.run_ffmpeg = run_ffmpeg
+    media_postprocess.shutil.which = lambda name: '/usr/bin/' + name
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'clip.mkv')
+            with open(path, 'wb') as f:
+                f.write(b'mkv')
+            assert postprocess_media(path, DOWNLOAD_PURPOSES['reupload']['postprocess_target'])['action'] == 'noop'
+
+            result = postprocess_media(path, DOWNLOAD_PURPOSES['user_download']['postprocess_target'])
+            assert result['action'] == 'remux' and result['path'] == os.path.join(tmp, 'clip.mp4')
+            assert '-c' in commands[0] and 'copy' in commands[0]
+            assert os.listdir(tmp) == ['clip.mp4']
+    finally:
+        media_postprocess.probe_streams, media_postprocess.run_ffmpeg, media_postprocess.shutil.which = saved
+
+
+if __name__ == "__main__":
+    test_cheapest_action_is_chosen()
+    test_unprobed_file_is_kept()
+    test_user_download_is_remuxed_to_mp4()
+    print("✓ Media post-processing tests passed")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for partial-read analysis of direct media URLs against a local HTTP server
+"""
+
+import os
+import re
+import random
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from media_probe import (
+    fetch_container_ranges,
+    write_sparse_copy,
+    parse_probe_metadata,
+    analyze_direct_url,
+    remote_probe_key,
+    file_probe_key,
+    store_probe,
+    probe_file
+)
+
+PAYLOAD = random.Random(5).randbytes(4 * 1024 * 1024 + 3)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD with byte ranges (including suffix ranges) and counts body bytes sent"""
+    sent = 0
+    lock = threading.Lock()
+
+    def _headers(self, status, length, content_range=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(length))
+        self.send_header('ETag', '"v1"')
+        if content_range:
+            self.send_header('Content-Range', content_range)
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._headers(200, len(PAYLOAD))
+
+    def do_GET(self):
+        match = re.match(r'bytes=(\d*)-(\d*)', self.headers.get('Range', ''))
+        if match and match.group(1):
+            start = int(match.group(1))
+            end = min(int(match.group(2)) if match.group(2) else len(PAYLOAD) - 1, len(PAYLOAD) - 1)
+        elif match:
+            start, end = len(PAYLOAD) - int(match.group(2)), len(PAYLOAD) - 1
+        body = PAYLOAD[start:end + 1]
+        self._headers(206, len(body), f'bytes {start}-{end}/{len(PAYLOAD)}')
+        with RangeHandler.lock:
+            RangeHandler.sent += len(body)
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_only_head_and_tail_are_fetched():
+    """A 4 MB file is analyzed from 2 x 64 KB; the sparse copy has both ends in place"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f'http://127.0.0.1:{server.server_port}/movie.mp4'
+        ranges = fetch_container_ranges(url, head_bytes=64 * 1024, tail_bytes=64 * 1024)
+        assert ranges['range_supported'] and ranges['total'] == len(PAYLOAD)
+        assert ranges['headers']['Content-Type'] == 'video/mp4'
+        assert RangeHandler.sent == 128 * 1024
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'movie.mp4')
+            write_sparse_copy(path, ranges)
+            with open(path, 'rb') as f:
+                data = f.read()
+            assert len(data) == len(PAYLOAD)
+            assert data[:64 * 1024] == PAYLOAD[:64 * 1024] and data[-64 * 1024:] == PAYLOAD[-64 * 1024:]
+    finally:
+        server.shutdown()
+
+
+def test_probe_output_is_flattened():
+    """ffprobe JSON becomes the flat metadata used for direct URLs"""
+    metadata = parse_probe_metadata({
+        'format': {'size': '1048576', 'duration': '12.5', 'bit_rate': '671088', 'format_name': 'mov,mp4'},
+        'streams': [
+            {'codec_type': 'video', 'codec_name': 'h264', 'width': 1920, 'height': 1080, 'r_frame_rate': '30000/1001'},
+            {'codec_type': 'audio', 'codec_name': 'aac', 'sample_rate': '48000', 'channels': 2},
+        ],
+    })
+    assert metadata['file_size_mb'] == 1.0 and metadata['duration'] == 12.5
+    assert (metadata['width'], metadata['height'], metadata['fps']) == (1920, 1080, 29.97)
+    assert metadata['audio_codec'] == 'aac' and metadata['channels'] == 2
+
+
+def test_probes_are_cached_by_validators_and_fingerprint():
+    """Same URL + ETag or unchanged file reuse the probe; a changed file does not"""
+    probe_data = {'format': {'duration': '3.0'}, 'streams': [{'codec_type': 'video', 'codec_name': 'vp9'}]}
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f'http://127.0.0.1:{server.server_port}/cached.webm'
+        store_probe(remote_probe_key(url, {'ETag': '"v1"', 'Content-Length': str(len(PAYLOAD))}), probe_data)
+        analysis = analyze_direct_url(url)
+        assert analysis['cached'] and analysis['metadata']['video_codec'] == 'vp9'
+        assert analysis['content_length'] == len(PAYLOAD)
+    finally:
+        server.shutdown()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'clip.mp4')
+        with open(path, 'wb') as f:
+            f.write(b'a' * 1000)
+        key = file_probe_key(path)
+        store_probe(key, probe_data)
+        assert probe_file(path) is probe_data
+
+        with open(path, 'r+b') as f:
+            f.write(b'b')
+        assert file_probe_key(path) != key
+
+
+if __name__ == "__main__":
+    test_only_head_and_tail_are_fetched()
+    test_probe_output_is_flattened()
+    test_probes_are_cached_by_validators_and_fingerprint()
+    print("✓ Media probe tests passed")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Tests for the ffmpeg/ffprobe process manager
+"""
+
+import sys
+import time
+import subprocess
+
+from media_processes import (
+    run_media_process,
+    ytdlp_postprocessor_hook,
+    release_held_slots,
+    media_process_stats
+)
+
+
+def test_process_output_cpu_and_timeout():
+    """Output and CPU time are reported; a hung process group is killed at the timeout"""
+    result = run_media_process([sys.executable, '-c', 'print(sum(range(10**6)))'], kind='ffprobe', timeout=30)
+    assert result['returncode'] == 0 and result['stdout'].strip() == str(sum(range(10 ** 6)))
+    assert result['cpu_seconds'] > 0 and result['queue_wait'] >= 0
+
+    start = time.time()
+    try:
+        run_media_process([sys.executable, '-c', 'import time; time.sleep(30)'], kind='ffprobe', timeout=0.5)
+        assert False, 'process should have timed out'
+    except subprocess.TimeoutExpired:
+        pass
+    assert time.time() - start < 10
+    assert media_process_stats()['ffprobe']['timeouts'] >= 1
+
+
+def test_postprocessor_slots_are_released():
+    """ffmpeg postprocessor hooks hold a slot until finished, or until release_held_slots()"""
+    ytdlp_postprocessor_hook({'status': 'started', 'postprocessor': 'MoveFiles'})
+    assert media_process_stats()['ffmpeg']['running'] == 0
+
+    ytdlp_postprocessor_hook({'status': 'started', 'postprocessor': 'FFmpegMerger'})
+    assert media_process_stats()['ffmpeg']['running'] == 1
+    ytdlp_postprocessor_hook({'status': 'finished', 'postprocessor': 'FFmpegMerger'})
+    assert media_process_stats()['ffmpeg']['running'] == 0
+
+    ytdlp_postprocessor_hook({'status': 'started', 'postprocessor': 'FFmpegFixupM3u8'})
+    release_held_slots()  # The postprocessor failed before 'finished'
+    assert media_process_stats()['ffmpeg']['running'] == 0
+
+
+if __name__ == "__main__":
+    test_process_output_cpu_and_timeout()
+    test_postprocessor_slots_are_released()
+    print("✓ Media process manager tests passed")
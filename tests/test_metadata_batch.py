@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for batch metadata extraction with per-platform limits
+"""
+
+import time
+import threading
+
+import metadata_batch
+from metadata_batch import extract_metadata_batch, run_metadata_batch
+
+
+def _detect(url):
+    return url.split('/')[2]
+
+
+def test_per_platform_concurrency_and_completion_order():
+    """Each platform stays within its limit; a slow platform does not hold up a fast one"""
+    limits = metadata_batch.PLATFORM_LIMITS
+    metadata_batch.PLATFORM_LIMITS = {'youtube': {'concurrency': 2}, 'vimeo': {'concurrency': 1}}
+    running = {'youtube': 0, 'vimeo': 0}
+    peak = {'youtube': 0, 'vimeo': 0}
+    lock = threading.Lock()
+
+    def extract(url, platform):
+        with lock:
+            running[platform] += 1
+            peak[platform] = max(peak[platform], running[platform])
+        time.sleep(0.2 if platform == 'youtube' else 0.01)
+        with lock:
+            running[platform] -= 1
+        return {'title': url}
+
+    try:
+        urls = [f'https://youtube/{i}' for i in range(6)] + [f'https://vimeo/{i}' for i in range(4)]
+        results = list(extract_metadata_batch(urls, extract=extract, detect=_detect))
+    finally:
+        metadata_batch.PLATFORM_LIMITS = limits
+
+    assert sorted(r['index'] for r in results) == list(range(10))
+    assert all(r['success'] and r['metadata']['title'] == urls[r['index']] for r in results)
+    assert peak == {'youtube': 2, 'vimeo': 1}
+    # All vimeo URLs finish while youtube is still busy
+    assert [r['platform'] for r in results[:4]] == ['vimeo'] * 4
+
+
+def test_errors_are_reported_per_url():
+    def extract(url, platform):
+        if url.endswith('bad'):
+            raise Exception('Video is not accessible')
+        return {'title': 'ok'}
+
+    results = {r['url']: r for r in extract_metadata_batch(
+        ['https://youtube/good', 'https://youtube/bad', 'https://nowhere/x'], extract=extract, detect=_detect)}
+    assert results['https://youtube/good']['success']
+    assert results['https://youtube/bad'] == {'index': 1, 'url': 'https://youtube/bad', 'platform': 'youtube',
+                                             'success': False, 'error': 'Video is not accessible'}
+    assert 'not supported' in results['https://nowhere/x']['error']
+
+
+def test_batch_size_limit():
+    try:
+        next(extract_metadata_batch(['https://youtube/x'] * (metadata_batch.MAX_BATCH_URLS + 1), detect=_detect))
+        assert False, "expected the batch to be rejected"
+    except Exception as e:
+        assert 'Too many URLs' in str(e)
+
+
+def test_hung_extraction_times_out():
+    """A URL whose extraction never returns is reported as failed instead of stalling the batch"""
+    release = threading.Event()
+
+    def extract(url, platform):
+        if url.endswith('hang'):
+            release.wait(5)
+        return {'title': url}
+
+    try:
+        start = time.time()
+        progress_data = {'b': {}}
+        progress = run_metadata_batch(['https://youtube/ok', 'https://vimeo/hang'], 'b', progress_data,
+                                      extract=extract, detect=_detect, result_timeout=0.3)
+        assert time.time() - start < 2
+    finally:
+        release.set()
+    assert progress['status'] == 'completed' and progress['completed'] == 1 and progress['failed'] == 1
+    hung = [r for r in progress['results'] if not r['success']]
+    assert hung[0]['url'] == 'https://vimeo/hang' and 'Timed out' in hung[0]['error']
+
+
+if __name__ == "__main__":
+    test_per_platform_concurrency_and_completion_order()
+    test_errors_are_reported_per_url()
+    test_batch_size_limit()
+    test_hung_extraction_times_out()
+    print("✓ All metadata batch tests passed")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Tests for playlist mode: lazy enumeration, bounded concurrency and the resume cursor
+"""
+
+import os
+import time
+import tempfile
+import threading
+
+import playlist_downloader
+from playlist_downloader import download_playlist, load_playlist_state, flatten_entries
+
+URL = 'https://www.youtube.com/playlist?list=PLtest'
+
+
+def _in_temp_dir(test):
+    """Run a test from an empty working directory (playlist state goes to ./downloads)"""
+    def run():
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                test()
+            finally:
+                os.chdir(cwd)
+    run.__name__ = test.__name__
+    return run
+
+
+def _entries(count, enumerated, starts):
+    def entries(url, start=0, on_playlist=None):
+        starts.append(start)
+        on_playlist('Test playlist', count)
+        for index in range(start, count):
+            enumerated.append(index)
+            yield index, f'https://www.youtube.com/watch?v=vid{index}', f'vid{index}', f'Video {index}'
+    return entries
+
+
+@_in_temp_dir
+def test_bounded_concurrency_and_lazy_enumeration():
+    enumerated, starts = [], []
+    running, peak = [0], [0]
+    enumerated_at_first_start = []
+    lock = threading.Lock()
+
+    def download_entry(url, quality, download_id, progress_data, token, user_settings):
+        with lock:
+            if not enumerated_at_first_start:
+                enumerated_at_first_start.append(len(enumerated))
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return {'filename': url.rsplit('=', 1)[1] + '.mp4', 'file_path': 'x'}
+
+    progress_data = {'pl': {}}
+    result = download_playlist(URL, None, 'pl', progress_data, concurrency=2,
+                               download_entry=download_entry, entries=_entries(10, enumerated, starts))
+    assert result['status'] == 'completed' and result['completed'] == 10 and result['total'] == 10
+    assert peak[0] == 2
+    assert enumerated_at_first_start[0] <= 2  # Entries are pulled as slots free, not all up front
+    assert progress_data['pl_3']['status'] == 'completed' and progress_data['pl_3']['filename'] == 'vid3.mp4'
+    assert not os.path.exists(playlist_downloader._state_path(URL, playlist_downloader.PLAYLIST_FORMAT))
+
+
+@_in_temp_dir
+def test_resume_from_cursor():
+    """A failed entry holds the cursor; the next run retries it and skips entries done after it"""
+    attempts = []
+    fail = {'vid2'}
+
+    def download_entry(url, quality, download_id, progress_data, token, user_settings):
+        video_id = url.rsplit('=', 1)[1]
+        attempts.append(video_id)
+        if video_id in fail:
+            raise Exception('network error')
+        return {'filename': video_id + '.mp4', 'file_path': 'x'}
+
+    starts = []
+    result = download_playlist(URL, 'best', 'first', {'first': {}}, concurrency=1,
+                               download_entry=download_entry, entries=_entries(5, [], starts))
+    assert result['status'] == 'completed_with_errors' and result['failed'] == 1
+    state = load_playlist_state(URL, 'best')
+    assert state['cursor'] == 2 and state['done_ids'] == ['vid3', 'vid4']
+
+    fail.clear()
+    attempts.clear()
+    result = download_playlist(URL, 'best', 'second', {'second': {}}, concurrency=1,
+                               download_entry=download_entry, entries=_entries(5, [], starts))
+    assert starts[-1] == 2
+    assert attempts == ['vid2']
+    assert result['status'] == 'completed' and result['skipped'] == 2
+    assert load_playlist_state(URL, 'best') == {'cursor': 0, 'done_ids': []}
+
+
+def test_channel_tabs_are_flattened():
+    """Nested playlists (channel tabs) are expanded in place instead of being downloaded as videos"""
+    def video(video_id):
+        return {'_type': 'url', 'ie_key': 'Youtube', 'id': video_id, 'url': f'https://www.youtube.com/watch?v={video_id}'}
+
+    tabs = {
+        'https://www.youtube.com/@test/videos': {'_type': 'playlist', 'entries': [video('v1'), None, video('v2')]},
+        'https://www.youtube.com/@test/shorts': {'_type': 'playlist', 'entries': [video('s1')]},
+    }
+    channel = {'_type': 'playlist', 'entries': [
+        {'_type': 'url', 'ie_key': 'YoutubeTab', 'url': 'https://www.youtube.com/@test/videos'},
+        {'_type': 'url', 'ie_key': 'YoutubeTab', 'url': 'https://www.youtube.com/@test/shorts'},
+        {'_type': 'playlist', 'entries': [video('p1')]},
+    ]}
+    extracted = []
+
+    def extract(url):
+        extracted.append(url)
+        return tabs[url]
+
+    entries = list(flatten_entries(channel, extract))
+    assert [entry and entry['id'] for entry in entries] == ['v1', None, 'v2', 's1', 'p1']
+    assert extracted == list(tabs)
+
+
+if __name__ == "__main__":
+    test_bounded_concurrency_and_lazy_enumeration()
+    test_resume_from_cursor()
+    test_channel_tabs_are_flattened()
+    print("✓ Playlist downloader tests passed")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for the adaptive per-platform rate limiter and circuit breaker
+"""
+
+import time
+import socket
+import urllib.error
+
+import yt_dlp
+import rate_limiter
+from rate_limiter import (acquire, report_success, report_throttled, rate_limited, is_throttle_error, is_network_error,
+                          PlatformCoolingDown)
+
+
+def _reset(**rates):
+    rate_limiter._buckets.clear()
+    rate_limiter.PLATFORM_RATES = rates
+
+
+def test_bucket_paces_requests_and_rate_adapts():
+    """Burst passes at once, then requests are spaced by 1/rate; successes add rate, throttling halves it"""
+    _reset(testsite={'rate': 20.0, 'max_rate': 20.5, 'burst': 2})
+    start = time.time()
+    for _ in range(4):
+        acquire('testsite')
+    assert 0.08 <= time.time() - start < 0.5  # 2 immediate + 2 x 50 ms
+
+    for _ in range(20):
+        report_success('testsite')
+    assert rate_limiter._buckets[('testsite', None)]['rate'] == 20.5  # Capped at max_rate
+
+    report_throttled('testsite')
+    assert rate_limiter._buckets[('testsite', None)]['rate'] == 10.25
+
+
+def test_breaker_fails_fast_then_probes():
+    _reset(testsite={'rate': 50.0, 'max_rate': 50.0, 'burst': 5})
+    cooldown = rate_limiter.COOLDOWN
+    rate_limiter.COOLDOWN = 0.2
+    try:
+        report_throttled('testsite', 'cookies/a.txt')
+        try:
+            acquire('testsite', 'cookies/a.txt', max_wait=0)
+            assert False, "expected the breaker to be open"
+        except PlatformCoolingDown as e:
+            assert e.platform == 'testsite' and 0 < e.retry_after <= 0.2
+
+        # Other cookie identities are paced separately
+        acquire('testsite', 'cookies/b.txt', max_wait=0)
+
+        # Queued: waits out the cooldown, then exactly one probe goes through
+        acquire('testsite', 'cookies/a.txt', max_wait=1)
+        assert rate_limiter._buckets[('testsite', 'cookies/a.txt')]['state'] == 'half_open'
+        try:
+            acquire('testsite', 'cookies/a.txt', max_wait=0.1)
+            assert False, "expected to wait for the probe"
+        except PlatformCoolingDown:
+            pass
+
+        # A throttled probe reopens with a doubled cooldown; an answered one closes the breaker
+        report_throttled('testsite', 'cookies/a.txt')
+        bucket = rate_limiter._buckets[('testsite', 'cookies/a.txt')]
+        assert bucket['state'] == 'open' and bucket['open_until'] - time.time() > 0.3
+        report_success('testsite', 'cookies/a.txt')
+        assert bucket['state'] == 'closed' and bucket['strikes'] == 0
+    finally:
+        rate_limiter.COOLDOWN = cooldown
+
+
+def test_rate_limited_classifies_errors():
+    _reset(testsite={'rate': 50.0, 'max_rate': 50.0, 'burst': 5})
+    assert is_throttle_error('HTTP Error 429: Too Many Requests')
+    assert is_throttle_error("Sign in to confirm you’re not a bot")
+    assert not is_throttle_error('Video unavailable')
+    # Ids containing 429 are not throttling; a wrapped HTTP 429 is
+    assert not is_throttle_error(Exception('ERROR: [twitter] 1842977429001234567: No video could be found in this tweet'))
+    assert not is_throttle_error('ERROR: [youtube] dQw4290XcQ: Video unavailable')
+    http_429 = urllib.error.HTTPError('https://x/api', 429, 'Slow down', {}, None)
+    assert is_throttle_error(yt_dlp.utils.ExtractorError('Unable to download JSON metadata', cause=http_429))
+
+    for message, state in (('Video unavailable', 'closed'), ('HTTP Error 429: Too Many Requests', 'open')):
+        try:
+            with rate_limited('testsite'):
+                raise Exception(message)
+        except Exception as e:
+            assert str(e) == message
+        assert rate_limiter._buckets[('testsite', None)]['state'] == state
+
+
+def test_network_errors_are_neutral():
+    """Timeouts and DNS failures release a half-open probe without closing the breaker or adding rate"""
+    _reset(testsite={'rate': 50.0, 'max_rate': 60.0, 'burst': 5})
+    timeout = yt_dlp.utils.DownloadError('ERROR: Unable to download webpage: timed out', (TimeoutError, TimeoutError(), None))
+    dns = yt_dlp.utils.ExtractorError('Unable to download webpage', cause=socket.gaierror(-2, 'Name or service not known'))
+    assert is_network_error(timeout) and is_network_error(dns)
+    assert is_network_error(Exception('Read timed out. (read timeout=10)'))
+    assert not is_network_error(Exception('HTTP Error 404: Not Found'))
+
+    cooldown = rate_limiter.COOLDOWN
+    rate_limiter.COOLDOWN = 0.05
+    try:
+        report_throttled('testsite')
+        bucket = rate_limiter._buckets[('testsite', None)]
+        rate = bucket['rate']
+        time.sleep(0.06)
+        for error in (timeout, dns):
+            try:
+                with rate_limited('testsite', max_wait=1):
+                    assert bucket['state'] == 'half_open' and bucket['probing']
+                    raise error
+            except Exception as e:
+                assert e is error
+            assert bucket['state'] == 'half_open' and not bucket['probing'] and bucket['rate'] == rate
+    finally:
+        rate_limiter.COOLDOWN = cooldown
+
+
+if __name__ == "__main__":
+    test_bucket_paces_requests_and_rate_adapts()
+    test_breaker_fails_fast_then_probes()
+    test_rate_limited_classifies_errors()
+    test_network_errors_are_neutral()
+    print("✓ Rate limiter tests passed")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for pre-download size probes and admission limits (local HTTP server only)
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from size_probe import (
+    MB,
+    DEFAULT_SIZE_LIMIT,
+    MAX_SIZE_LIMIT,
+    MAX_DURATION_LIMIT,
+    get_size_limit,
+    get_duration_limit,
+    probe_url_size,
+    resolve_requested_formats,
+    check_download_admission
+)
+
+MEDIA_SIZE = 5 * MB
+
+
+class MediaHandler(BaseHTTPRequestHandler):
+    """Rejects HEAD like many CDNs and answers Range requests with Content-Range"""
+    requests_seen = []
+
+    def do_HEAD(self):
+        self.requests_seen.append(('HEAD', self.path))
+        self.send_response(405)
+        self.end_headers()
+
+    def do_GET(self):
+        self.requests_seen.append(('GET', self.headers.get('Range')))
+        self.send_response(206)
+        self.send_header('Content-Range', f'bytes 0-0/{MEDIA_SIZE}')
+        self.send_header('Content-Length', '1')
+        self.end_headers()
+        self.wfile.write(b'\0')
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MediaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def test_range_probe_and_admission():
+    """HEAD failures fall back to a one-byte Range request; oversized downloads are rejected"""
+    server, base_url = start_server()
+    try:
+        assert probe_url_size(f'{base_url}/video.mp4') == MEDIA_SIZE
+        assert ('GET', 'bytes=0-0') in MediaHandler.requests_seen
+
+        formats = [
+            {'format_id': 'v', 'url': f'{base_url}/v.mp4', 'protocol': 'https'},
+            {'format_id': 'a', 'url': f'{base_url}/a.m4a', 'protocol': 'https', 'filesize': MB},
+        ]
+        requested = resolve_requested_formats(formats, 'missing/v+a')
+        assert [fmt['format_id'] for fmt in requested] == ['v', 'a']
+
+        admission = check_download_admission(requested, 60, size_limit=4 * MB)
+        assert not admission['allowed'] and admission['exact']
+        assert admission['size'] == MEDIA_SIZE + MB
+        assert check_download_admission(requested, 60, size_limit=10 * MB)['allowed']
+        assert not check_download_admission(requested, 3600, 10 * MB, duration_limit=600)['allowed']
+    finally:
+        server.shutdown()
+
+
+def test_bitrate_bound_and_limits():
+    """Unprobeable streams are bounded by bitrate x duration; limits honor user settings"""
+    hls = [{'format_id': 'hls', 'protocol': 'm3u8_native', 'url': 'http://invalid.invalid/x.m3u8', 'tbr': 8000}]
+    admission = check_download_admission(hls, 600, size_limit=300 * MB)
+    assert not admission['allowed'] and not admission['exact']
+    assert admission['size'] == 8000 * 1000 // 8 * 600
+
+    assert get_size_limit('youtube') == DEFAULT_SIZE_LIMIT
+    assert get_size_limit('youtube', {'max_download_size_mb': 50}) == 50 * MB
+    assert get_size_limit('vimeo', {'max_download_size_mb': 50, 'platform_size_limits_mb': {'vimeo': 1000}}) == 1000 * MB
+
+    # User settings cannot lift the server caps; invalid values fall back to the defaults
+    assert get_size_limit('youtube', {'max_download_size_mb': 10 ** 9}) == MAX_SIZE_LIMIT
+    assert get_size_limit('youtube', {'max_download_size_mb': 'lots'}) == DEFAULT_SIZE_LIMIT
+    assert get_size_limit('youtube', {'max_download_size_mb': -5, 'platform_size_limits_mb': ['x']}) == DEFAULT_SIZE_LIMIT
+    assert get_duration_limit('youtube', {'max_download_duration_min': 10 ** 9}) == MAX_DURATION_LIMIT
+    assert get_duration_limit('youtube', {'max_download_duration_min': 'nan'}) is None
+
+
+if __name__ == "__main__":
+    test_range_probe_and_admission()
+    test_bitrate_bound_and_limits()
+    print("✓ Size probe tests passed")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for download purposes and in-memory subtitle tracks
+"""
+
+import io
+
+from multi_platform_downloader import get_platform_config, SIDECAR_OPTIONS
+from subtitle_tracks import select_subtitle_tracks, fetch_subtitle_tracks, upload_captions
+
+
+INFO = {
+    'language': 'de',
+    'subtitles': {
+        'en': [{'ext': 'json3', 'url': 'https://x/en.json3'}, {'ext': 'vtt', 'url': 'https://x/en.vtt'}],
+        'de-DE': [{'ext': 'srt', 'url': 'https://x/de.srt', 'name': 'Deutsch'}],
+        'fr': [{'ext': 'json3', 'url': 'https://x/fr.json3'}],
+        'live_chat': [{'ext': 'json', 'url': 'https://x/chat'}],
+    },
+    'automatic_captions': {'es': [{'ext': 'vtt', 'url': 'https://x/es.vtt'}]},
+}
+
+
+def test_purposes_control_sidecars():
+    """Re-uploads and user downloads write no sidecars; archives write all of them"""
+    youtube = get_platform_config('youtube')
+    assert youtube['writesubtitles'] and youtube['writeinfojson']
+    for purpose in ('reupload', 'user_download'):
+        config = get_platform_config('youtube', purpose=purpose)
+        assert not any(config[option] for option in SIDECAR_OPTIONS)
+    assert all(get_platform_config('vimeo', purpose='archive')[option] for option in SIDECAR_OPTIONS)
+
+
+def test_tracks_are_selected_fetched_and_uploaded():
+    """Preferred languages first, automatic captions skipped, data kept in memory"""
+    tracks = select_subtitle_tracks(INFO)
+    assert [(t['lang'], t['ext']) for t in tracks] == [('de-DE', 'srt'), ('en', 'vtt')]
+
+    class FakeYDL:
+        def urlopen(self, url):
+            if 'en' in url:
+                raise IOError('gone')
+            return io.BytesIO(b'1\n00:00:00,000 --> 00:00:01,000\nHallo\n')
+
+    fetched = fetch_subtitle_tracks(FakeYDL(), INFO)
+    assert [t['lang'] for t in fetched] == ['de-DE'] and fetched[0]['data'].startswith(b'1\n')
+
+    inserted = []
+
+    class FakeYouTube:
+        def captions(self):
+            return self
+
+        def insert(self, part, body, media_body):
+            inserted.append(body['snippet'])
+            return self
+
+        def execute(self):
+            return {}
+
+    assert upload_captions(FakeYouTube(), 'vid', fetched) == 1
+    assert inserted == [{'videoId': 'vid', 'language': 'de-DE', 'name': 'Deutsch', 'isDraft': False}]
+    assert upload_captions(FakeYouTube(), 'vid', None) == 0
+
+
+def test_captions_skipped_without_scope():
+    """A token without the captions scope stops the upload after the first refused track"""
+    calls = []
+
+    class ScopelessYouTube:
+        def captions(self):
+            return self
+
+        def insert(self, part, body, media_body):
+            calls.append(body['snippet']['language'])
+            return self
+
+        def execute(self):
+            raise Exception('<HttpError 403 "Request had insufficient authentication scopes.">')
+
+    tracks = [{'lang': lang, 'name': lang, 'data': b'WEBVTT\n'} for lang in ('en', 'de')]
+    assert upload_captions(ScopelessYouTube(), 'vid', tracks) == 0
+    assert calls == ['en']
+
+
+if __name__ == "__main__":
+    test_purposes_control_sidecars()
+    test_tracks_are_selected_fetched_and_uploaded()
+    test_captions_skipped_without_scope()
+    print("✓ Subtitle track tests passed")
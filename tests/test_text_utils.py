@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for text normalization helpers, checked against the original
+per-call regex implementations
+"""
+
+import re
+import random
+
+from text_utils import clean_string_for_json, clean_strings_for_json, clean_description_from_technical_details
+
+LEGACY_TECHNICAL_PATTERNS = [
+    r'--- \*\*Technical Details\*\* ---.*?(?=\n\n|\Z)',
+    r'\*\*Technical Details\*\*.*?(?=\n\n|\Z)',
+    r'\*\*Resolution:\*\*.*?(?=\n|\Z)',
+    r'\*\*Format:\*\*.*?(?=\n|\Z)',
+    r'\*\*Video Codec:\*\*.*?(?=\n|\Z)',
+    r'\*\*Audio Codec:\*\*.*?(?=\n|\Z)',
+    r'\*\*Bitrate:\*\*.*?(?=\n|\Z)',
+    r'\*\*FPS:\*\*.*?(?=\n|\Z)',
+    r'\*\*File Size:\*\*.*?(?=\n|\Z)',
+    r'\*\*Sample Rate:\*\*.*?(?=\n|\Z)',
+    r'\*\*Audio:\*\*.*?(?=\n|\Z)',
+    r'\*\*Total Bitrate:\*\*.*?(?=\n|\Z)'
+]
+
+
+def legacy_clean_string_for_json(text):
+    if not text:
+        return ''
+    if not isinstance(text, str):
+        text = str(text)
+    text = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text)
+    text = text.replace('\\', '').replace('\r', '').replace('\n', ' ')
+    if len(text) > 5000:
+        text = text[:5000] + '...'
+    return text.strip()
+
+
+def legacy_clean_description(raw_description):
+    if not raw_description:
+        return "No description available"
+    clean_desc = raw_description
+    for pattern in LEGACY_TECHNICAL_PATTERNS:
+        clean_desc = re.sub(pattern, '', clean_desc, flags=re.DOTALL | re.MULTILINE)
+    clean_desc = re.sub(r'\n\s*\n\s*\n', '\n\n', clean_desc)
+    clean_desc = clean_desc.strip()
+    return clean_desc if clean_desc else "No description available"
+
+
+FRAGMENTS = [
+    'Check out my channel! ', '#music #live ', '\n', '\n\n', '\n\n\n', '  \n \n', 'C:\\path\\file ',
+    '\t', '\x00', '\x85', '\x9f', 'é', '🎵 ', '**bold** ', '--- **Technical Details** ---\n',
+    '**Resolution:** 1920x1080\n', '**Format:** MP4', '**Video Codec:** H264\n', '**Audio Codec:** AAC',
+    '**Bitrate:** 4000 kbps\n', '**FPS:** 30\n', '**File Size:** 20 MB', '**Sample Rate:** 48000 Hz\n',
+    '**Audio:** Stereo\n', '**Total Bitrate:** 4128 kbps', '**Technical Details**\n', '**Audio',
+]
+
+
+def random_description(rng, length):
+    parts = []
+    while sum(len(p) for p in parts) < length:
+        parts.append(rng.choice(FRAGMENTS))
+    return ''.join(parts)
+
+
+def test_clean_string_matches_legacy():
+    """The translate-based cleaner matches the regex implementation"""
+    rng = random.Random(1234)
+    samples = [None, '', 0, 12345, 'plain', 'x' * 6000, ' padded \n', 'a\\b\r\nc']
+    samples += [random_description(rng, rng.randint(1, 6000)) for _ in range(200)]
+    for sample in samples:
+        assert clean_string_for_json(sample) == legacy_clean_string_for_json(sample)
+    assert clean_strings_for_json(['#a\n', None]) == ['#a', '']
+
+
+def test_clean_description_matches_legacy():
+    """The single-pass technical detail removal matches the sequential substitutions"""
+    rng = random.Random(5678)
+    samples = [None, '', 'No markers at all', '**Resolution:** 1x1', 'Intro\n\n--- **Technical Details** ---\n**Format:** MP4\n\nOutro']
+    samples += [random_description(rng, rng.randint(1, 5000)) for _ in range(300)]
+    for sample in samples:
+        assert clean_description_from_technical_details(sample) == legacy_clean_description(sample)
+
+
+if __name__ == "__main__":
+    test_clean_string_matches_legacy()
+    test_clean_description_matches_legacy()
+    print("✓ Text normalization tests passed")
@@ -0,0 +1,82 @@
+import re
+
+# Maximum length of a cleaned string in JSON responses
+MAX_JSON_STRING_LENGTH = 5000
+
+# Characters removed from JSON strings: C0/C1 control characters (this includes
+# \r, \n and \t) and backslashes. str.translate is fastest for ASCII strings;
+# for non-ASCII text (emoji, accents) the compiled character class is faster.
+_JSON_DELETE_TABLE = dict.fromkeys(
+    [*range(0x00, 0x20), *range(0x7f, 0xa0), ord('\\')]
+)
+_JSON_DELETE_RE = re.compile(r'[\x00-\x1f\x7f-\x9f\\]')
+
+# Technical detail blocks/lines appended to descriptions by the metadata
+# extractors. One alternation replaces the 12 separate substitutions. The old
+# code removed the "Technical Details" blocks before the single-line labels, so
+# label matches stop in front of a block marker to keep that precedence; the
+# results only differ for markers that share asterisks (e.g. "**FPS:**Technical
+# Details**"), where this removes slightly more.
+_BLOCK_MARKER = r'--- \*\*Technical Details\*\* ---|\*\*Technical Details\*\*'
+_TECHNICAL_DETAILS_RE = re.compile(
+    r'(?:' + _BLOCK_MARKER + r').*?(?=\n\n|\Z)'
+    r'|\*\*(?:Resolution|Format|Video Codec|Audio Codec|Bitrate|FPS|File Size'
+    r'|Sample Rate|Audio|Total Bitrate):\*\*.*?(?=\n|\Z|' + _BLOCK_MARKER + r')',
+    re.DOTALL | re.MULTILINE
+)
+_EXTRA_NEWLINES_RE = re.compile(r'\n\s*\n\s*\n')
+
+HASHTAG_RE = re.compile(r'#(\w+)')
+TAG_WORD_RE = re.compile(r'\b[a-zA-Z]{3,}\b')
+
+
+def clean_string_for_json(text):
+    """Clean string for safe JSON serialization"""
+    if not text:
+        return ''
+
+    try:
+        # Convert to string and handle encoding issues
+        if not isinstance(text, str):
+            text = str(text)
+
+        # Remove non-printable characters and backslashes in one pass
+        if text.isascii():
+            text = text.translate(_JSON_DELETE_TABLE)
+        else:
+            text = _JSON_DELETE_RE.sub('', text)
+
+        # Limit length to prevent huge JSON responses
+        if len(text) > MAX_JSON_STRING_LENGTH:
+            text = text[:MAX_JSON_STRING_LENGTH] + '...'
+
+        return text.strip()
+    except Exception:
+        return 'Content unavailable'
+
+
+def clean_strings_for_json(values):
+    """Clean a list of strings (e.g. tags) for JSON serialization"""
+    if not values:
+        return []
+    return [clean_string_for_json(value) for value in values]
+
+
+def clean_description_from_technical_details(raw_description):
+    """Clean description by removing technical details that should not be shown to users"""
+    if not raw_description:
+        return "No description available"
+
+    # Every match starts at "**" (or "--- **"), so skip the prose before the
+    # first marker and the regex pass entirely when there are no markers
+    clean_desc = raw_description
+    first_marker = clean_desc.find('**')
+    if first_marker != -1:
+        start = max(0, first_marker - 4)
+        clean_desc = clean_desc[:start] + _TECHNICAL_DETAILS_RE.sub('', clean_desc[start:])
+
+    # Clean up extra whitespace and newlines
+    clean_desc = _EXTRA_NEWLINES_RE.sub('\n\n', clean_desc)  # Replace multiple newlines with double newlines
+    clean_desc = clean_desc.strip()
+
+    return clean_desc if clean_desc else "No description available"
@@ -8,6 +8,9 @@ from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
 from googleapiclient.errors import HttpError
 import threading
+from subtitle_tracks import fetch_subtitle_tracks, upload_captions
+from media_postprocess import postprocess_media
+from media_processes import apply_media_limits, release_held_slots
 
 def get_working_cookies_file(user_dir, user_cookies_file):
     """Get working cookies file with fallback system"""
@@ -51,6 +54,7 @@ def download_and_upload_video(url, access_token, user_id, title, description, ta
             total = d.get('total_bytes', d.get('total_bytes_estimate', 0))
             speed = d.get('speed', 0)
             eta = d.get('eta', 0)
+            record_usage(job_dir, downloaded)
             
             if total > 0:
                 progress = (downloaded / total) * 50  # Download is 50% of total progress
@@ -69,11 +73,15 @@ def download_and_upload_video(url, access_token, user_id, title, description, ta
                 progress_data[upload_id]['percentage'] = 0
     
     # Check if this is a direct URL
-    from multi_platform_downloader import get_platform_from_url
+    from multi_platform_downloader import get_platform_from_url, get_downloaded_filepath
+    from job_workspace import create_job_dir, remove_job_dir, JOB_OUTTMPL
+    from disk_budget import estimate_job_bytes, reserve_space, record_usage, release_space
     detected_platform = get_platform_from_url(url)
     
-    # Download video in ultra high quality - 4K/1440p/1080p preference
-    output_template = f"{user_dir}/%(title)s.%(ext)s"
+    # Download video in ultra high quality - 4K/1440p/1080p preference.
+    # Each upload gets its own directory so parallel jobs never pick up each other's files.
+    job_dir = create_job_dir(f"{user_dir}/downloads", upload_id)
+    output_template = os.path.join(job_dir, JOB_OUTTMPL)
     
     if detected_platform == 'direct_url':
         # For direct URLs, use simpler configuration
@@ -90,10 +98,6 @@ def download_and_upload_video(url, access_token, user_id, title, description, ta
             'retries': 10,
             'file_access_retries': 10,
             'fragment_retries': 10,
-            'postprocessors': [{
-                'key': 'FFmpegVideoConvertor',
-                'preferedformat': 'mp4',
-            }],
         }
     else:
         # For platform URLs, use quality-focused configuration
@@ -108,33 +112,37 @@ def download_and_upload_video(url, access_token, user_id, title, description, ta
             'writesubtitles': False,
             'writeautomaticsub': False,
             'http_chunk_size': 10485760,  # 10MB chunks for better download stability
-            'postprocessors': [{
-                'key': 'FFmpegVideoConvertor',
-                'preferedformat': 'mp4',
-            }],
         }
     
+    # yt-dlp's own ffmpeg runs (merges, fixups) share the media process limits
+    apply_media_limits(ydl_opts)
+    
     try:
+        # Size is unknown before extraction: reserve the default size limit
+        reserve_space(job_dir, estimate_job_bytes(None))
+        
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            # Get info first
-            info = ydl.extract_info(url, download=False)
+            # Download the video and keep the info dict of the same extraction
+            info = ydl.extract_info(url, download=True)
             if not info:
                 raise Exception("Failed to extract video information")
             video_title = info.get('title', 'Downloaded Video')
             
-            # Download the video
-            ydl.download([url])
+            # The downloaded file is known from the info dict (no directory scan)
+            video_file = get_downloaded_filepath(ydl, info)
             
-            # Find the downloaded file
-            video_file = None
-            for file in os.listdir(user_dir):
-                if file.endswith(('.mp4', '.webm', '.mkv', '.avi')):
-                    video_file = os.path.join(user_dir, file)
-                    break
-            
-            if not video_file:
+            if not video_file or not os.path.exists(video_file):
                 raise Exception("Downloaded video file not found")
             
+            # YouTube takes most files as downloaded; remux/transcode only when needed
+            postprocess = postprocess_media(video_file)
+            video_file = postprocess['path']
+            progress_data[upload_id]['postprocess'] = postprocess
+            release_space(job_dir)
+            
+            # Subtitles go straight from memory into the upload (no sidecar files)
+            captions = fetch_subtitle_tracks(ydl, info)
+            
             # Update progress - starting upload
             progress_data[upload_id]['status'] = 'uploading'
             progress_data[upload_id]['progress'] = 50
@@ -148,7 +156,8 @@ def download_and_upload_video(url, access_token, user_id, title, description, ta
                 tags,
                 privacy,
                 upload_id,
-                progress_data
+                progress_data,
+                captions=captions
             )
             
             # Save to history
@@ -162,6 +171,7 @@ def download_and_upload_video(url, access_token, user_id, title, description, ta
             
             # Clean up downloaded file
             cleanup_video_file(video_file)
+            remove_job_dir(job_dir)
             
             progress_data[upload_id]['status'] = 'completed'
             progress_data[upload_id]['progress'] = 100
@@ -171,19 +181,16 @@ def download_and_upload_video(url, access_token, user_id, title, description, ta
             
     except Exception as e:
         logging.error(f"Error in download_and_upload_video: {e}")
-        # Clean up any downloaded files on error
-        try:
-            for file in os.listdir(user_dir):
-                if file.endswith(('.mp4', '.webm', '.mkv', '.avi')):
-                    cleanup_video_file(os.path.join(user_dir, file))
-        except:
-            pass
+        # Clean up this job's downloaded files on error
+        release_held_slots()
+        release_space(job_dir)
+        remove_job_dir(job_dir)
         progress_data[upload_id]['status'] = 'error'
         progress_data[upload_id]['error'] = str(e)
         raise
 
-def upload_to_youtube(video_file, access_token, title, description, tags, privacy, upload_id, progress_data):
-    """Upload video file to YouTube"""
+def upload_to_youtube(video_file, access_token, title, description, tags, privacy, upload_id, progress_data, captions=None):
+    """Upload video file to YouTube (with optional in-memory caption tracks)"""
     try:
         # Create credentials from access token
         from google.auth.transport.requests import Request
@@ -278,6 +285,7 @@ def upload_to_youtube(video_file, access_token, title, description, tags, privac
         if response is not None:
             video_id = response['id']
             youtube_url = f"https://www.youtube.com/watch?v={video_id}"
+            upload_captions(youtube, video_id, captions)
             return youtube_url
         else:
             raise Exception("YouTube upload failed - no response received")